@@ -0,0 +1,218 @@
+"""Async HTTP search API around HotelAgent.
+
+Concurrent requests are micro-batched: queries that arrive within a few
+milliseconds of each other are encoded together and searched with one
+batched Chroma query on a worker thread, then fanned back out to their
+requests.
+
+    uvicorn agent.api:app --port 8000
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from agent import instrumentation
+from agent.main import HotelAgent
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Rolling request latencies for p50/p99 and QPS reporting."""
+
+    def __init__(self, window: int = 10_000, qps_window_s: float = 60.0):
+        self.qps_window_s = qps_window_s
+        self._samples = deque(maxlen=window)
+        self.total = 0
+        self.started = time.monotonic()
+
+    def record(self, latency_s: float) -> None:
+        self._samples.append((time.monotonic(), latency_s))
+        self.total += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        latencies = np.array([latency for _, latency in self._samples]) * 1000
+        recent = sum(1 for ts, _ in self._samples if now - ts <= self.qps_window_s)
+        span = max(min(self.qps_window_s, now - self.started), 1.0)
+        return {
+            'requests': self.total,
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'qps': recent / span,
+        }
+
+
+class MicroBatcher:
+    """Collect concurrent items for up to ``max_wait_ms`` and process them as one batch.
+
+    ``handler`` receives a list of items and must return one result per item;
+    it runs in the default thread pool so the event loop stays responsive.
+    If a batch fails, each of its items is retried on its own, so one bad
+    request only fails itself. ``stop`` fails every request still waiting.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], List[Any]], max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[Tuple[Any, asyncio.Future]] = []
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # The batch in progress and everything still queued would never be answered
+        waiting = [future for _, future in self._batch]
+        while self._queue is not None and not self._queue.empty():
+            waiting.append(self._queue.get_nowait()[1])
+        self._batch = []
+        for future in waiting:
+            if not future.done():
+                future.set_exception(RuntimeError("Search batcher stopped"))
+
+    async def submit(self, item: Any) -> Any:
+        if self._task is None or self._task.done():
+            raise RuntimeError("Search batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch = batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = await loop.run_in_executor(None, self.handler, [item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"Handler returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                if len(batch) == 1:
+                    results = [e]
+                else:
+                    logger.warning(f"Batch of {len(batch)} failed ({e}); retrying its items one by one")
+                    self.fallbacks += 1
+                    results = [await self._run_one(loop, item) for item, _ in batch]
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self._batch = []
+
+    async def _run_one(self, loop: asyncio.AbstractEventLoop, item: Any) -> Any:
+        """The handler's result for a single item, or the exception it raised."""
+        try:
+            return (await loop.run_in_executor(None, self.handler, [item]))[0]
+        except Exception as e:
+            return e
+
+
+def make_search_handler(agent: HotelAgent) -> Callable[[List[Tuple[str, int]]], List[List[Dict[str, Any]]]]:
+    """Batch handler over (query, k) pairs: search once with the largest k, then trim."""
+    def handle(items: List[Tuple[str, int]]) -> List[List[Dict[str, Any]]]:
+        max_k = max(k for _, k in items)
+        answers = agent.process_queries([query for query, _ in items], n_results=max_k)
+        return [answer[:k] for answer, (_, k) in zip(answers, items)]
+    return handle
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    agent = app.state.agent = HotelAgent(data_dir=os.getenv("HOTEL_DATA_DIR", "data"))
+    app.state.batcher = MicroBatcher(
+        make_search_handler(agent),
+        max_batch=int(os.getenv("HOTEL_MAX_BATCH", "32")),
+        max_wait_ms=float(os.getenv("HOTEL_MAX_WAIT_MS", "5"))
+    )
+    app.state.latency = LatencyStats()
+    app.state.batcher.start()
+    yield
+    await app.state.batcher.stop()
+
+
+app = FastAPI(title="Pakistan Hotel Agent", lifespan=lifespan)
+
+
+def traced_search(agent: HotelAgent, q: str, k: int, profiler: Optional[str]) -> Dict[str, Any]:
+    """Run one query outside the batcher with its spans (and a profile) recorded."""
+    with instrumentation.trace("api.search", profiler=profiler) as request_trace:
+        results = agent.process_queries([q], n_results=k)[0]
+    return {'results': results, 'trace': request_trace.to_dict()}
+
+
+@app.get("/search")
+async def search(
+    q: str = Query(..., min_length=1),
+    k: int = Query(5, ge=1, le=50),
+    trace: bool = False,
+    profile: Optional[str] = Query(None, pattern="^(cprofile|pyinstrument)$")
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    if trace or profile:
+        # A traced request is searched on its own so the timeline is not
+        # mixed with other requests' batches
+        try:
+            response = await asyncio.to_thread(traced_search, app.state.agent, q, k, profile)
+        except ImportError as e:
+            raise HTTPException(status_code=400, detail=f"Profiler {profile} is not installed: {e}")
+        app.state.latency.record(time.perf_counter() - start)
+        return {'query': q, **response}
+    results = await app.state.batcher.submit((q, k))
+    app.state.latency.record(time.perf_counter() - start)
+    return {'query': q, 'results': results}
+
+
+@app.get("/metrics")
+async def metrics(format: str = Query("json", pattern="^(json|prometheus)$")):
+    if format == "prometheus":
+        return PlainTextResponse(instrumentation.prometheus_text(), media_type="text/plain; version=0.0.4")
+    batcher = app.state.batcher
+    return {
+        **app.state.latency.snapshot(),
+        'batches': batcher.batches,
+        'mean_batch_size': batcher.items / batcher.batches if batcher.batches else 0.0,
+        'batch_fallbacks': batcher.fallbacks,
+        'query_cache': app.state.agent.query_cache.stats(),
+        'instrumentation': instrumentation.snapshot(),
+    }
+
+
+@app.get("/health")
+async def health() -> Dict[str, str]:
+    return {'status': 'ok'}
@@ -0,0 +1,248 @@
+"""Offline gazetteer and grid index for "near X" hotel queries.
+
+``data/gazetteer.csv`` lists cities, airports, landmarks and known hotels
+with coordinates (``name,kind,city,latitude,longitude,aliases``; aliases are
+``|``-separated). It is used twice:
+
+- ``geocode`` places a hotel at the gazetteer entry named in its name or
+  address ("LOKAL Rooms x Skardu (Katpana Retreat)" -> Katpana Desert).
+  City centroids are never used for hotels, since every hotel in a city
+  would land on the same point; such hotels stay without coordinates.
+- ``agent.query_parser`` resolves "near Shangrila Resort" or "within 5 km of
+  Skardu airport" to a point and radius.
+
+``GeoIndex`` buckets points into a fixed lat/lon grid (cells of
+``cell_deg`` degrees, sorted by cell key), so a radius query reads only the
+cells under the circle's bounding box and computes exact haversine
+distances for those points. Coverage is Pakistan, which is nowhere near a
+pole or the antimeridian, so cells do not wrap::
+
+    python -m agent.geo "Skardu Airport" --radius-km 5
+    python -m agent.geo "Shangrila Resort" -k 3
+"""
+import argparse
+import csv
+import functools
+import logging
+import math
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_FILE = os.environ.get(
+    "HOTEL_GAZETTEER", str(Path(__file__).resolve().parent.parent / "data" / "gazetteer.csv")
+)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Radius for "near X" when the query gives none
+NEAR_RADIUS_KM = 5.0
+# Gazetteer kinds that may locate a hotel
+HOTEL_PLACE_KINDS = ("hotel", "landmark", "airport")
+
+
+class Place(BaseModel):
+    """One gazetteer entry."""
+    name: str
+    kind: str
+    city: str = ""
+    latitude: float
+    longitude: float
+
+
+def haversine_km(lat: float, lon: float, lats: Any, lons: Any) -> np.ndarray:
+    """Great-circle distances in km from one point to each of ``lats``/``lons``."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) degrees of the box around a circle."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+class Gazetteer:
+    """Places looked up by whole-word name or alias, longest phrase first."""
+
+    def __init__(self, places: List[Place], aliases: Dict[str, int]):
+        self.places = places
+        self._by_phrase = {phrase.lower(): i for phrase, i in aliases.items()}
+        phrases = sorted(self._by_phrase, key=len, reverse=True)
+        self._pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(p) for p in phrases) + r')\b', re.IGNORECASE
+        ) if phrases else None
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_FILE) -> "Gazetteer":
+        places, aliases = [], {}
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                place = Place(
+                    name=row["name"].strip(),
+                    kind=row["kind"].strip(),
+                    city=(row.get("city") or "").strip(),
+                    latitude=float(row["latitude"]),
+                    longitude=float(row["longitude"]),
+                )
+                for phrase in [place.name] + (row.get("aliases") or "").split("|"):
+                    if phrase.strip():
+                        # First entry wins for a phrase listed twice
+                        aliases.setdefault(phrase.strip(), len(places))
+                places.append(place)
+        return cls(places, aliases)
+
+    def get(self, name: str) -> Optional[Place]:
+        """Place whose name or alias is exactly ``name`` (case-insensitive)."""
+        i = self._by_phrase.get((name or "").strip().lower())
+        return self.places[i] if i is not None else None
+
+    def find(self, text: str, kinds: Optional[Sequence[str]] = None) -> Optional[Place]:
+        """First place named anywhere in ``text``, optionally only of ``kinds``."""
+        if self._pattern is None or not text:
+            return None
+        for match in self._pattern.finditer(text):
+            place = self.places[self._by_phrase[match.group().lower()]]
+            if kinds is None or place.kind in kinds:
+                return place
+        return None
+
+    def geocode(self, hotel: Dict[str, Any]) -> Optional[Place]:
+        """Gazetteer place for a hotel record: its name first, then its address."""
+        contact_info = hotel.get("contact_info") or {}
+        for text in (hotel.get("name"), contact_info.get("address")):
+            place = self.find(text or "", HOTEL_PLACE_KINDS)
+            if place is not None:
+                return place
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def load_gazetteer(path: str = GAZETTEER_FILE) -> Gazetteer:
+    """Process-wide gazetteer; empty (with a warning) when the file is missing."""
+    if not Path(path).exists():
+        logger.warning(f"No gazetteer at {path}; hotels are not geocoded and 'near' queries are ignored")
+        return Gazetteer([], {})
+    return Gazetteer.load(path)
+
+
+def coordinates(hotel: Dict[str, Any], gazetteer: Optional[Gazetteer] = None) -> Dict[str, Optional[float]]:
+    """``latitude``/``longitude`` for a record: its own when set, else from the gazetteer."""
+    if hotel.get("latitude") is not None and hotel.get("longitude") is not None:
+        return {"latitude": float(hotel["latitude"]), "longitude": float(hotel["longitude"])}
+    place = (gazetteer or load_gazetteer()).geocode(hotel)
+    if place is None:
+        return {"latitude": None, "longitude": None}
+    return {"latitude": place.latitude, "longitude": place.longitude}
+
+
+class GeoIndex:
+    """Points bucketed into a fixed lat/lon grid; see the module docstring.
+
+    Rows are positions in the ``latitudes``/``longitudes`` arrays it was
+    built from (hotel table or document rows); NaN coordinates are not indexed.
+    """
+
+    def __init__(self, latitudes: Any, longitudes: Any, cell_deg: float = 0.05):
+        lats = np.asarray(latitudes, dtype=np.float64)
+        lons = np.asarray(longitudes, dtype=np.float64)
+        self.size = len(lats)
+        self.cell_deg = cell_deg
+        self._lon_cells = int(math.ceil(360 / cell_deg)) + 1
+        known = np.flatnonzero(~(np.isnan(lats) | np.isnan(lons)))
+        keys = self._keys(lats[known], lons[known])
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.rows = known[order]
+        self.lats = lats[self.rows]
+        self.lons = lons[self.rows]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _cells(self, lats: Any, lons: Any) -> Tuple[np.ndarray, np.ndarray]:
+        lat_cells = np.floor((np.asarray(lats) + 90) / self.cell_deg).astype(np.int64)
+        lon_cells = np.floor((np.asarray(lons) + 180) / self.cell_deg).astype(np.int64)
+        return lat_cells, np.clip(lon_cells, 0, self._lon_cells - 1)
+
+    def _keys(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        lat_cells, lon_cells = self._cells(lats, lons)
+        return lat_cells * self._lon_cells + lon_cells
+
+    def within(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows within ``radius_km`` of a point and their distances, nearest first."""
+        south, west, north, east = bounding_box(lat, lon, radius_km)
+        (lat_lo, lat_hi), (lon_lo, lon_hi) = self._cells([south, north], [west, east])
+        # Within one grid row, the cells of the box are one contiguous key range
+        lat_cells = np.arange(lat_lo, lat_hi + 1, dtype=np.int64) * self._lon_cells
+        starts = np.searchsorted(self.keys, lat_cells + lon_lo, side="left")
+        ends = np.searchsorted(self.keys, lat_cells + lon_hi, side="right")
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        candidates = np.arange(total) + offsets
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self.rows[candidates[order]], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int, allowed: Optional[np.ndarray] = None,
+                max_radius_km: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Up to ``k`` nearest rows (only where the ``allowed`` mask is set) and their distances.
+
+        The search radius starts at one cell and doubles until ``k`` rows
+        are inside it; the ``k`` nearest are then exact.
+        """
+        limit = max_radius_km if max_radius_km is not None else math.pi * EARTH_RADIUS_KM
+        radius = min(self.cell_deg * KM_PER_DEGREE, limit)
+        while True:
+            rows, distances = self.within(lat, lon, radius)
+            if allowed is not None:
+                keep = allowed[rows]
+                rows, distances = rows[keep], distances[keep]
+            if len(rows) >= k or radius >= limit:
+                return rows[:k], distances[:k]
+            radius = min(radius * 2, limit)
+
+    def mask(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Boolean mask over all rows (indexed or not) that lie within ``radius_km``."""
+        keep = np.zeros(self.size, dtype=bool)
+        keep[self.within(lat, lon, radius_km)[0]] = True
+        return keep
+
+
+def main():
+    from vector_store.retrieval import FaissBackend
+
+    parser = argparse.ArgumentParser(description="Hotels in the FAISS index near a gazetteer place")
+    parser.add_argument("place")
+    parser.add_argument("--index-dir", default="faiss_index")
+    parser.add_argument("--radius-km", type=float, help="Only hotels within this distance")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    place = load_gazetteer().find(args.place)
+    if place is None:
+        parser.error(f"{args.place!r} is not in the gazetteer ({GAZETTEER_FILE})")
+    print(f"📍 {place.name} ({place.latitude:.4f}, {place.longitude:.4f})")
+    for hit in FaissBackend(args.index_dir).nearby(place.latitude, place.longitude, args.k, args.radius_km):
+        print(f"{hit['distance_km']:6.2f} km  {hit['name']}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
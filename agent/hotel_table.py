@@ -0,0 +1,273 @@
+"""Columnar in-memory hotel table for vectorized filters and sorts.
+
+One row per hotel (the same row as the FAISS index and ``DocStore`` when
+built together), one NumPy array per field:
+
+- ``star_rating`` (int8) and ``min_price`` / ``max_price`` (float32); 0 means unknown
+- ``city`` and ``currency``: int32 codes into interned string pools
+- ``amenities``: uint32 bitset, one bit per key of ``agent.query_parser.AMENITY_SYNONYMS``
+- ``latitude`` / ``longitude`` (float32); NaN means unknown. Radius filters
+  go through a ``agent.geo.GeoIndex`` built over them on first use
+
+Filtering or sorting a million hotels by price or stars is a few array
+operations instead of a million nested dict lookups. Full records stay in
+the document store; ``to_hotels`` validates only the rows that are
+returned, as ``agent.models.Hotel``, with one ``TypeAdapter`` call.
+
+The table is saved per index segment next to ``lexical.npz``
+(``hotel_table.npz`` / ``hotel_table_delta.npz``)::
+
+    python -m agent.hotel_table --city Skardu --min-stars 3 --sort min_price -k 10
+"""
+import argparse
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+from agent.geo import GeoIndex
+from agent.models import Hotel
+from agent.query_parser import AMENITY_SYNONYMS, QueryConstraints, amenity_key
+
+logger = logging.getLogger(__name__)
+
+TABLE_FILE = "hotel_table.npz"
+TABLE_DELTA_FILE = "hotel_table_delta.npz"
+
+AMENITY_BITS = {key: 1 << i for i, key in enumerate(AMENITY_SYNONYMS)}
+SORT_COLUMNS = ("min_price", "max_price", "star_rating")
+
+_HOTELS = TypeAdapter(List[Hotel])
+
+
+def _pool_codes(values: List[str]) -> tuple:
+    """Intern ``values`` case-insensitively: (pool, int32 codes)."""
+    pool: List[str] = []
+    seen: Dict[str, int] = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        key = value.lower()
+        code = seen.get(key)
+        if code is None:
+            code = seen[key] = len(pool)
+            pool.append(value)
+        codes[i] = code
+    return pool, codes
+
+
+class HotelTable:
+    """Scalar hotel fields as NumPy columns; see the module docstring."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.star_rating = arrays["star_rating"]
+        self.min_price = arrays["min_price"]
+        self.max_price = arrays["max_price"]
+        self.city = arrays["city"]
+        self.cities = [str(c) for c in arrays["cities"]]
+        self.currency = arrays["currency"]
+        self.currencies = [str(c) for c in arrays["currencies"]]
+        self.amenities = arrays["amenities"]
+        # Tables saved before coordinates existed have none
+        unknown = np.full(len(self.star_rating), np.nan, dtype=np.float32)
+        self.latitude = arrays.get("latitude", unknown)
+        self.longitude = arrays.get("longitude", unknown)
+        self._geo: Optional[GeoIndex] = None
+        self._city_codes = {city.lower(): code for code, city in enumerate(self.cities)}
+
+    def __len__(self) -> int:
+        return len(self.star_rating)
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "star_rating": self.star_rating,
+            "min_price": self.min_price,
+            "max_price": self.max_price,
+            "city": self.city,
+            "cities": np.array(self.cities, dtype=str),
+            "currency": self.currency,
+            "currencies": np.array(self.currencies, dtype=str),
+            "amenities": self.amenities,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+        }
+
+    @property
+    def geo(self) -> GeoIndex:
+        """Grid index over the coordinate columns; rows are table rows."""
+        if self._geo is None:
+            self._geo = GeoIndex(self.latitude, self.longitude)
+        return self._geo
+
+    @classmethod
+    def build(cls, hotels: Iterable[Dict[str, Any]]) -> "HotelTable":
+        """Columns for processed hotel records, in order."""
+        stars, min_prices, max_prices, cities, currencies, amenities = [], [], [], [], [], []
+        latitudes, longitudes = [], []
+        for hotel in hotels:
+            contact_info = hotel.get("contact_info") or {}
+            price_range = hotel.get("price_range") or {}
+            stars.append(hotel.get("star_rating") or 0)
+            min_prices.append(price_range.get("min_price") or 0.0)
+            max_prices.append(price_range.get("max_price") or 0.0)
+            cities.append(contact_info.get("city") or "")
+            currencies.append(price_range.get("currency") or "")
+            bits = 0
+            for amenity in hotel.get("amenities") or []:
+                if isinstance(amenity, dict) and amenity.get("is_available", True):
+                    bits |= AMENITY_BITS.get(amenity_key(amenity.get("name", "")), 0)
+            amenities.append(bits)
+            latitude, longitude = hotel.get("latitude"), hotel.get("longitude")
+            latitudes.append(np.nan if latitude is None else latitude)
+            longitudes.append(np.nan if longitude is None else longitude)
+
+        city_pool, city_codes = _pool_codes(cities)
+        currency_pool, currency_codes = _pool_codes(currencies)
+        return cls({
+            "star_rating": np.array(stars, dtype=np.int8),
+            "min_price": np.array(min_prices, dtype=np.float32),
+            "max_price": np.array(max_prices, dtype=np.float32),
+            "city": city_codes,
+            "cities": np.array(city_pool, dtype=str),
+            "currency": currency_codes,
+            "currencies": np.array(currency_pool, dtype=str),
+            "amenities": np.array(amenities, dtype=np.uint32),
+            "latitude": np.array(latitudes, dtype=np.float32),
+            "longitude": np.array(longitudes, dtype=np.float32),
+        })
+
+    @classmethod
+    def concat(cls, tables: Sequence["HotelTable"]) -> "HotelTable":
+        """Rows of ``tables`` one after another, string pools merged."""
+        if len(tables) == 1:
+            return tables[0]
+        arrays = {
+            name: np.concatenate([getattr(t, name) for t in tables])
+            for name in ("star_rating", "min_price", "max_price", "amenities", "latitude", "longitude")
+        }
+        for column, pool_name in (("city", "cities"), ("currency", "currencies")):
+            merged, seen, codes = [], {}, []
+            for table in tables:
+                remap = np.empty(len(getattr(table, pool_name)), dtype=np.int32)
+                for code, value in enumerate(getattr(table, pool_name)):
+                    if value.lower() not in seen:
+                        seen[value.lower()] = len(merged)
+                        merged.append(value)
+                    remap[code] = seen[value.lower()]
+                codes.append(remap[getattr(table, column)])
+            arrays[column] = np.concatenate(codes).astype(np.int32)
+            arrays[pool_name] = np.array(merged, dtype=str)
+        return cls(arrays)
+
+    def save(self, index_dir: str, file_name: str = TABLE_FILE) -> None:
+        out = Path(index_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        # Written through a handle so np.savez doesn't append another suffix
+        tmp = out / (file_name + ".tmp")
+        with open(tmp, 'wb') as f:
+            np.savez(f, **self._arrays())
+        tmp.replace(out / file_name)
+
+    @classmethod
+    def load(cls, index_dir: str, file_name: str = TABLE_FILE) -> "HotelTable":
+        with np.load(Path(index_dir) / file_name) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def mask(self, constraints: Optional[QueryConstraints]) -> np.ndarray:
+        """Boolean row mask of hotels that satisfy ``constraints``.
+
+        Mirrors ``QueryConstraints.matches``: unknown stars, prices or
+        coordinates never satisfy a bound on them.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if constraints is None:
+            return keep
+        if constraints.city:
+            code = self._city_codes.get(constraints.city.lower())
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+            keep &= self.city == code
+        if constraints.min_stars is not None:
+            keep &= self.star_rating >= constraints.min_stars
+        if constraints.max_stars is not None:
+            keep &= (self.star_rating > 0) & (self.star_rating <= constraints.max_stars)
+        if constraints.max_price is not None:
+            keep &= (self.min_price > 0) & (self.min_price <= constraints.max_price)
+        if constraints.amenities:
+            if any(key not in AMENITY_BITS for key in constraints.amenities):
+                return np.zeros(len(self), dtype=bool)
+            bits = np.uint32(sum(AMENITY_BITS[key] for key in set(constraints.amenities)))
+            keep &= (self.amenities & bits) == bits
+        if constraints.has_location():
+            keep &= self.geo.mask(constraints.latitude, constraints.longitude, constraints.radius_km)
+        return keep
+
+    def sort(self, rows: np.ndarray, by: str = "min_price", descending: bool = False) -> np.ndarray:
+        """``rows`` ordered by a numeric column; unknown (0) values go last either way."""
+        if by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {by!r}; choose one of {SORT_COLUMNS}")
+        values = getattr(self, by)[rows].astype(np.float64)
+        values[values <= 0] = np.nan
+        # argsort puts NaN last, so negate instead of reversing
+        order = np.argsort(-values if descending else values, kind="stable")
+        return np.asarray(rows)[order]
+
+    def select(
+        self,
+        constraints: Optional[QueryConstraints] = None,
+        sort: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        exclude: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Rows matching ``constraints`` (minus the ``exclude`` mask), optionally sorted and cut to ``limit``."""
+        keep = self.mask(constraints)
+        if exclude is not None:
+            keep &= ~exclude
+        rows = np.flatnonzero(keep)
+        if sort:
+            rows = self.sort(rows, sort, descending)
+        return rows[:limit] if limit is not None else rows
+
+
+def to_hotels(records: List[Dict[str, Any]]) -> List[Hotel]:
+    """Validate records as ``Hotel`` models in one batch; invalid records are logged and dropped."""
+    try:
+        return _HOTELS.validate_python(records)
+    except ValidationError as e:
+        bad = {error["loc"][0] for error in e.errors() if error["loc"]}
+        for i in sorted(bad):
+            logger.warning(f"Dropping hotel {records[i].get('id')!r} that is not a valid Hotel")
+        return _HOTELS.validate_python([record for i, record in enumerate(records) if i not in bad])
+
+
+def main():
+    from vector_store.retrieval import FaissBackend
+
+    parser = argparse.ArgumentParser(description="Filter and sort hotels in the FAISS index without a query")
+    parser.add_argument("--index-dir", default="faiss_index")
+    parser.add_argument("--city")
+    parser.add_argument("--min-stars", type=int)
+    parser.add_argument("--max-stars", type=int)
+    parser.add_argument("--max-price", type=float)
+    parser.add_argument("--amenity", action="append", default=[], choices=list(AMENITY_BITS))
+    parser.add_argument("--sort", choices=SORT_COLUMNS)
+    parser.add_argument("--descending", action="store_true")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    constraints = QueryConstraints(
+        city=args.city,
+        min_stars=args.min_stars,
+        max_stars=args.max_stars,
+        max_price=args.max_price,
+        amenities=args.amenity
+    )
+    for hotel in FaissBackend(args.index_dir).browse(constraints, args.sort, args.descending, args.k):
+        print(hotel.model_dump_json())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,89 @@
+import hashlib
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Fields that change on every scrape without the hotel itself changing
+VOLATILE_FIELDS = ("scraped_at", "created_at", "updated_at")
+
+
+def iter_hotels(file_path: str, read_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """Stream hotel records from a processed JSON array, NDJSON file or Parquet dataset.
+
+    Files are read in fixed-size pieces so memory stays proportional to a
+    single record rather than to the whole file.
+    """
+    path = Path(file_path)
+    if path.is_dir():
+        # Imported lazily so JSON-only callers don't need pyarrow
+        from scraping.hotel_dataset import iter_hotel_records
+        yield from iter_hotel_records(str(path))
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix in (".ndjson", ".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+        yield from _iter_json_array(f, read_size)
+
+
+def _iter_json_array(f, read_size: int) -> Iterator[Dict[str, Any]]:
+    """Incrementally decode the elements of a top-level JSON array."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    eof = False
+    started = False
+
+    while True:
+        buf = buf.lstrip()
+        if not started and buf:
+            if buf[0] != "[":
+                raise ValueError("Expected a JSON array of hotels")
+            buf = buf[1:]
+            started = True
+            continue
+        if started and buf.startswith(","):
+            buf = buf[1:]
+            continue
+        if started and buf.startswith("]"):
+            return
+
+        if started and buf:
+            try:
+                obj, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                buf = buf[end:]
+                continue
+
+        if eof:
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+        chunk = f.read(read_size)
+        if not chunk:
+            eof = True
+        buf += chunk
+
+
+def content_hash(hotel: Dict[str, Any]) -> str:
+    """Stable hash of a hotel's content, ignoring scrape timestamps."""
+    stable = {k: v for k, v in hotel.items() if k not in VOLATILE_FIELDS}
+    payload = json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of at most ``size`` items."""
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
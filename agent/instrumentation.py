@@ -0,0 +1,291 @@
+"""Lightweight timing spans, counters and histograms for the hot paths.
+
+    from agent.instrumentation import count, span
+
+    with span("retrieval.encode"):
+        embeddings = model.encode(texts)
+    count("retrieval.queries", len(texts))
+
+Every span feeds a per-name duration histogram. Inside ``trace()`` the spans
+of that one request are also kept as a nested timeline, optionally with a
+cProfile or pyinstrument profile, so tracing can be switched on for a single
+search. Metrics are exported as Prometheus text (``prometheus_text``) or
+JSON (``snapshot``).
+
+Collection is on unless ``HOTEL_METRICS=0``. When it is off and no trace
+is active, ``span`` returns a shared no-op context manager and ``count`` /
+``observe`` return immediately.
+"""
+import contextlib
+import contextvars
+import functools
+import io
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Seconds; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILERS = ("cprofile", "pyinstrument")
+
+_enabled = os.getenv("HOTEL_METRICS", "1") != "0"
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("hotel_trace", default=None)
+_NOOP = contextlib.nullcontext()
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """Thread-safe store of labelled counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def count(self, name: str, value: float = 1.0, labels: Labels = ()) -> None:
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and histogram summaries (count, sum, approximate p50/p99)."""
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'histograms': [
+                    {'name': name, 'labels': dict(labels), 'count': h.count, 'sum': h.sum,
+                     'p50': h.quantile(0.5), 'p99': h.quantile(0.99)}
+                    for (name, labels), h in sorted(self.histograms.items())
+                ],
+            }
+
+    def prometheus_text(self, prefix: str = "hotel") -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"{prefix}_{_metric_name(name)}_total"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                metric = f"{prefix}_{_metric_name(name)}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, bucket_count in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{metric}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {h.sum}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+REGISTRY = Registry()
+
+
+class Trace:
+    """Timeline of the spans entered while this trace was active."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.total_s: Optional[float] = None
+        self.profile: Optional[str] = None
+        self._depth = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'total_ms': self.total_s * 1000 if self.total_s is not None else None,
+            'spans': sorted(self.spans, key=lambda s: s['start_ms']),
+            'profile': self.profile,
+        }
+
+
+class _Span:
+    __slots__ = ("name", "labels", "start", "trace", "depth")
+
+    def __init__(self, name: str, labels: Labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "_Span":
+        self.trace = _current_trace.get()
+        if self.trace is not None:
+            self.depth = self.trace._depth
+            self.trace._depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        elapsed = time.perf_counter() - self.start
+        if _enabled:
+            REGISTRY.observe("span_seconds", elapsed, (("span", self.name),) + self.labels)
+        if self.trace is not None:
+            self.trace._depth -= 1
+            self.trace.spans.append({
+                'name': self.name,
+                'start_ms': (self.start - self.trace.started) * 1000,
+                'duration_ms': elapsed * 1000,
+                'depth': self.depth,
+            })
+        return False
+
+
+def span(name: str, **labels: str):
+    """Time a block as ``name``; a no-op unless metrics are on or a trace is active."""
+    if not _enabled and _current_trace.get() is None:
+        return _NOOP
+    return _Span(name, tuple(sorted(labels.items())))
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator form of ``span`` (defaults to the function's qualified name)."""
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled and _current_trace.get() is None:
+                return fn(*args, **kwargs)
+            with _Span(span_name, ()):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, value: float = 1.0, **labels: str) -> None:
+    if _enabled:
+        REGISTRY.count(name, value, tuple(sorted(labels.items())))
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    if _enabled:
+        REGISTRY.observe(name, value, tuple(sorted(labels.items())))
+
+
+def _start_profiler(profiler: Optional[str]):
+    if profiler is None:
+        return None
+    if profiler == "cprofile":
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+        return prof
+    if profiler == "pyinstrument":
+        # Optional dependency, only needed when asked for
+        from pyinstrument import Profiler
+        prof = Profiler()
+        prof.start()
+        return prof
+    raise ValueError(f"Unknown profiler {profiler!r}; expected one of {PROFILERS}")
+
+
+def _stop_profiler(profiler: Optional[str], prof, limit: int = 30) -> Optional[str]:
+    if prof is None:
+        return None
+    if profiler == "cprofile":
+        import pstats
+        prof.disable()
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+    prof.stop()
+    return prof.output_text()
+
+
+@contextlib.contextmanager
+def trace(name: str = "request", profiler: Optional[str] = None):
+    """Record the spans of the enclosed block (this thread only) as a ``Trace``.
+
+    ``profiler`` is ``None``, ``"cprofile"`` or ``"pyinstrument"`` (which
+    must be installed); its report ends up in ``Trace.profile``.
+    """
+    prof = _start_profiler(profiler)
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        current.profile = _stop_profiler(profiler, prof)
+        current.total_s = time.perf_counter() - current.started
+        _current_trace.reset(token)
+
+
+def snapshot() -> Dict[str, Any]:
+    return REGISTRY.snapshot()
+
+
+def prometheus_text() -> str:
+    return REGISTRY.prometheus_text()
@@ -1,11 +1,14 @@
 from pathlib import Path
 from typing import List, Dict, Any
 import logging
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
+import time
 import json
 
+from agent.ingest import iter_hotels, content_hash, chunked
+from agent.instrumentation import count, span, timed
+from agent.query_parser import amenity_key, amenity_field
+from vector_store.retrieval import ChromaBackend, RetrievalEngine, hotel_text, load_encoder
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -17,70 +20,206 @@ class HotelAgent:
     def __init__(self, data_dir: str = "../data"):
         """Initialize the hotel agent with necessary components."""
         self.data_dir = Path(data_dir)
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Hotel documents go through the shared on-disk cache so reloads
+        # only encode new or changed text
+        self.encoder = load_encoder('all-MiniLM-L6-v2', str(self.data_dir / "embedding_cache"))
+        self.model = self.encoder.model
         
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=str(self.data_dir / "vector_store")
-        )
-        self.collection = self.client.get_or_create_collection(
-            name="hotels",
-            metadata={"hnsw:space": "cosine"}
-        )
+        # Searches go through the shared retrieval engine over ChromaDB
+        self.engine = RetrievalEngine(ChromaBackend(str(self.data_dir)), self.encoder)
+        self.collection = self.engine.backend.collection
+        self.query_cache = self.engine.query_cache
         
-    def process_query(self, query: str) -> List[Dict[str, Any]]:
-        """Process a natural language query about hotels."""
-        # Generate query embedding
-        query_embedding = self.model.encode(query).tolist()
+    @timed("agent.process_query")
+    def process_query(self, query: str, n_results: int = 5, use_filters: bool = True) -> List[Dict[str, Any]]:
+        """Process a natural language query about hotels.
         
-        # Search the vector store
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=5
-        )
+        City, star rating, price ceiling and amenities mentioned in the query
+        are pushed into a Chroma ``where`` filter so the vector search only
+        scans matching hotels. "near X" / "within 5 km of X" pre-filters on
+        the spatial index over hotel coordinates (see ``agent.geo``).
+        """
+        return self.engine.search(query, n_results, use_filters)
+    
+    def nearby(self, place: str, n_results: int = 5, radius_km: float = None) -> List[Dict[str, Any]]:
+        """Hotels nearest to a gazetteer place, with ``distance_km``, without a vector search."""
+        return self.engine.nearby(place, n_results, radius_km)
+    
+    @timed("agent.process_queries")
+    def process_queries(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        use_filters: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """Answer several queries with one encoder call and one Chroma query per filter.
         
-        return self._format_results(results)
+        Repeated queries are answered from ``self.query_cache`` until the
+        collection changes.
+        """
+        return self.engine.search_many(queries, n_results, use_filters)
     
-    def _format_results(self, results: Dict) -> List[Dict[str, Any]]:
-        """Format the search results into a structured response."""
-        formatted_results = []
-        for i in range(len(results['ids'][0])):
-            metadata = results['metadatas'][0][i]
-            formatted_results.append({
-                'hotel_id': results['ids'][0][i],
-                'name': metadata.get('name', ''),
-                'description': metadata.get('description', ''),
-                'star_rating': metadata.get('star_rating'),
-                'contact_info': metadata.get('contact_info', {}),
-                'price_range': metadata.get('price_range', {}),
-                'amenities': metadata.get('amenities', []),
-                'distance': results['distances'][0][i] if 'distances' in results else None
-            })
-        return formatted_results
+    @staticmethod
+    def _hotel_text(hotel_data: Dict[str, Any]) -> str:
+        """Text that is embedded for a hotel."""
+        return hotel_text(hotel_data)
+    
+    @staticmethod
+    def _to_metadata(hotel_data: Dict[str, Any], hotel_hash: str = None) -> Dict[str, Any]:
+        """Flatten a hotel into Chroma-compatible scalar metadata."""
+        contact_info = hotel_data.get('contact_info') or {}
+        price_range = hotel_data.get('price_range') or {}
+        amenities = hotel_data.get('amenities') or []
+        city = contact_info.get('city')
+        metadata = {
+            'name': hotel_data.get('name', ''),
+            'description': hotel_data.get('description', ''),
+            'star_rating': hotel_data.get('star_rating'),
+            'city': city,
+            'city_key': city.lower() if city else None,
+            'region': contact_info.get('region'),
+            'min_price': price_range.get('min_price'),
+            'max_price': price_range.get('max_price'),
+            'currency': price_range.get('currency'),
+            'source': hotel_data.get('source'),
+            'contact_info': json.dumps(contact_info, ensure_ascii=False),
+            'price_range': json.dumps(price_range, ensure_ascii=False),
+            'amenities': json.dumps(amenities, ensure_ascii=False),
+            'latitude': hotel_data.get('latitude'),
+            'longitude': hotel_data.get('longitude'),
+            'content_hash': hotel_hash or content_hash(hotel_data),
+        }
+        # One boolean flag per known amenity so queries can filter on them
+        for amenity in amenities:
+            key = amenity_key(amenity.get('name', '')) if isinstance(amenity, dict) else None
+            if key and amenity.get('is_available', True):
+                metadata[amenity_field(key)] = True
+        # Chroma only accepts non-null scalar values
+        return {k: v for k, v in metadata.items() if v is not None}
+    
+    def _index_changed(self) -> None:
+        """Invalidate cached query results after the collection was modified."""
+        self.engine.invalidate()
     
     def add_hotel(self, hotel_data: Dict[str, Any]) -> None:
         """Add a new hotel to the vector store."""
         # Generate embedding for hotel description
-        description = f"{hotel_data['name']} {hotel_data['description']}"
-        embedding = self.model.encode(description).tolist()
+        embedding = self.encoder.encode(self._hotel_text(hotel_data)).tolist()
         
         # Add to collection
         self.collection.add(
             embeddings=[embedding],
-            metadatas=[hotel_data],
+            metadatas=[self._to_metadata(hotel_data)],
             ids=[str(hotel_data['id'])]
         )
+        self._index_changed()
+    
+    def bulk_load_processed_data(
+        self,
+        file_path: str,
+        batch_size: int = 64,
+        chunk_size: int = 1000
+    ) -> Dict[str, Any]:
+        """Stream, batch-encode and upsert processed hotels.
+        
+        Hotels whose id and content hash match what is already stored are
+        skipped, so reloading an unchanged file only costs a metadata lookup.
+        Repeated ids are counted as ``duplicates``; the last occurrence is
+        the one that is stored.
+        
+        Args:
+            file_path: Processed JSON array or NDJSON file
+            batch_size: Encoder batch size passed to SentenceTransformer.encode
+            chunk_size: Number of hotels per Chroma upsert
+        
+        Returns:
+            Load statistics including throughput in hotels/sec
+        """
+        stats = {'seen': 0, 'upserted': 0, 'skipped': 0, 'duplicates': 0}
+        start = time.perf_counter()
+        seen_ids = set()
+        
+        for chunk in chunked(iter_hotels(file_path), chunk_size):
+            stats['seen'] += len(chunk)
+            
+            # Last occurrence wins for ids repeated within a chunk
+            by_id = {str(hotel['id']): hotel for hotel in chunk}
+            stats['duplicates'] += len(chunk) - len(by_id) + len(seen_ids.intersection(by_id))
+            seen_ids.update(by_id)
+            hashes = {hotel_id: content_hash(hotel) for hotel_id, hotel in by_id.items()}
+            
+            with span("agent.bulk_load.lookup"):
+                existing = self.collection.get(ids=list(by_id), include=['metadatas'])
+            stored = {
+                hotel_id: (metadata or {}).get('content_hash')
+                for hotel_id, metadata in zip(existing['ids'], existing['metadatas'])
+            }
+            changed = [hotel_id for hotel_id in by_id if stored.get(hotel_id) != hashes[hotel_id]]
+            stats['skipped'] += len(by_id) - len(changed)
+            if not changed:
+                continue
+            
+            with span("agent.bulk_load.encode"):
+                embeddings = self.encoder.encode(
+                    [self._hotel_text(by_id[hotel_id]) for hotel_id in changed],
+                    batch_size=batch_size
+                )
+            with span("agent.bulk_load.upsert"):
+                self.collection.upsert(
+                    ids=changed,
+                    embeddings=embeddings.tolist(),
+                    metadatas=[self._to_metadata(by_id[hotel_id], hashes[hotel_id]) for hotel_id in changed]
+                )
+            stats['upserted'] += len(changed)
+            count("agent.hotels_upserted", len(changed))
+            self._index_changed()
+        
+        elapsed = time.perf_counter() - start
+        stats['seconds'] = elapsed
+        stats['hotels_per_sec'] = stats['seen'] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Bulk loaded {file_path}: {stats['upserted']} upserted, {stats['skipped']} unchanged, "
+            f"{stats['duplicates']} duplicate ids, "
+            f"{stats['hotels_per_sec']:.1f} hotels/sec, embedding cache {self.encoder.stats()}"
+        )
+        return stats
+    
+    def delete_hotels(self, hotel_ids: List[str]) -> None:
+        """Remove hotels that disappeared from the source listings."""
+        if hotel_ids:
+            self.collection.delete(ids=[str(hotel_id) for hotel_id in hotel_ids])
+            self._index_changed()
+            logger.info(f"Deleted {len(hotel_ids)} hotels from the vector store")
+    
+    def apply_removals(self, file_path: str) -> None:
+        """Delete the hotel ids listed in a ``removed_hotels_*.json`` file."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            self.delete_hotels(json.load(f))
     
-    def load_processed_data(self, file_path: str) -> None:
-        """Load processed hotel data from a JSON file."""
+    def load_processed_data(self, file_path: str, bulk: bool = False, **bulk_options) -> None:
+        """Load processed hotel data from a JSON file.
+        
+        With ``bulk=True`` the file is streamed through
+        ``bulk_load_processed_data``; ``bulk_options`` are passed through.
+        """
+        if bulk:
+            try:
+                self.bulk_load_processed_data(file_path, **bulk_options)
+            except Exception as e:
+                logger.error(f"Error loading data from {file_path}: {str(e)}")
+            return
+        
         try:
+            start = time.perf_counter()
             with open(file_path, 'r', encoding='utf-8') as f:
                 hotels = json.load(f)
             
             for hotel in hotels:
                 self.add_hotel(hotel)
                 
-            logger.info(f"Loaded {len(hotels)} hotels from {file_path}")
+            elapsed = time.perf_counter() - start
+            rate = len(hotels) / elapsed if elapsed > 0 else 0.0
+            logger.info(f"Loaded {len(hotels)} hotels from {file_path} ({rate:.1f} hotels/sec)")
             
         except Exception as e:
             logger.error(f"Error loading data from {file_path}: {str(e)}")
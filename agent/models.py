@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -24,6 +24,13 @@ class PriceRange(BaseModel):
     currency: str = "PKR"
     price_per_night: bool = True
 
+class Provenance(BaseModel):
+    """Model for one source listing merged into a hotel."""
+    source: str
+    source_id: str
+    url: Optional[str] = None
+    scraped_at: Optional[str] = None
+
 class Hotel(BaseModel):
     """Model for hotel information."""
     id: str
@@ -34,36 +41,41 @@ class Hotel(BaseModel):
     price_range: PriceRange
     amenities: List[Amenity]
     images: List[str] = []
+    provenance: List[Provenance] = []
+    # From the listing or the offline gazetteer (agent.geo); None when unknown
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "id": "hotel_123",
-                "name": "Skardu Grand Hotel",
-                "description": "Luxury hotel with mountain views",
-                "star_rating": 4,
-                "contact_info": {
-                    "phone": "+92-123-4567890",
-                    "email": "info@skardugrand.com",
-                    "website": "https://skardugrand.com",
-                    "address": "123 Main Street",
-                    "city": "Skardu",
-                    "region": "Gilgit-Baltistan"
-                },
-                "price_range": {
-                    "min_price": 5000,
-                    "max_price": 15000,
-                    "currency": "PKR",
-                    "price_per_night": True
-                },
-                "amenities": [
-                    {
-                        "name": "Wi-Fi",
-                        "description": "Free high-speed internet",
-                        "is_available": True
-                    }
-                ]
-            }
-        } 
\ No newline at end of file
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "id": "hotel_123",
+            "name": "Skardu Grand Hotel",
+            "description": "Luxury hotel with mountain views",
+            "star_rating": 4,
+            "contact_info": {
+                "phone": "+92-123-4567890",
+                "email": "info@skardugrand.com",
+                "website": "https://skardugrand.com",
+                "address": "123 Main Street",
+                "city": "Skardu",
+                "region": "Gilgit-Baltistan"
+            },
+            "price_range": {
+                "min_price": 5000,
+                "max_price": 15000,
+                "currency": "PKR",
+                "price_per_night": True
+            },
+            "amenities": [
+                {
+                    "name": "Wi-Fi",
+                    "description": "Free high-speed internet",
+                    "is_available": True
+                }
+            ],
+            "latitude": 35.2971,
+            "longitude": 75.6333
+        }
+    }) 
\ No newline at end of file
@@ -0,0 +1,223 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from agent.geo import NEAR_RADIUS_KM, bounding_box, haversine_km, load_gazetteer
+
+# Cities we scrape (see scripts/run_pipeline.py) plus common northern destinations
+KNOWN_CITIES = [
+    "Islamabad",
+    "Karachi",
+    "Lahore",
+    "Peshawar",
+    "Quetta",
+    "Skardu",
+    "Gilgit",
+    "Murree",
+    "Hunza",
+    "Naran",
+    "Swat",
+    "Chitral",
+    "Rawalpindi",
+    "Multan",
+    "Faisalabad",
+]
+
+# Canonical amenity key -> phrases that refer to it
+AMENITY_SYNONYMS = {
+    "wifi": ("wi-fi", "wifi", "wi fi", "internet"),
+    "parking": ("parking",),
+    "breakfast": ("breakfast",),
+    "restaurant": ("restaurant",),
+    "pool": ("swimming pool", "pool"),
+    "gym": ("gym", "fitness"),
+    "heating": ("heating", "heater"),
+    "air_conditioning": ("air conditioning", "air-conditioning", "air conditioned"),
+    "airport_shuttle": ("airport shuttle", "airport transfer", "airport pickup"),
+    "room_service": ("room service",),
+}
+
+_CITY_RE = re.compile(r'\b(' + '|'.join(re.escape(c) for c in KNOWN_CITIES) + r')\b', re.IGNORECASE)
+_AMENITY_RES = {
+    key: re.compile(r'\b(?:' + '|'.join(re.escape(p) for p in phrases) + r')\b', re.IGNORECASE)
+    for key, phrases in AMENITY_SYNONYMS.items()
+}
+_STAR_RANGE_RE = re.compile(r'\b([1-5])\s*(?:-|–|to)\s*([1-5])[\s-]*stars?\b', re.IGNORECASE)
+_STAR_MIN_RE = re.compile(
+    r'(?:\b(?:at least|minimum|min)\s*([1-5])[\s-]*stars?\b|\b([1-5])\s*\+[\s-]*stars?)', re.IGNORECASE
+)
+_STAR_MAX_RE = re.compile(
+    r'\b(?:up ?to|max(?:imum)?|at most|no more than)\s*([1-5])[\s-]*stars?\b', re.IGNORECASE
+)
+_STAR_EXACT_RE = re.compile(r'\b([1-5])[\s-]*stars?\b', re.IGNORECASE)
+_DISTANCE_UNIT = r'(?:km|kms|kilomet(?:er|re)s?|m|met(?:er|re)s?)\b'
+_PRICE_MAX_RE = re.compile(
+    r'\b(?:under|below|less than|cheaper than|max(?:imum)?|up ?to|within|budget(?: of)?)\s*'
+    # "within 5 km of ..." is a distance and "up to 4 stars" a star cap, not a budget
+    r'(?:pkr|rs\.?|rupees)?\s*(\d[\d,]*(?:\.\d+)?)(?![\d,]|\.\d|\s*' + _DISTANCE_UNIT + r'|\s*-?\s*stars?\b)'
+    r'\s*(k\b)?',
+    re.IGNORECASE
+)
+_RADIUS_RE = re.compile(
+    r'\b(\d+(?:\.\d+)?)\s*(' + _DISTANCE_UNIT + r')\s+(?:of|from)\s+(.+)', re.IGNORECASE
+)
+_NEAR_RE = re.compile(r'\b(?:near(?:by)?|close to|next to|around)\s+(.+)', re.IGNORECASE)
+
+
+class QueryConstraints(BaseModel):
+    """Structured constraints extracted from a free-text hotel query."""
+    city: Optional[str] = None
+    min_stars: Optional[int] = None
+    max_stars: Optional[int] = None
+    max_price: Optional[float] = None
+    amenities: List[str] = []
+    # Gazetteer place the hotels must be near, and the circle around it
+    near: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = None
+
+    def is_empty(self) -> bool:
+        return not (self.city or self.min_stars or self.max_stars or self.max_price or self.amenities
+                    or self.has_location())
+
+    def has_location(self) -> bool:
+        return self.latitude is not None and self.longitude is not None and self.radius_km is not None
+
+    def to_chroma_where(self) -> Optional[Dict[str, Any]]:
+        """Translate the constraints into a Chroma ``where`` metadata filter."""
+        clauses = []
+        if self.city:
+            clauses.append({"city_key": {"$eq": self.city.lower()}})
+        if self.min_stars is not None and self.min_stars == self.max_stars:
+            clauses.append({"star_rating": {"$eq": self.min_stars}})
+        elif self.min_stars is not None:
+            clauses.append({"star_rating": {"$gte": self.min_stars}})
+        if self.max_stars is not None and self.max_stars != self.min_stars:
+            clauses.append({"star_rating": {"$lte": self.max_stars}})
+        if self.max_price is not None:
+            # Unknown prices are stored as 0 and cannot satisfy a budget
+            clauses.append({"min_price": {"$gt": 0.0}})
+            clauses.append({"min_price": {"$lte": self.max_price}})
+        for amenity in self.amenities:
+            clauses.append({amenity_field(amenity): {"$eq": True}})
+        if self.has_location():
+            # The box around the circle; ``matches`` drops its corners
+            south, west, north, east = bounding_box(self.latitude, self.longitude, self.radius_km)
+            clauses.append({"latitude": {"$gte": south}})
+            clauses.append({"latitude": {"$lte": north}})
+            clauses.append({"longitude": {"$gte": west}})
+            clauses.append({"longitude": {"$lte": east}})
+
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+    def matches(self, hotel: Dict[str, Any]) -> bool:
+        """Check a processed hotel record in Python; mirrors ``to_chroma_where``."""
+        contact_info = hotel.get("contact_info") or {}
+        if self.city and (contact_info.get("city") or "").lower() != self.city.lower():
+            return False
+        stars = hotel.get("star_rating")
+        if self.min_stars is not None and (stars is None or stars < self.min_stars):
+            return False
+        if self.max_stars is not None and (stars is None or stars > self.max_stars):
+            return False
+        if self.max_price is not None:
+            min_price = (hotel.get("price_range") or {}).get("min_price") or 0.0
+            if not 0.0 < min_price <= self.max_price:
+                return False
+        if self.amenities:
+            available = {
+                amenity_key(a.get("name", "")) for a in hotel.get("amenities") or []
+                if isinstance(a, dict) and a.get("is_available", True)
+            }
+            if not set(self.amenities) <= available:
+                return False
+        if self.has_location():
+            lat, lon = hotel.get("latitude"), hotel.get("longitude")
+            if lat is None or lon is None:
+                return False
+            if haversine_km(self.latitude, self.longitude, lat, lon) > self.radius_km:
+                return False
+        return True
+
+
+def amenity_key(name: str) -> Optional[str]:
+    """Map a free-text amenity name to its canonical key, if known."""
+    for key, pattern in _AMENITY_RES.items():
+        if pattern.search(name or ""):
+            return key
+    return None
+
+
+def amenity_field(key: str) -> str:
+    """Metadata field that flags a canonical amenity."""
+    return f"amenity_{key}"
+
+
+def _parse_location(query: str, constraints: QueryConstraints) -> None:
+    """Fill the place and radius of "within 5 km of X" / "near X" when X is in the gazetteer."""
+    match = _RADIUS_RE.search(query)
+    if match:
+        radius = float(match.group(1))
+        if not match.group(2).lower().startswith("k"):
+            radius /= 1000
+        text = match.group(3)
+    else:
+        match = _NEAR_RE.search(query)
+        if not match:
+            return
+        radius, text = NEAR_RADIUS_KM, match.group(1)
+    place = load_gazetteer().find(text)
+    if place is not None and place.kind == "city":
+        # Hotels are only geocoded to places inside a city, so "near Skardu" means "in Skardu"
+        constraints.city = constraints.city or place.city
+    elif place is not None:
+        constraints.near = place.name
+        constraints.latitude, constraints.longitude = place.latitude, place.longitude
+        constraints.radius_km = radius
+
+
+def parse_query(query: str) -> QueryConstraints:
+    """Extract city, star range, price ceiling, amenities and location from a query.
+
+    Example:
+        >>> parse_query("3-star hotels in Skardu with Wi-Fi under PKR 5,000")
+        QueryConstraints(city='Skardu', min_stars=3, max_stars=3, max_price=5000.0, amenities=['wifi'], ...)
+        >>> parse_query("hotels within 5 km of Skardu airport").near
+        'Skardu Airport'
+    """
+    constraints = QueryConstraints()
+
+    match = _CITY_RE.search(query)
+    if match:
+        constraints.city = next(c for c in KNOWN_CITIES if c.lower() == match.group(1).lower())
+
+    match = _STAR_RANGE_RE.search(query)
+    if match:
+        low, high = sorted((int(match.group(1)), int(match.group(2))))
+        constraints.min_stars, constraints.max_stars = low, high
+    elif _STAR_MIN_RE.search(query):
+        match = _STAR_MIN_RE.search(query)
+        constraints.min_stars = int(match.group(1) or match.group(2))
+    elif _STAR_MAX_RE.search(query):
+        constraints.max_stars = int(_STAR_MAX_RE.search(query).group(1))
+    else:
+        match = _STAR_EXACT_RE.search(query)
+        if match:
+            constraints.min_stars = constraints.max_stars = int(match.group(1))
+
+    match = _PRICE_MAX_RE.search(query)
+    if match:
+        price = float(match.group(1).replace(",", ""))
+        if match.group(2):
+            price *= 1000
+        constraints.max_price = price
+
+    constraints.amenities = [key for key, pattern in _AMENITY_RES.items() if pattern.search(query)]
+    _parse_location(query, constraints)
+    return constraints
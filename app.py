@@ -1,38 +1,52 @@
 # app.py
+import contextlib
+
 import streamlit as st
-import faiss
-import pickle
-import numpy as np
-from sentence_transformers import SentenceTransformer
+from agent.instrumentation import span, trace
+from vector_store.retrieval import get_engine
 
-# --- Load model, docs, index ---
+# --- Load model, docs, index (once per process, hot-swapped when a new generation is published) ---
 @st.cache_resource
-def load_resources():
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    index = faiss.read_index("faiss_index/index.bin")
-    with open("faiss_index/docs.pkl", "rb") as f:
-        docs = pickle.load(f)
-    return model, index, docs
+def load_engine():
+    # Index type and nprobe/efSearch come from the live generation's index_config.json;
+    # documents are memory-mapped and only returned rows are decoded
+    engine = get_engine("faiss", index_dir="faiss_index")
+    # Rebuilds publish a new generation; load it in the background and swap
+    engine.backend.watch()
+    return engine
 
-model, index, docs = load_resources()
+engine = load_engine()
 
 # --- Search Function ---
 def search_hotels(user_query, top_k=5):
-    query_embedding = model.encode([user_query])
-    D, I = index.search(np.array(query_embedding), top_k)
-    results = [docs[i] for i in I[0]]
-    return results
+    return engine.search(user_query, top_k)
 
 # --- Streamlit UI ---
 st.title("🏨 Hotel Finder for Skardu")
 st.markdown("Search hotels and schedule a call 📅")
 
 user_query = st.text_input("🔎 Enter your hotel search query")
+profile = st.sidebar.checkbox("Trace this search (cProfile)")
 
 if user_query:
-    with st.spinner("Searching hotels..."):
-        results = search_hotels(user_query)
-        for hotel in results:
-            st.write("🏨", hotel)
-            st.markdown("[📅 Schedule](https://calendly.com/your-schedule-link)", unsafe_allow_html=True)
-            st.markdown("---")
\ No newline at end of file
+    # Tracing is per search: only runs with the box ticked pay for the profiler
+    with (trace("app.search", profiler="cprofile") if profile else contextlib.nullcontext()) as search_trace:
+        with st.spinner("Searching hotels..."):
+            with span("app.search"):
+                results = search_hotels(user_query)
+        with span("app.render"):
+            for hotel in results:
+                contact = hotel["contact_info"]
+                st.subheader(f"🏨 {hotel['name']}")
+                st.write(f"📍 {contact['address']}, {contact['city']}")
+                if hotel["price_range"]["min_price"]:
+                    st.write(f"💰 {hotel['price_range']['currency']} {hotel['price_range']['min_price']:,.0f}")
+                if contact.get("website"):
+                    st.markdown(f"[🔗 Listing]({contact['website']})")
+                st.markdown("[📅 Schedule](https://calendly.com/your-schedule-link)", unsafe_allow_html=True)
+                st.markdown("---")
+    if search_trace is not None:
+        with st.expander(f"⏱️ Trace ({search_trace.total_s * 1000:.1f} ms)"):
+            trace_data = search_trace.to_dict()
+            st.json(trace_data['spans'])
+            st.code(trace_data['profile'] or "")
\ No newline at end of file
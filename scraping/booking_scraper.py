@@ -1,16 +1,27 @@
 # scraper/booking_scraper.py
 
 import os
-import time
 import pandas as pd
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 
+from agent.instrumentation import count, span
+from scraping.price_history import DEFAULT_STORE_DIR, append_observations
 
-def init_driver():
+BOOKING_BASE_URL = "https://www.booking.com"
+PROPERTY_CARD = "div[data-testid='property-card']"
+PAGE_SIZE = 25
+
+
+def init_driver(headless: bool = False):
     options = Options()
-    # Headless mode disabled so you can see the browser
+    if headless:
+        options.add_argument('--headless=new')
+    # Otherwise headless mode is disabled so you can see the browser
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
     options.add_argument('--disable-blink-features=AutomationControlled')
@@ -18,59 +29,99 @@ def init_driver():
     return driver
 
 
-def scrape_booking(city: str, max_pages: int = 1, delay: int = 5):
+def search_url(city: str, page: int = 0, base_url: str = BOOKING_BASE_URL) -> str:
+    """Search-results URL for one page of a city."""
+    return f"{base_url}/searchresults.html?ss={city}&rows={PAGE_SIZE}&offset={page * PAGE_SIZE}"
+
+
+def wait_for_listings(driver, timeout: float = 10) -> bool:
+    """
+    Wait until property cards are present instead of sleeping a fixed time.
+    :return: False if no cards appeared within the timeout
+    """
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, PROPERTY_CARD))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def parse_listings(driver, city: str) -> list:
+    """
+    Extract listing dicts from the property cards on the current page.
+    """
+    hotels = []
+    for hotel in driver.find_elements(By.CSS_SELECTOR, PROPERTY_CARD):
+        try:
+            name = hotel.find_element(By.CSS_SELECTOR, "div[data-testid='title']").text
+            location = hotel.find_element(By.CSS_SELECTOR, "span[data-testid='address']").text
+            url = hotel.find_element(By.TAG_NAME, "a").get_attribute("href")
+
+            try:
+                price = hotel.find_element(By.CSS_SELECTOR, "span[data-testid='price-and-discounted-price']").text
+            except:
+                price = "N/A"
+
+            try:
+                rating = hotel.find_element(By.CSS_SELECTOR, "div[data-testid='review-score'] > div").text
+            except:
+                rating = "N/A"
+
+            hotels.append({
+                "hotel_name": name,
+                "location": location,
+                "price": price,
+                "rating": rating,
+                "url": url,
+                "city": city
+            })
+        except Exception as e:
+            print(f"[!] Skipped one listing due to: {e}")
+    return hotels
+
+
+def scrape_booking(city: str, max_pages: int = 1, delay: int = 5, headless: bool = False,
+                   base_url: str = BOOKING_BASE_URL, price_history_dir: str = DEFAULT_STORE_DIR):
     """
     Scrapes Booking.com for hotel data in a given city.
     :param city: City name (e.g., 'Skardu')
     :param max_pages: Number of pages to scrape
-    :param delay: Delay (in seconds) to allow page to load
+    :param delay: Maximum time (in seconds) to wait for listings to load
+    :param headless: Run Chrome without a window
+    :param base_url: Site root, overridable to point at a local fixture server
+    :param price_history_dir: Price-history dataset the listing prices are appended to
+        (the CSV only keeps the latest run); None to skip
     :return: DataFrame with hotel data
     """
-    driver = init_driver()
-    base_url = f"https://www.booking.com/searchresults.html?ss={city}&rows=25"
+    driver = init_driver(headless=headless)
     hotels = []
 
-    for page in range(max_pages):
-        url = base_url + f"&offset={page * 25}"
-        print(f"[+] Scraping page {page+1}: {url}")
-        driver.get(url)
-        time.sleep(delay)
+    try:
+        for page in range(max_pages):
+            url = search_url(city, page, base_url)
+            print(f"[+] Scraping page {page+1}: {url}")
+            with span("scrape.page_load", fetcher="browser"):
+                driver.get(url)
+                found = wait_for_listings(driver, timeout=delay)
+            if not found:
+                print(f"[!] No listings on page {page+1}, stopping")
+                break
+            with span("scrape.parse", fetcher="browser"):
+                hotels.extend(parse_listings(driver, city))
+            count("scrape.pages", fetcher="browser")
+    finally:
+        driver.quit()
 
-        listings = driver.find_elements(By.CSS_SELECTOR, "div[data-testid='property-card']")
-
-        for hotel in listings:
-            try:
-                name = hotel.find_element(By.CSS_SELECTOR, "div[data-testid='title']").text
-                location = hotel.find_element(By.CSS_SELECTOR, "span[data-testid='address']").text
-                url = hotel.find_element(By.TAG_NAME, "a").get_attribute("href")
-
-                try:
-                    price = hotel.find_element(By.CSS_SELECTOR, "span[data-testid='price-and-discounted-price']").text
-                except:
-                    price = "N/A"
-
-                try:
-                    rating = hotel.find_element(By.CSS_SELECTOR, "div[data-testid='review-score'] > div").text
-                except:
-                    rating = "N/A"
-
-                hotels.append({
-                    "hotel_name": name,
-                    "location": location,
-                    "price": price,
-                    "rating": rating,
-                    "url": url,
-                    "city": city
-                })
-            except Exception as e:
-                print(f"[!] Skipped one listing due to: {e}")
-
-    driver.quit()
-
-    df = pd.DataFrame(hotels)
-    os.makedirs("data", exist_ok=True)
-    filename = f"data/{city.lower().replace(' ', '_')}_hotels.csv"
-    df.to_csv(filename, index=False)
+    with span("scrape.write"):
+        df = pd.DataFrame(hotels)
+        os.makedirs("data", exist_ok=True)
+        filename = f"data/{city.lower().replace(' ', '_')}_hotels.csv"
+        df.to_csv(filename, index=False)
+    if price_history_dir:
+        with span("scrape.record_prices"):
+            append_observations(hotels, price_history_dir)
     print(f"[✓] Scraped {len(df)} hotels. Data saved to: {filename}")
     return df
 
@@ -0,0 +1,213 @@
+"""Persistent crawl state for incremental, resumable scraping.
+
+A sqlite database records, per search-results URL, when it was fetched,
+its ETag/Last-Modified validators, a hash of the listings it contained and
+which hotels were on it; per hotel, its content hash and the last run that
+saw it; and per run, how far each city got. With that a crawl can:
+
+* resume an interrupted run at the next unfinished page,
+* send conditional requests and skip pages whose listings did not change,
+* emit only added/changed hotels plus the ids of removed ones.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.ingest import content_hash
+
+
+class CrawlState:
+    def __init__(self, db_path: str = "data/crawl_state.sqlite"):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT NOT NULL,
+                finished_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS run_cities (
+                run_id INTEGER NOT NULL,
+                city TEXT NOT NULL,
+                next_page INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, city)
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                city TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                fetched_at TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                hotel_ids TEXT NOT NULL DEFAULT '[]'
+            );
+            CREATE TABLE IF NOT EXISTS hotels (
+                hotel_id TEXT PRIMARY KEY,
+                city TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                first_seen_run INTEGER NOT NULL,
+                last_seen_run INTEGER NOT NULL,
+                removed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS hotels_city ON hotels (city, last_seen_run);
+            CREATE TABLE IF NOT EXISTS pending (
+                run_id INTEGER NOT NULL,
+                city TEXT NOT NULL,
+                hotel_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (run_id, hotel_id)
+            );
+        """)
+        self._conn.commit()
+
+    def start_run(self, cities: List[str]) -> int:
+        """Resume the latest unfinished run, or start a new one for ``cities``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1"
+            ).fetchone()
+            if row:
+                run_id = row[0]
+            else:
+                run_id = self._conn.execute(
+                    "INSERT INTO runs (started_at) VALUES (?)", (datetime.now().isoformat(),)
+                ).lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO run_cities (run_id, city) VALUES (?, ?)",
+                [(run_id, city) for city in cities]
+            )
+            self._conn.commit()
+            return run_id
+
+    def city_progress(self, run_id: int, city: str) -> Tuple[int, bool]:
+        """(next page to fetch, whether the city already finished) for a run."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT next_page, done FROM run_cities WHERE run_id = ? AND city = ?", (run_id, city)
+            ).fetchone()
+        return (row[0], bool(row[1])) if row else (0, False)
+
+    def validators(self, url: str) -> Dict[str, Optional[str]]:
+        """Stored ETag, Last-Modified and listing hash for a URL."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return {'etag': None, 'last_modified': None, 'content_hash': None}
+        return {'etag': row[0], 'last_modified': row[1], 'content_hash': row[2]}
+
+    def page_unchanged(self, run_id: int, city: str, url: str, page: int) -> None:
+        """Mark every hotel last seen on an unchanged page as seen in this run."""
+        with self._lock:
+            row = self._conn.execute("SELECT hotel_ids FROM pages WHERE url = ?", (url,)).fetchone()
+            hotel_ids = json.loads(row[0]) if row else []
+            self._conn.executemany(
+                "UPDATE hotels SET last_seen_run = ?, removed = 0 WHERE hotel_id = ?",
+                [(run_id, hotel_id) for hotel_id in hotel_ids]
+            )
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ? WHERE url = ?", (datetime.now().isoformat(), url)
+            )
+            self._advance(run_id, city, page)
+            self._conn.commit()
+
+    def page_fetched(self, run_id: int, city: str, url: str, page: int, hotels: List[Dict[str, Any]],
+                     etag: str = None, last_modified: str = None, listing_hash: str = None) -> int:
+        """Record a fetched page and queue its added/changed hotels.
+
+        Returns the number of hotels that were added or changed.
+        """
+        changed = 0
+        with self._lock:
+            for hotel in hotels:
+                hotel_id = str(hotel['id'])
+                new_hash = content_hash(hotel)
+                row = self._conn.execute(
+                    "SELECT content_hash, removed FROM hotels WHERE hotel_id = ?", (hotel_id,)
+                ).fetchone()
+                if row is None or row[0] != new_hash or row[1]:
+                    changed += 1
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO pending (run_id, city, hotel_id, payload) VALUES (?, ?, ?, ?)",
+                        (run_id, city, hotel_id, json.dumps(hotel, ensure_ascii=False))
+                    )
+                self._conn.execute(
+                    """INSERT INTO hotels (hotel_id, city, page, content_hash, first_seen_run, last_seen_run)
+                       VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (hotel_id) DO UPDATE SET
+                           city = excluded.city, page = excluded.page,
+                           content_hash = excluded.content_hash,
+                           last_seen_run = excluded.last_seen_run, removed = 0""",
+                    (hotel_id, city, page, new_hash, run_id, run_id)
+                )
+            self._conn.execute(
+                """INSERT OR REPLACE INTO pages
+                   (url, city, page, fetched_at, etag, last_modified, content_hash, hotel_ids)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (url, city, page, datetime.now().isoformat(), etag, last_modified, listing_hash,
+                 json.dumps([str(h['id']) for h in hotels]))
+            )
+            self._advance(run_id, city, page)
+            self._conn.commit()
+        return changed
+
+    def _advance(self, run_id: int, city: str, page: int) -> None:
+        self._conn.execute(
+            "UPDATE run_cities SET next_page = ? WHERE run_id = ? AND city = ?", (page + 1, run_id, city)
+        )
+
+    def pending_hotels(self, run_id: int, city: str) -> List[Dict[str, Any]]:
+        """Added/changed hotels queued for a city in this run."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM pending WHERE run_id = ? AND city = ?", (run_id, city)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def finish_city(self, run_id: int, city: str, pages_scanned: int) -> List[str]:
+        """Close a city for this run: clear its queue and mark unseen hotels removed.
+
+        Only hotels last seen on one of the first ``pages_scanned`` pages are
+        considered, so a shallower crawl does not delete deeper listings.
+
+        Returns the ids of hotels removed in this run.
+        """
+        with self._lock:
+            removed = [row[0] for row in self._conn.execute(
+                """SELECT hotel_id FROM hotels
+                   WHERE city = ? AND last_seen_run != ? AND removed = 0 AND page < ?""",
+                (city, run_id, pages_scanned)
+            )]
+            self._conn.executemany(
+                "UPDATE hotels SET removed = 1 WHERE hotel_id = ?", [(hotel_id,) for hotel_id in removed]
+            )
+            self._conn.execute("DELETE FROM pending WHERE run_id = ? AND city = ?", (run_id, city))
+            self._conn.execute(
+                "UPDATE run_cities SET done = 1 WHERE run_id = ? AND city = ?", (run_id, city)
+            )
+            self._conn.commit()
+        return removed
+
+    def finish_run(self, run_id: int) -> None:
+        """Mark a run finished once every city in it is done."""
+        with self._lock:
+            remaining = self._conn.execute(
+                "SELECT COUNT(*) FROM run_cities WHERE run_id = ? AND done = 0", (run_id,)
+            ).fetchone()[0]
+            if remaining == 0:
+                self._conn.execute(
+                    "UPDATE runs SET finished_at = ? WHERE run_id = ?", (datetime.now().isoformat(), run_id)
+                )
+                self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,11 +1,24 @@
 import logging
 from pathlib import Path
 import json
+import os
+import shutil
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 import re
 
+from agent.geo import coordinates
+from agent.ingest import iter_hotels, chunked
+from agent.instrumentation import count, span
+from scraping.dedup import dedupe
+from scraping.hotel_dataset import append_hotels
+from scraping.price_history import observed_price_ranges
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -13,34 +26,294 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Compiled once instead of on every field of every hotel
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s.,-]')
+
+# CSV columns of a processed hotel, in the order _process_hotel builds it
+PROCESSED_COLUMNS = [
+    "id", "name", "description", "star_rating", "contact_info", "price_range", "amenities",
+    "images", "source", "scraped_at", "latitude", "longitude",
+]
+# Per-raw-file Parquet parts wait here until the file is done; dataset
+# readers skip directories starting with "_"
+STAGING_DIR = "_staging"
+
 class HotelDataProcessor:
-    def __init__(self, raw_data_dir: str = "../data/raw", processed_data_dir: str = "../data/processed"):
-        """Initialize the data processor."""
+    def __init__(self, raw_data_dir: str = "../data/raw", processed_data_dir: str = "../data/processed",
+                 write_parquet: bool = True, deduplicate: bool = True, price_history_dir: Optional[str] = None):
+        """Initialize the data processor.
+        
+        With ``write_parquet`` every run also appends to the typed Parquet
+        dataset in ``<processed_data_dir>/hotels_parquet`` (see
+        ``scraping.hotel_dataset``). With ``deduplicate`` listings of the
+        same property from different sources are merged before saving (see
+        ``scraping.dedup``). With ``price_history_dir`` a hotel's missing
+        price bounds come from the prices observed for it over the last 30
+        days (see ``scraping.price_history``).
+        """
         self.raw_data_dir = Path(raw_data_dir)
         self.processed_data_dir = Path(processed_data_dir)
         self.processed_data_dir.mkdir(parents=True, exist_ok=True)
+        self.write_parquet = write_parquet
+        self.deduplicate = deduplicate
+        self.dataset_dir = self.processed_data_dir / "hotels_parquet"
+        self.price_history_dir = price_history_dir
+        
+    def process_all_files(self, incremental: bool = False):
+        """Process all raw data files in the raw data directory.
         
-    def process_all_files(self):
-        """Process all raw data files in the raw data directory."""
-        raw_files = list(self.raw_data_dir.glob("*.json"))
+        With ``incremental=True`` only raw files not seen by a previous run are
+        processed (tracked in ``processed_files.json``), and removed-hotel ids
+        from ``raw/deltas/`` are collected into ``removed_hotels_<ts>.json``.
+        """
+        raw_files, manifest = self._select_raw_files(["*.json"], incremental)
+        if not raw_files:
+            return []
         all_hotels = []
         
         for file_path in raw_files:
             try:
                 logger.info(f"Processing {file_path}")
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    hotels = json.load(f)
+                with span("process.read"):
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        hotels = json.load(f)
                 
-                processed_hotels = [self._process_hotel(hotel) for hotel in hotels]
-                processed_hotels = [h for h in processed_hotels if h is not None]
+                with span("process.normalize"):
+                    processed_hotels = [self._process_hotel(hotel) for hotel in hotels]
+                    processed_hotels = [h for h in processed_hotels if h is not None]
                 all_hotels.extend(processed_hotels)
+                count("process.hotels", len(processed_hotels))
+                count("process.skipped", len(hotels) - len(processed_hotels))
                 
             except Exception as e:
                 logger.error(f"Error processing {file_path}: {str(e)}")
+                continue
+            manifest[file_path.name] = self._file_signature(file_path)
         
-        self._save_processed_data(all_hotels)
+        if self.deduplicate:
+            with span("process.dedupe"):
+                all_hotels, stats = dedupe(all_hotels)
+            logger.info(f"Merged {stats['input'] - stats['output']} duplicate listings "
+                        f"into {stats['merged_clusters']} hotels")
+        with span("process.save"):
+            self._save_processed_data(all_hotels)
+        if incremental:
+            self._save_manifest(manifest)
         return all_hotels
     
+    def process_all_files_streaming(
+        self,
+        workers: Optional[int] = None,
+        chunk_size: int = 5000,
+        incremental: bool = False
+    ) -> Dict[str, Any]:
+        """Process raw JSON/NDJSON files with flat memory use.
+        
+        Raw files are read incrementally and cut into chunks that are
+        normalized in a process pool. Results are appended to an NDJSON and a
+        CSV file in input order as chunks complete. At most ``2 * workers``
+        chunks are in flight, so peak memory does not depend on input size.
+        Duplicate listings are not merged here since that needs every hotel
+        at once; run ``python -m scraping.dedup`` on the NDJSON output.
+        
+        Args:
+            workers: Worker processes (defaults to the CPU count; 1 runs inline)
+            chunk_size: Hotels per unit of work
+            incremental: Only process raw files not seen by a previous run
+        
+        Returns:
+            Statistics including throughput in hotels/sec and the output path
+        """
+        workers = workers or os.cpu_count() or 1
+        raw_files, manifest = self._select_raw_files(["*.json", "*.ndjson", "*.jsonl"], incremental)
+        stats = {'read': 0, 'processed': 0, 'skipped': 0}
+        if not raw_files:
+            return stats
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        json_path = self.processed_data_dir / f"processed_hotels_{timestamp}.ndjson"
+        csv_path = self.processed_data_dir / f"processed_hotels_{timestamp}.csv"
+        start = time.perf_counter()
+        
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        
+        with open(json_path, 'w', encoding='utf-8') as json_file, \
+                open(csv_path, 'w', encoding='utf-8', newline='') as csv_file:
+            # Every chunk is reindexed to these columns, so one header fits all
+            csv_file.write(pd.DataFrame(columns=PROCESSED_COLUMNS).to_csv(index=False, lineterminator="\n"))
+            try:
+                for file_path in raw_files:
+                    logger.info(f"Processing {file_path}")
+                    try:
+                        read, processed = self._stream_file(file_path, executor, workers, chunk_size,
+                                                            json_file, csv_file)
+                    except Exception as e:
+                        # Nothing of a failed file reaches the outputs, so a rerun starts it cleanly
+                        logger.error(f"Error processing {file_path}: {str(e)}")
+                        continue
+                    stats['read'] += read
+                    stats['processed'] += processed
+                    manifest[file_path.name] = self._file_signature(file_path)
+            finally:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+        
+        if incremental:
+            self._save_manifest(manifest)
+        elapsed = time.perf_counter() - start
+        stats['skipped'] = stats['read'] - stats['processed']
+        stats['seconds'] = elapsed
+        stats['hotels_per_sec'] = stats['read'] / elapsed if elapsed > 0 else 0.0
+        stats['output'] = str(json_path)
+        logger.info(
+            f"Streamed {stats['processed']} processed hotels to {json_path} "
+            f"({stats['hotels_per_sec']:.0f} hotels/sec, {workers} workers)"
+        )
+        return stats
+    
+    def _stream_file(self, file_path: Path, executor: Optional[ProcessPoolExecutor], workers: int,
+                     chunk_size: int, json_file, csv_file):
+        """Process one raw file into temporary outputs and append them only once it is done.
+        
+        NDJSON and CSV rows are buffered in ``.part`` files next to the
+        outputs and Parquet parts in a staging directory of the dataset; if
+        the file fails partway all of them are discarded.
+        
+        Returns:
+            (hotels read, valid hotels written)
+        """
+        token = uuid.uuid4().hex
+        staging = self.dataset_dir / STAGING_DIR / token if self.write_parquet else None
+        json_part = Path(json_file.name).with_name(f".{token}.ndjson.part")
+        csv_part = Path(csv_file.name).with_name(f".{token}.csv.part")
+        pending = deque()
+        read = processed = 0
+        try:
+            with open(json_part, 'w+', encoding='utf-8') as json_tmp, \
+                    open(csv_part, 'w+', encoding='utf-8', newline='') as csv_tmp:
+                def drain(result):
+                    nonlocal processed
+                    # Chunks are normalized in worker processes, whose metrics
+                    # stay there; the parent times waiting for and writing them
+                    with span("process.wait_chunk"):
+                        valid, ndjson, csv_rows = result.result() if executor else result
+                    processed += valid
+                    count("process.hotels", valid)
+                    with span("process.write_chunk"):
+                        json_tmp.write(ndjson)
+                        csv_tmp.write(csv_rows)
+                
+                for chunk in chunked(iter_hotels(str(file_path)), chunk_size):
+                    read += len(chunk)
+                    dataset_dir = str(staging) if staging else None
+                    if executor is None:
+                        drain(self._process_chunk(chunk, dataset_dir))
+                        continue
+                    pending.append(executor.submit(self._process_chunk, chunk, dataset_dir))
+                    if len(pending) >= 2 * workers:
+                        drain(pending.popleft())
+                while pending:
+                    drain(pending.popleft())
+                
+                with span("process.commit_file"):
+                    for tmp, out in ((json_tmp, json_file), (csv_tmp, csv_file)):
+                        tmp.seek(0)
+                        shutil.copyfileobj(tmp, out)
+                        out.flush()
+                    if staging is not None and staging.exists():
+                        for part in staging.rglob("*.parquet"):
+                            target = self.dataset_dir / part.relative_to(staging)
+                            target.parent.mkdir(parents=True, exist_ok=True)
+                            os.replace(part, target)
+        finally:
+            for future in pending:
+                future.cancel()
+            for future in pending:
+                # Chunks already running may still write into the staging directory
+                if not future.cancelled():
+                    future.exception()
+            json_part.unlink(missing_ok=True)
+            csv_part.unlink(missing_ok=True)
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+                try:
+                    staging.parent.rmdir()
+                except OSError:
+                    # Another file is still staged there
+                    pass
+        return read, processed
+    
+    def _process_chunk(self, hotels: List[Dict[str, Any]], dataset_dir: Optional[str] = None):
+        """Normalize and serialize a chunk of hotels (runs in worker processes).
+        
+        Serializing (and appending to the Parquet dataset at ``dataset_dir``)
+        here keeps the parent process down to plain writes.
+        
+        Returns:
+            (number of valid hotels, NDJSON text, CSV rows in ``PROCESSED_COLUMNS`` order without header)
+        """
+        processed = [h for h in (self._process_hotel(hotel) for hotel in hotels) if h is not None]
+        if not processed:
+            return 0, "", ""
+        if dataset_dir:
+            # Each chunk becomes its own part file, so workers append in parallel
+            append_hotels(processed, dataset_dir)
+        ndjson = "".join(json.dumps(h, ensure_ascii=False) + "\n" for h in processed)
+        csv_rows = pd.DataFrame(processed).reindex(columns=PROCESSED_COLUMNS).to_csv(
+            index=False, header=False, lineterminator="\n")
+        return len(processed), ndjson, csv_rows
+    
+    def _select_raw_files(self, patterns: List[str], incremental: bool):
+        """Raw files to process and the manifest to update.
+        
+        For incremental runs, files recorded in the manifest with the same
+        size and mtime are skipped and pending removal deltas are collected.
+        """
+        raw_files = sorted({p for pattern in patterns for p in self.raw_data_dir.glob(pattern)})
+        manifest = {}
+        if incremental:
+            manifest = self._load_manifest()
+            raw_files = [p for p in raw_files if manifest.get(p.name) != self._file_signature(p)]
+            self._save_removed_ids(manifest)
+            if not raw_files:
+                logger.info("No new raw files to process")
+                self._save_manifest(manifest)
+        return raw_files, manifest
+    
+    @staticmethod
+    def _file_signature(path: Path) -> List[float]:
+        stat = path.stat()
+        return [stat.st_size, stat.st_mtime]
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        manifest_path = self.processed_data_dir / "processed_files.json"
+        if not manifest_path.exists():
+            return {}
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        with open(self.processed_data_dir / "processed_files.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+    
+    def _save_removed_ids(self, manifest: Dict[str, Any]):
+        """Collect removed-hotel ids from unseen delta files into one output file."""
+        removed = []
+        for path in sorted((self.raw_data_dir / "deltas").glob("removed_*.json")):
+            key = f"deltas/{path.name}"
+            if manifest.get(key) == self._file_signature(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                removed.extend(json.load(f))
+            manifest[key] = self._file_signature(path)
+        
+        if removed:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            removed_path = self.processed_data_dir / f"removed_hotels_{timestamp}.json"
+            with open(removed_path, 'w', encoding='utf-8') as f:
+                json.dump(removed, f)
+            logger.info(f"Saved {len(removed)} removed hotel ids to {removed_path}")
+    
     def _process_hotel(self, hotel: Dict[str, Any]) -> Dict[str, Any]:
         """Process a single hotel entry."""
         try:
@@ -51,7 +324,7 @@ class HotelDataProcessor:
                 "description": self._clean_text(hotel.get("description", "")),
                 "star_rating": self._normalize_rating(hotel.get("star_rating")),
                 "contact_info": self._process_contact_info(hotel.get("contact_info", {})),
-                "price_range": self._process_price_range(hotel.get("price_range", {})),
+                "price_range": self._process_price_range(hotel.get("price_range", {}), hotel.get("id")),
                 "amenities": self._process_amenities(hotel.get("amenities", [])),
                 "images": hotel.get("images", []),
                 "source": hotel.get("source", "unknown"),
@@ -62,7 +335,10 @@ class HotelDataProcessor:
             if not all([processed["name"], processed["contact_info"]["city"]]):
                 logger.warning(f"Skipping hotel due to missing required fields: {hotel.get('name')}")
                 return None
-                
+            
+            # Listing coordinates when scraped, else the gazetteer place named in the name or address
+            processed.update(coordinates({**processed, "latitude": hotel.get("latitude"),
+                                          "longitude": hotel.get("longitude")}))
             return processed
             
         except Exception as e:
@@ -73,10 +349,10 @@ class HotelDataProcessor:
         """Clean and normalize text fields."""
         if not text:
             return ""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Collapse whitespace (same as re.sub(r'\s+', ' ', ...) plus strip, but faster)
+        text = ' '.join(text.split())
         # Remove special characters
-        text = re.sub(r'[^\w\s.,-]', '', text)
+        text = _SPECIAL_CHARS_RE.sub('', text)
         return text.strip()
     
     def _normalize_rating(self, rating: Any) -> int:
@@ -100,11 +376,18 @@ class HotelDataProcessor:
             "region": self._clean_text(contact_info.get("region", ""))
         }
     
-    def _process_price_range(self, price_range: Dict[str, Any]) -> Dict[str, Any]:
+    def _process_price_range(self, price_range: Dict[str, Any], hotel_id: Optional[str] = None) -> Dict[str, Any]:
         """Process and normalize price range."""
         min_price = price_range.get("min_price")
         max_price = price_range.get("max_price")
         
+        if self.price_history_dir and hotel_id and not (min_price and max_price):
+            # Loaded once per process and day
+            observed = observed_price_ranges(self.price_history_dir).get(str(hotel_id))
+            if observed:
+                min_price = min_price or observed[0]
+                max_price = max_price or max(observed[1], float(min_price))
+        
         if not min_price and not max_price:
             return {
                 "min_price": 0.0,
@@ -149,6 +432,10 @@ class HotelDataProcessor:
         df.to_csv(csv_path, index=False)
         
         logger.info(f"Saved {len(hotels)} processed hotels to {json_path} and {csv_path}")
+        
+        if self.write_parquet and hotels:
+            append_hotels(hotels, str(self.dataset_dir))
+            logger.info(f"Appended {len(hotels)} hotels to {self.dataset_dir}")
 
 def main():
     """Main function to process all hotel data."""
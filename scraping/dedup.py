@@ -0,0 +1,373 @@
+"""Cross-source entity resolution for processed hotels.
+
+Booking.com and Sastaticket list many of the same properties under slightly
+different names ("Hotel Mashabrum Skardu" / "Mashabrum Hotel"). ``dedupe``
+collapses them into one canonical record per property without comparing
+every pair of hotels:
+
+1. Blocking: only hotels in the same city are compared.
+2. MinHash signatures over normalized name trigrams and, separately,
+   address words, computed with NumPy for all hotels at once.
+3. LSH banding: hotels in the same city that share any band of their name
+   signature become candidate pairs. Band keys are sorted, not compared
+   pairwise, so the cost grows with n log n.
+4. Candidates are kept when their estimated name and address Jaccard
+   similarity clears the threshold and, if an encoder is given, their
+   embeddings agree too. The address keeps "Karakoram Hotel" on Canal Road
+   apart from "Karakoram Hotel" on Airport Road.
+5. Connected components are merged: the most complete listing supplies the
+   fields, amenities and images are unioned, and every source listing is
+   recorded under ``provenance`` (see ``agent.models.Provenance``).
+
+``HotelDataProcessor.process_all_files`` runs this stage before saving; a
+streamed NDJSON output can be deduplicated separately::
+
+    python -m scraping.dedup data/processed/processed_hotels_<ts>.ndjson
+"""
+import argparse
+import json
+import logging
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from agent.ingest import iter_hotels
+from agent.models import Hotel
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+# Words that say what kind of property it is rather than which one
+_GENERIC_NAME_WORDS = {
+    "hotel", "hotels", "the", "and", "n", "resort", "resorts", "inn", "guest", "house", "guesthouse",
+    "motel", "lodge", "by", "at", "in", "of",
+}
+_GENERIC_ADDRESS_WORDS = {"road", "rd", "street", "st", "near", "pakistan", "main", "no"}
+_CONTACT_FIELDS = ("phone", "email", "website", "address", "region")
+
+
+class DedupConfig(BaseModel):
+    """MinHash/LSH parameters and match thresholds."""
+    num_perm: int = 64
+    # 16 bands of 4 rows: names above ~0.5 Jaccard almost always collide
+    bands: int = 16
+    address_perm: int = 32
+    # Match score is the weighted name/address Jaccard when both hotels have
+    # an address, otherwise the name Jaccard against the stricter threshold
+    address_weight: float = 0.5
+    jaccard_threshold: float = 0.6
+    name_only_threshold: float = 0.75
+    embedding_threshold: float = 0.85
+    # Buckets larger than this are generic keys, not duplicates
+    max_bucket: int = 50
+    seed: int = 1
+
+
+def normalize_name(name: str, city: str = "") -> str:
+    """Lowercased name words without generic words or the city name."""
+    city_words = set(_WORD_RE.findall((city or "").lower()))
+    words = _WORD_RE.findall((name or "").lower())
+    kept = [w for w in words if w not in _GENERIC_NAME_WORDS and w not in city_words]
+    # "Skardu Hotel" has nothing distinctive left; keep it whole
+    return " ".join(kept or words)
+
+
+def name_shingles(hotel: Dict[str, Any]) -> List[str]:
+    """Character trigrams of the normalized hotel name."""
+    padded = f" {normalize_name(hotel.get('name'), (hotel.get('contact_info') or {}).get('city'))} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)}) or [str(hotel.get("id", ""))]
+
+
+def address_shingles(hotel: Dict[str, Any]) -> List[str]:
+    """Distinctive address words (house numbers, street names); may be empty."""
+    contact_info = hotel.get("contact_info") or {}
+    city_words = set(_WORD_RE.findall((contact_info.get("city") or "").lower()))
+    return sorted({
+        word for word in _WORD_RE.findall((contact_info.get("address") or "").lower())
+        if word not in _GENERIC_ADDRESS_WORDS and word not in city_words
+    })
+
+
+def address_number_key(address_words: List[str]) -> int:
+    """Hash of the numbers among ``address_shingles`` (0 if there are none)."""
+    numbers = [w for w in address_words if w.isdigit()]
+    return zlib.crc32(" ".join(numbers).encode('utf-8')) if numbers else 0
+
+
+def minhash_signatures(shingle_sets: List[List[str]], num_perm: int, seed: int,
+                       chunk_size: int = 20_000) -> np.ndarray:
+    """(n, num_perm) uint32 MinHash signatures using multiply-shift hashing.
+
+    Empty shingle sets get all-ones signatures; callers mask them out.
+    """
+    hashes, lengths = [], []
+    for grams in shingle_sets:
+        # One placeholder keeps reduceat's segments non-empty
+        hashes.extend(zlib.crc32(g.encode('utf-8')) for g in grams or [""])
+        lengths.append(max(len(grams), 1))
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    shift = np.uint64(32)
+
+    n = len(shingle_sets)
+    signatures = np.empty((n, num_perm), dtype=np.uint32)
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        x = hashes[offsets[start]:offsets[end]]
+        starts = offsets[start:end] - offsets[start]
+        # A few permutations at a time keeps the (shingles, perms) block small
+        for p in range(0, num_perm, 16):
+            # uint64 products wrap around, which is what multiply-shift wants
+            h = (x[:, None] * a[None, p:p + 16] + b[None, p:p + 16]) >> shift
+            signatures[start:end, p:p + 16] = np.minimum.reduceat(h, starts, axis=0)
+    signatures[np.asarray(lengths) > np.asarray([len(g) for g in shingle_sets])] = np.iinfo(np.uint32).max
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray, blocks: np.ndarray, config: DedupConfig) -> np.ndarray:
+    """(m, 2) index pairs, i < j, that share a city block and an LSH band."""
+    n = len(signatures)
+    rows = config.num_perm // config.bands
+    found = []
+    for band in range(config.bands):
+        key = np.zeros(n, dtype=np.uint64)
+        for column in signatures[:, band * rows:(band + 1) * rows].T:
+            key = key * np.uint64(1000003) + column.astype(np.uint64)
+        order = np.lexsort((key, blocks))
+        key, block = key[order], blocks[order]
+        same = (key[1:] == key[:-1]) & (block[1:] == block[:-1])
+        group = np.concatenate(([0], np.cumsum(~same)))
+        sizes = np.bincount(group)[group]
+        keep = (sizes > 1) & (sizes <= config.max_bucket)
+        members, group = order[keep], group[keep]
+        # Groups are contiguous after sorting, so every pair within a group is
+        # (position, position + d) for some distance d below the group size
+        for d in range(1, config.max_bucket):
+            paired = group[d:] == group[:-d]
+            if not paired.any():
+                break
+            found.append(np.stack([members[:-d][paired], members[d:][paired]], axis=1))
+    if not found:
+        return np.zeros((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(found), axis=1).astype(np.int64)
+    # The same pair usually collides in several bands
+    codes = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    return np.stack([codes // n, codes % n], axis=1)
+
+
+def estimated_jaccard(signatures: np.ndarray, pairs: np.ndarray, chunk_size: int = 200_000) -> np.ndarray:
+    """Share of equal MinHash values for each pair."""
+    out = np.empty(len(pairs), dtype=np.float32)
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        out[start:start + len(chunk)] = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+    return out
+
+
+def match_scores(names: np.ndarray, addresses: np.ndarray, has_address: np.ndarray, numbers: np.ndarray,
+                 pairs: np.ndarray, config: DedupConfig) -> np.ndarray:
+    """Boolean mask of candidate pairs that pass the Jaccard thresholds.
+
+    Two addresses with different house/plot numbers never match, however
+    similar the names are.
+    """
+    i, j = pairs[:, 0], pairs[:, 1]
+    name_j = estimated_jaccard(names, pairs)
+    both = has_address[i] & has_address[j]
+    combined = (1 - config.address_weight) * name_j + config.address_weight * estimated_jaccard(addresses, pairs)
+    conflicting = (numbers[i] != 0) & (numbers[j] != 0) & (numbers[i] != numbers[j])
+    return ~conflicting & np.where(both, combined >= config.jaccard_threshold, name_j >= config.name_only_threshold)
+
+
+def connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Component label (smallest member index) for each of ``n`` items."""
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    i, j = pairs[:, 0], pairs[:, 1]
+    while True:
+        low = np.minimum(labels[i], labels[j])
+        updated = labels.copy()
+        # Hook both endpoints and their current roots onto the smaller label
+        for side in (i, j, labels[i], labels[j]):
+            np.minimum.at(updated, side, low)
+        # Pointer jumping: follow labels to their own labels until stable
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def _completeness(hotel: Dict[str, Any]) -> float:
+    contact_info = hotel.get("contact_info") or {}
+    price_range = hotel.get("price_range") or {}
+    return (
+        sum(bool(contact_info.get(field)) for field in _CONTACT_FIELDS)
+        + bool(price_range.get("min_price"))
+        + min(len(hotel.get("amenities") or []), 10) / 10
+        + min(len(hotel.get("description") or ""), 500) / 500
+    )
+
+
+def provenance(hotel: Dict[str, Any]) -> Dict[str, Any]:
+    contact_info = hotel.get("contact_info") or {}
+    return {
+        "source": hotel.get("source") or "unknown",
+        "source_id": str(hotel.get("id", "")),
+        "url": hotel.get("url") or contact_info.get("website") or None,
+        "scraped_at": hotel.get("scraped_at"),
+    }
+
+
+def merge_listings(hotels: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One canonical processed hotel from listings of the same property."""
+    ranked = sorted(hotels, key=_completeness, reverse=True)
+    merged = dict(ranked[0])
+    contact_info = dict(merged.get("contact_info") or {})
+    price_range = dict(merged.get("price_range") or {})
+    amenities = {a["name"].lower(): a for a in merged.get("amenities") or [] if a.get("name")}
+    images = list(merged.get("images") or [])
+
+    for other in ranked[1:]:
+        for field, value in (other.get("contact_info") or {}).items():
+            if value and not contact_info.get(field):
+                contact_info[field] = value
+        for amenity in other.get("amenities") or []:
+            if amenity.get("name"):
+                amenities.setdefault(amenity["name"].lower(), amenity)
+        images.extend(image for image in other.get("images") or [] if image not in images)
+        if len(other.get("description") or "") > len(merged.get("description") or ""):
+            merged["description"] = other["description"]
+        if merged.get("latitude") is None and other.get("latitude") is not None:
+            merged["latitude"], merged["longitude"] = other["latitude"], other.get("longitude")
+
+    mins = [h["price_range"]["min_price"] for h in hotels if (h.get("price_range") or {}).get("min_price")]
+    maxes = [h["price_range"]["max_price"] for h in hotels if (h.get("price_range") or {}).get("max_price")]
+    if mins:
+        price_range["min_price"] = min(mins)
+    if maxes:
+        price_range["max_price"] = max(maxes)
+
+    merged.update({
+        "contact_info": contact_info,
+        "price_range": price_range,
+        "amenities": list(amenities.values()),
+        "images": images,
+        "provenance": [entry for h in hotels for entry in h.get("provenance") or [provenance(h)]],
+    })
+    return merged
+
+
+def to_hotel(record: Dict[str, Any]) -> Hotel:
+    """Validate a canonical record as an ``agent.models.Hotel``."""
+    return Hotel.model_validate(record)
+
+
+def dedupe(
+    hotels: List[Dict[str, Any]],
+    config: Optional[DedupConfig] = None,
+    encode: Optional[Callable[[List[str]], np.ndarray]] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Merge listings of the same property across sources.
+
+    Args:
+        hotels: Processed hotels (``HotelDataProcessor._process_hotel`` shape)
+        config: MinHash/LSH parameters and thresholds
+        encode: Optional text encoder; matched pairs must then also have
+            embedding cosine of at least ``config.embedding_threshold``.
+            Only hotels that appear in a matched pair are encoded.
+
+    Returns:
+        (canonical records in input order of their first listing, stats)
+    """
+    config = config or DedupConfig()
+    stats: Dict[str, Any] = {'input': len(hotels)}
+    if not hotels:
+        return [], {**stats, 'output': 0}
+
+    start = time.perf_counter()
+    names = minhash_signatures([name_shingles(h) for h in hotels], config.num_perm, config.seed)
+    address_sets = [address_shingles(h) for h in hotels]
+    addresses = minhash_signatures(address_sets, config.address_perm, config.seed + 1)
+    has_address = np.array([bool(a) for a in address_sets])
+    numbers = np.array([address_number_key(a) for a in address_sets], dtype=np.int64)
+    stats['minhash_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cities = [((h.get("contact_info") or {}).get("city") or "").strip().lower() for h in hotels]
+    _, blocks = np.unique(np.array(cities, dtype=object), return_inverse=True)
+    pairs = candidate_pairs(names, blocks.astype(np.int64), config)
+    stats['candidate_pairs'] = len(pairs)
+    pairs = pairs[match_scores(names, addresses, has_address, numbers, pairs, config)]
+    stats['lsh_s'] = time.perf_counter() - start
+
+    if encode is not None and len(pairs):
+        start = time.perf_counter()
+        members, inverse = np.unique(pairs, return_inverse=True)
+        texts = [
+            f"{hotels[i].get('name', '')} {(hotels[i].get('contact_info') or {}).get('address', '')}"
+            for i in members
+        ]
+        vectors = np.asarray(encode(texts), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        inverse = inverse.reshape(pairs.shape)
+        cosine = np.sum(vectors[inverse[:, 0]] * vectors[inverse[:, 1]], axis=1)
+        pairs = pairs[cosine >= config.embedding_threshold]
+        stats['embedding_s'] = time.perf_counter() - start
+    stats['matched_pairs'] = len(pairs)
+
+    start = time.perf_counter()
+    labels = connected_components(len(hotels), pairs)
+    order = np.argsort(labels, kind="stable")
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+    records, merged = [], 0
+    # Labels are each cluster's smallest index, so clusters come out in input order
+    for cluster in np.split(order, boundaries):
+        if len(cluster) == 1:
+            hotel = hotels[cluster[0]]
+            # Records deduplicated before keep the listings they came from
+            records.append({**hotel, "provenance": hotel.get("provenance") or [provenance(hotel)]})
+        else:
+            records.append(merge_listings([hotels[i] for i in cluster]))
+            merged += 1
+    stats['merge_s'] = time.perf_counter() - start
+    stats['output'] = len(records)
+    stats['merged_clusters'] = merged
+    return records, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate hotel listings across sources")
+    parser.add_argument("input", help="Processed hotels (JSON array, NDJSON or Parquet dataset)")
+    parser.add_argument("--out", help="Output NDJSON (default: <input>.deduped.ndjson)")
+    parser.add_argument("--threshold", type=float, default=DedupConfig().jaccard_threshold)
+    parser.add_argument("--embeddings", action="store_true", help="Confirm matches with sentence embeddings")
+    args = parser.parse_args()
+
+    encode = None
+    if args.embeddings:
+        from vector_store.retrieval import load_encoder
+        encode = load_encoder().encode
+
+    hotels = list(iter_hotels(args.input))
+    records, stats = dedupe(hotels, DedupConfig(jaccard_threshold=args.threshold), encode)
+    out = Path(args.out or f"{Path(args.input).with_suffix('')}.deduped.ndjson")
+    with open(out, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(json.dumps(stats))
+    print(f"✅ Wrote {len(records)} hotels ({len(hotels) - len(records)} duplicates merged) to {out}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,42 @@
+"""Local HTTP server that serves saved Booking.com pages for offline scraping.
+
+Every ``/searchresults.html`` request gets the same fixture page regardless
+of city or offset, so scrapers can be exercised without network access::
+
+    with serve_fixtures() as base_url:
+        scrape_cities(["Skardu", "Hunza"], base_url=base_url)
+"""
+import threading
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    search_page = "booking_search.html"
+
+    def translate_path(self, path):
+        if path.split("?", 1)[0].endswith("/searchresults.html"):
+            return str(Path(self.directory) / self.search_page)
+        return super().translate_path(path)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_fixtures(directory: Path = FIXTURES_DIR, search_page: str = "booking_search.html") -> Iterator[str]:
+    """Serve ``directory`` on a free localhost port and yield its base URL."""
+    handler = type("Handler", (_FixtureHandler,), {"search_page": search_page})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,179 @@
+"""Partitioned Parquet dataset of processed hotels.
+
+Hotels are stored under ``data/processed/hotels_parquet/city=<city>/source=<source>/``
+with typed columns that follow ``agent.models.Hotel``: contact info and
+price range are flattened into their own columns and amenities are a list
+of names. Appending writes new part files only, and readers can project
+just the columns they need and push filters down to the partitions::
+
+    df = read_hotels(dataset_dir, columns=FILTER_COLUMNS,
+                     filter=(ds.field("city") == "Skardu") & (ds.field("star_rating") >= 3))
+"""
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from agent.ingest import chunked
+
+DEFAULT_DATASET_DIR = "data/processed/hotels_parquet"
+
+PARTITIONING = ds.partitioning(pa.schema([("city", pa.string()), ("source", pa.string())]), flavor="hive")
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("name", pa.string()),
+    ("description", pa.string()),
+    ("star_rating", pa.int8()),
+    ("phone", pa.string()),
+    ("email", pa.string()),
+    ("website", pa.string()),
+    ("address", pa.string()),
+    ("region", pa.string()),
+    ("min_price", pa.float64()),
+    ("max_price", pa.float64()),
+    ("currency", pa.string()),
+    ("price_per_night", pa.bool_()),
+    ("amenities", pa.list_(pa.string())),
+    ("images", pa.list_(pa.string())),
+    ("scraped_at", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("city", pa.string()),
+    ("source", pa.string()),
+])
+
+# Column projections for the common readers
+EMBEDDING_COLUMNS = ["id", "name", "description"]
+FILTER_COLUMNS = ["id", "city", "star_rating", "min_price", "max_price", "amenities", "latitude", "longitude"]
+
+
+def hotel_to_row(hotel: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a processed hotel into a row matching ``SCHEMA``."""
+    contact_info = hotel.get("contact_info") or {}
+    price_range = hotel.get("price_range") or {}
+    return {
+        "id": str(hotel.get("id", "")),
+        "name": hotel.get("name"),
+        "description": hotel.get("description"),
+        "star_rating": hotel.get("star_rating"),
+        "phone": contact_info.get("phone") or None,
+        "email": contact_info.get("email") or None,
+        "website": contact_info.get("website") or None,
+        "address": contact_info.get("address"),
+        "region": contact_info.get("region"),
+        "min_price": price_range.get("min_price"),
+        "max_price": price_range.get("max_price"),
+        "currency": price_range.get("currency", "PKR"),
+        "price_per_night": price_range.get("price_per_night", True),
+        "amenities": [
+            a.get("name") for a in hotel.get("amenities") or []
+            if isinstance(a, dict) and a.get("name") and a.get("is_available", True)
+        ],
+        "images": list(hotel.get("images") or []),
+        "scraped_at": hotel.get("scraped_at"),
+        "latitude": hotel.get("latitude"),
+        "longitude": hotel.get("longitude"),
+        "city": contact_info.get("city") or "unknown",
+        "source": hotel.get("source") or "unknown",
+    }
+
+
+def row_to_hotel(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the nested processed-hotel shape from a dataset row."""
+    return {
+        "id": row.get("id"),
+        "name": row.get("name"),
+        "description": row.get("description"),
+        "star_rating": row.get("star_rating"),
+        "contact_info": {
+            "phone": row.get("phone"),
+            "email": row.get("email"),
+            "website": row.get("website"),
+            "address": row.get("address"),
+            "city": row.get("city"),
+            "region": row.get("region"),
+        },
+        "price_range": {
+            "min_price": row.get("min_price"),
+            "max_price": row.get("max_price"),
+            "currency": row.get("currency"),
+            "price_per_night": row.get("price_per_night"),
+        },
+        "amenities": [{"name": name, "is_available": True} for name in row.get("amenities") or []],
+        "images": list(row.get("images") or []),
+        "source": row.get("source"),
+        "scraped_at": row.get("scraped_at"),
+        "latitude": row.get("latitude"),
+        "longitude": row.get("longitude"),
+    }
+
+
+def append_hotels(hotels: Iterable[Dict[str, Any]], dataset_dir: str = DEFAULT_DATASET_DIR,
+                  chunk_size: int = 50_000) -> int:
+    """Append processed hotels as new part files; existing files are never rewritten."""
+    written = 0
+    for chunk in chunked(hotels, chunk_size):
+        table = pa.Table.from_pylist([hotel_to_row(h) for h in chunk], schema=SCHEMA)
+        ds.write_dataset(
+            table,
+            dataset_dir,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        written += len(chunk)
+    return written
+
+
+def open_dataset(dataset_dir: str = DEFAULT_DATASET_DIR) -> ds.Dataset:
+    return ds.dataset(dataset_dir, format="parquet", partitioning=PARTITIONING, schema=SCHEMA)
+
+
+def read_hotels(dataset_dir: str = DEFAULT_DATASET_DIR, columns: Optional[List[str]] = None,
+                filter: Optional[ds.Expression] = None) -> pd.DataFrame:
+    """Read only ``columns`` of the hotels matching ``filter`` into a DataFrame."""
+    return open_dataset(dataset_dir).to_table(columns=columns, filter=filter).to_pandas()
+
+
+def iter_hotel_records(dataset_dir: str = DEFAULT_DATASET_DIR, filter: Optional[ds.Expression] = None,
+                       batch_size: int = 10_000) -> Iterator[Dict[str, Any]]:
+    """Stream nested processed-hotel dicts, one record batch at a time."""
+    for batch in open_dataset(dataset_dir).to_batches(filter=filter, batch_size=batch_size):
+        for row in batch.to_pylist():
+            yield row_to_hotel(row)
+
+
+def compact(dataset_dir: str = DEFAULT_DATASET_DIR) -> int:
+    """Rewrite the dataset keeping only the latest row per hotel id.
+
+    Returns the number of rows kept.
+    """
+    df = read_hotels(dataset_dir)
+    if df.empty:
+        return 0
+    df = df.sort_values("scraped_at", kind="stable").drop_duplicates("id", keep="last")
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+    target = Path(dataset_dir)
+    staging = target.with_name(target.name + ".compacting")
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        ds.write_dataset(table, str(staging), format="parquet", partitioning=PARTITIONING,
+                         basename_template="part-compacted-{i}.parquet")
+    except BaseException:
+        # The live dataset is untouched; don't leave half a copy next to it
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    backup = target.with_name(target.name + ".old")
+    shutil.rmtree(backup, ignore_errors=True)
+    os.replace(target, backup)
+    os.replace(staging, target)
+    shutil.rmtree(backup, ignore_errors=True)
+    return len(df)
@@ -0,0 +1,183 @@
+"""HTTP-only Booking.com search-results scraping.
+
+Booking.com serves the search-results HTML to a plain GET with browser
+headers (see ``inspect_booking_html.py``), so listing pages are fetched
+over a pooled keep-alive ``requests.Session`` and the ``data-testid``
+property-card markup is parsed with lxml. Selenium is only used when a
+page turns out to be JS-gated (bot challenge, empty shell).
+
+Offline check against a saved page::
+
+    python -m scraping.http_fetcher scraping/fixtures/booking_search.html Skardu
+"""
+import logging
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from agent.instrumentation import count, span
+from scraping.booking_scraper import BOOKING_BASE_URL, search_url
+from scraping.normalize import listings_hash
+
+logger = logging.getLogger(__name__)
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+}
+
+# Markers of bot-challenge / client-rendered shells that need a real browser
+JS_GATE_MARKERS = ("awswafcookiedomainlist", "challenge-platform", "captcha", "please enable javascript")
+
+_CARD = "//div[@data-testid='property-card']"
+_TITLE = ".//div[@data-testid='title']"
+_ADDRESS = ".//span[@data-testid='address']"
+_PRICE = ".//span[@data-testid='price-and-discounted-price']"
+_RATING = ".//div[@data-testid='review-score']/div"
+_LINK = ".//a[@href]"
+
+
+def _first_text(node, xpath: str, default: str = "N/A") -> str:
+    found = node.xpath(xpath)
+    return found[0].text_content().strip() if found else default
+
+
+def parse_listings_html(page: str, city: str) -> List[dict]:
+    """Extract listing dicts (same shape as ``booking_scraper.parse_listings``) from HTML."""
+    tree = lxml_html.fromstring(page)
+    hotels = []
+    for card in tree.xpath(_CARD):
+        name = _first_text(card, _TITLE, "")
+        links = card.xpath(_LINK)
+        if not name or not links:
+            logger.warning("Skipped one listing without a title or link")
+            continue
+        hotels.append({
+            "hotel_name": name,
+            "location": _first_text(card, _ADDRESS, ""),
+            "price": _first_text(card, _PRICE),
+            "rating": _first_text(card, _RATING),
+            "url": links[0].get("href"),
+            "city": city
+        })
+    return hotels
+
+
+def is_js_gated(status_code: int, page: str) -> bool:
+    """True if the response cannot be parsed without running JavaScript."""
+    if status_code in (202, 403, 429):
+        return True
+    lowered = page[:20000].lower()
+    return "property-card" not in lowered and any(marker in lowered for marker in JS_GATE_MARKERS)
+
+
+def make_session(pool_size: int = 8, retries: int = 2) -> requests.Session:
+    """Keep-alive session with a connection pool sized for the worker count."""
+    session = requests.Session()
+    session.headers.update(BROWSER_HEADERS)
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HttpListingFetcher:
+    """Fetch and parse search-result pages over HTTP, falling back to Selenium.
+
+    ``browser_fallback`` is called as ``browser_fallback(url, city)`` and must
+    return listing dicts; it is only invoked for JS-gated pages.
+    """
+
+    def __init__(self, session: requests.Session = None, timeout: float = 20,
+                 browser_fallback: Optional[Callable[[str, str], List[dict]]] = None):
+        self.session = session or make_session()
+        self.timeout = timeout
+        self.browser_fallback = browser_fallback
+        self.http_pages = 0
+        self.browser_pages = 0
+
+    def fetch_page(self, url: str, city: str) -> List[dict]:
+        return self.fetch_page_conditional(url, city)['listings']
+
+    def fetch_page_conditional(self, url: str, city: str, etag: str = None, last_modified: str = None,
+                               content_hash: str = None) -> Dict[str, Any]:
+        """Fetch a page, using stored validators to detect that it is unchanged.
+
+        The page counts as not modified when the server answers 304 or when
+        the parsed listings hash to ``content_hash``.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        with span("scrape.page_load", fetcher="http"):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        result = {
+            'not_modified': False,
+            'listings': [],
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': None,
+        }
+        if response.status_code == 304:
+            self.http_pages += 1
+            count("scrape.pages", fetcher="http", status="not_modified")
+            result['not_modified'] = True
+            return result
+
+        if not is_js_gated(response.status_code, response.text):
+            response.raise_for_status()
+            self.http_pages += 1
+            count("scrape.pages", fetcher="http", status="ok")
+            with span("scrape.parse", fetcher="http"):
+                result['listings'] = parse_listings_html(response.text, city)
+        elif self.browser_fallback is None:
+            logger.warning(f"{url} is JS-gated and no browser fallback is configured")
+            return result
+        else:
+            logger.info(f"{url} is JS-gated, falling back to Selenium")
+            self.browser_pages += 1
+            count("scrape.js_gated")
+            result['listings'] = self.browser_fallback(url, city)
+            result['etag'] = result['last_modified'] = None
+
+        result['content_hash'] = listings_hash(result['listings'])
+        result['not_modified'] = bool(result['listings']) and result['content_hash'] == content_hash
+        return result
+
+    def fetch_city(self, city: str, max_pages: int = 1, base_url: str = BOOKING_BASE_URL) -> List[dict]:
+        hotels = []
+        for page in range(max_pages):
+            listings = self.fetch_page(search_url(city, page, base_url), city)
+            if not listings:
+                break
+            hotels.extend(listings)
+        return hotels
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def main():
+    """Parse a saved search-results page and print what was found."""
+    path, city = sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "Skardu"
+    with open(path, encoding="utf-8") as f:
+        hotels = parse_listings_html(f.read(), city)
+    for hotel in hotels:
+        print(hotel)
+    print(f"[✓] Parsed {len(hotels)} listings from {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import math
+import re
+from datetime import datetime
+from typing import Any, Dict, List
+
+_PRICE_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+_BOOKING_SLUG_RE = re.compile(r'/hotel/\w+/([^/.?]+)')
+
+
+def parse_price(text: Any) -> float:
+    """Parse a display price such as "PKR 12,345" into a number (0.0 if unknown)."""
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return 0.0
+    match = _PRICE_RE.search(str(text))
+    return float(match.group().replace(",", "")) if match else 0.0
+
+
+def clean_value(value: Any) -> str:
+    """Strip a scraped cell, mapping missing values and "N/A" to ""."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    value = str(value).strip()
+    return "" if value == "N/A" else value
+
+
+def canonical_url(url: Any) -> str:
+    """Listing URL without Booking.com tracking parameters."""
+    return clean_value(url).split('?', 1)[0]
+
+
+def listing_id(name: str, city: str, url: str = "") -> str:
+    """Stable hotel id: the Booking.com slug when available, else a name/city hash."""
+    slug = _BOOKING_SLUG_RE.search(url or "")
+    if slug:
+        return f"booking_{slug.group(1)}"
+    return "hotel_" + hashlib.sha1(f"{name}|{city}".encode('utf-8')).hexdigest()[:12]
+
+
+def listing_to_raw_hotel(listing: Dict[str, Any], source: str = "booking") -> Dict[str, Any]:
+    """Convert a scraped search-result listing into the raw shape HotelDataProcessor reads."""
+    name = clean_value(listing.get("hotel_name"))
+    city = clean_value(listing.get("city"))
+    url = canonical_url(listing.get("url"))
+    price = parse_price(listing.get("price"))
+    return {
+        "id": listing_id(name, city, url),
+        "name": name,
+        "description": f"{name} in {clean_value(listing.get('location'))}",
+        "star_rating": None,
+        "contact_info": {
+            "website": url,
+            "address": clean_value(listing.get("location")),
+            "city": city,
+        },
+        "price_range": {"min_price": price, "max_price": price} if price else {},
+        "amenities": [],
+        "images": [],
+        "source": source,
+        "url": url,
+        "review_score": clean_value(listing.get("rating")),
+        "scraped_at": datetime.now().isoformat(),
+    }
+
+
+def listings_hash(listings: List[Dict[str, Any]]) -> str:
+    """Hash of a page's listings, ignoring per-request tracking parameters in URLs."""
+    stable = [{**listing, "url": canonical_url(listing.get("url"))} for listing in listings]
+    payload = json.dumps(stable, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
@@ -0,0 +1,379 @@
+"""Append-only history of scraped hotel prices.
+
+Every scrape appends one row per listing to a Parquet dataset under
+``data/price_history/city=<city>/date=<YYYY-MM-DD>/``, next to the raw
+display string, so nothing is lost when the city CSV is overwritten by the
+next run. Display strings ("PKR 12,345", "US$ 80", "N/A") are parsed in one
+vectorized pass by ``parse_prices`` into the original amount and currency
+and a numeric ``price_pkr``.
+
+Readers push the city and date range down to the partitions and project
+only the columns they need. ``cheapest`` and ``price_changes`` fold the
+matching rows batch by batch into one row per hotel, so memory depends on
+the number of hotels, not on the length of the history::
+
+    python -m scraping.price_history cheapest --city Skardu --stars 3 --days 30
+    python -m scraping.price_history trend booking_pc-legacy-skardu --days 90
+    python -m scraping.price_history changes --city Skardu --days 30
+    python -m scraping.price_history import data/skardu_hotels.csv   # backfill a saved CSV
+
+Incremental crawls skip pages whose listings did not change, so a hotel's
+history holds a row per run in which its page changed, not one per day.
+"""
+import argparse
+import functools
+import logging
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from scraping.hotel_dataset import DEFAULT_DATASET_DIR, read_hotels
+from scraping.normalize import canonical_url, clean_value, listing_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = "data/price_history"
+
+PARTITIONING = ds.partitioning(pa.schema([("city", pa.string()), ("date", pa.date32())]), flavor="hive")
+
+SCHEMA = pa.schema([
+    ("hotel_id", pa.string()),
+    ("name", pa.string()),
+    ("price_text", pa.string()),
+    ("amount", pa.float64()),
+    ("currency", pa.string()),
+    ("price_pkr", pa.float64()),
+    ("observed_at", pa.timestamp("us")),
+    ("source", pa.string()),
+    ("city", pa.string()),
+    ("date", pa.date32()),
+])
+
+# PKR per unit of the currencies Booking.com displays to Pakistani visitors.
+# Approximate; pass ``rates`` to ``parse_prices`` for exact conversion.
+PKR_RATES = {"PKR": 1.0, "USD": 278.0, "EUR": 300.0, "GBP": 352.0, "AED": 75.7, "SAR": 74.1}
+CURRENCY_SYMBOLS = {
+    "PKR": "PKR", "RS": "PKR", "RS.": "PKR", "RUPEES": "PKR",
+    "USD": "USD", "US$": "USD", "$": "USD",
+    "EUR": "EUR", "€": "EUR",
+    "GBP": "GBP", "£": "GBP",
+    "AED": "AED", "SAR": "SAR",
+}
+_SYMBOL = r'PKR|Rs\.?|Rupees|USD|US\$|\$|EUR|€|GBP|£|AED|SAR'
+# Whatever token sits right before the number is its currency, known or
+# not, so "¥ 300" or "INR 5,000" is not mistaken for PKR
+_PRICE_PATTERN = (
+    r'(?i)(?P<prefix>[^\d\s(\[:,]+)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?P<suffix>' + _SYMBOL + r')?'
+)
+
+
+def parse_prices(texts: Iterable[Any], default_currency: str = "PKR",
+                 rates: Optional[Mapping[str, float]] = None) -> pd.DataFrame:
+    """Parse display prices into ``amount``, ``currency`` and ``price_pkr`` columns.
+
+    Runs as Arrow compute kernels over the whole column; strings without a
+    number ("N/A"), unrecognized currency prefixes ("¥ 300", "INR 5,000")
+    and currencies missing from ``rates`` get NaN. Only a number with no
+    currency before or after it is taken to be in ``default_currency``.
+    """
+    rates = PKR_RATES if rates is None else rates
+    text = pa.array(texts, type=pa.string(), from_pandas=True)
+    parts = pc.extract_regex(text, _PRICE_PATTERN)
+    amount = pc.cast(pc.replace_substring(pc.struct_field(parts, "amount"), ",", ""), pa.float64())
+    prefix, suffix = pc.struct_field(parts, "prefix"), pc.struct_field(parts, "suffix")
+    # Groups that did not take part in the match come back as ""; only the
+    # few distinct symbols are resolved in Python and then broadcast back
+    symbol = pc.dictionary_encode(pc.utf8_upper(pc.if_else(pc.equal(prefix, ""), suffix, prefix)))
+    symbols = symbol.dictionary.to_pylist()
+    names = [CURRENCY_SYMBOLS.get(s) if s else default_currency for s in symbols]
+    categories = sorted({n for n in names if n is not None})
+    # Extra trailing slot for null texts; unknown symbols map to code -1 (NaN)
+    to_code = np.array([categories.index(n) if n is not None else -1 for n in names] + [-1])
+    to_rate = np.array([rates.get(n, np.nan) if n is not None else np.nan for n in names] + [np.nan])
+    indices = pc.fill_null(symbol.indices, len(symbols)).to_numpy()
+    amounts = amount.to_numpy(zero_copy_only=False)
+    codes = np.where(np.isnan(amounts), -1, to_code[indices])
+    return pd.DataFrame({
+        "amount": amounts,
+        "currency": pd.Categorical.from_codes(codes, categories=categories),
+        "price_pkr": amounts * to_rate[indices],
+    })
+
+
+def observations_frame(listings: List[Dict[str, Any]], observed_at: Optional[datetime] = None,
+                       source: str = "booking") -> pd.DataFrame:
+    """Scraped search-result listings as rows matching ``SCHEMA``."""
+    observed_at = observed_at or datetime.now()
+    names = [clean_value(listing.get("hotel_name")) for listing in listings]
+    cities = [clean_value(listing.get("city")) or "unknown" for listing in listings]
+    texts = [clean_value(listing.get("price")) for listing in listings]
+    frame = parse_prices(texts)
+    frame.insert(0, "hotel_id", [
+        listing_id(name, city, canonical_url(listing.get("url")))
+        for name, city, listing in zip(names, cities, listings)
+    ])
+    frame.insert(1, "name", names)
+    frame.insert(2, "price_text", texts)
+    frame["observed_at"] = pd.Timestamp(observed_at).as_unit("us")
+    frame["source"] = source
+    frame["city"] = cities
+    frame["date"] = observed_at.date()
+    return frame
+
+
+def append_observations(listings: List[Dict[str, Any]], store_dir: str = DEFAULT_STORE_DIR,
+                        observed_at: Optional[datetime] = None, source: str = "booking") -> int:
+    """Append one price observation per listing as new part files; returns the rows written."""
+    listings = [listing for listing in listings if clean_value(listing.get("hotel_name"))]
+    if not listings:
+        return 0
+    table = pa.Table.from_pandas(observations_frame(listings, observed_at, source), schema=SCHEMA,
+                                 preserve_index=False)
+    ds.write_dataset(
+        table,
+        store_dir,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return len(table)
+
+
+def open_store(store_dir: str = DEFAULT_STORE_DIR) -> Optional[ds.Dataset]:
+    """The observation dataset, or None before anything was recorded."""
+    if not Path(store_dir).exists():
+        return None
+    return ds.dataset(store_dir, format="parquet", partitioning=PARTITIONING, schema=SCHEMA)
+
+
+def observation_filter(city: Optional[str] = None, days: Optional[int] = None, hotel_id: Optional[str] = None,
+                       today: Optional[date] = None) -> Optional[ds.Expression]:
+    """Filter on the city and date partitions (pruned before reading) and, optionally, one hotel."""
+    clauses = []
+    if city:
+        clauses.append(ds.field("city") == city)
+    if days is not None:
+        since = (today or date.today()) - timedelta(days=days)
+        clauses.append(ds.field("date") >= pa.scalar(since, pa.date32()))
+    if hotel_id:
+        clauses.append(ds.field("hotel_id") == hotel_id)
+    if not clauses:
+        return None
+    expression = clauses[0]
+    for clause in clauses[1:]:
+        expression = expression & clause
+    return expression
+
+
+def iter_observations(store_dir: str = DEFAULT_STORE_DIR, columns: Optional[List[str]] = None,
+                      filter: Optional[ds.Expression] = None, batch_size: int = 65_536) -> Iterator[pd.DataFrame]:
+    """Matching observations as DataFrames of at most ``batch_size`` rows; unknown prices are dropped."""
+    dataset = open_store(store_dir)
+    if dataset is None:
+        return
+    known = ds.field("price_pkr").is_valid()
+    filter = known if filter is None else filter & known
+    for batch in dataset.to_batches(columns=columns, filter=filter, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def read_observations(store_dir: str = DEFAULT_STORE_DIR, columns: Optional[List[str]] = None,
+                      filter: Optional[ds.Expression] = None) -> pd.DataFrame:
+    """Read only ``columns`` of the observations matching ``filter`` into a DataFrame."""
+    dataset = open_store(store_dir)
+    if dataset is None:
+        return pd.DataFrame(columns=columns or SCHEMA.names)
+    return dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+
+def _fold_minimum(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """The lowest-priced observation per hotel across batches."""
+    best = None
+    for frame in frames:
+        if best is not None:
+            frame = pd.concat([best, frame], ignore_index=True)
+        best = frame.loc[frame.groupby("hotel_id", sort=False)["price_pkr"].idxmin()].reset_index(drop=True)
+    if best is None:
+        return pd.DataFrame({
+            "hotel_id": pd.Series(dtype=object),
+            "name": pd.Series(dtype=object),
+            "price_pkr": pd.Series(dtype=np.float64),
+            "observed_at": pd.Series(dtype="datetime64[us]"),
+        })
+    return best
+
+
+def cheapest(city: str, days: int = 30, k: int = 1, min_stars: Optional[int] = None,
+             max_stars: Optional[int] = None, store_dir: str = DEFAULT_STORE_DIR,
+             hotels_dir: str = DEFAULT_DATASET_DIR, today: Optional[date] = None) -> pd.DataFrame:
+    """The ``k`` hotels in ``city`` with the lowest price seen in the last ``days`` days.
+
+    Listings carry no star rating, so star bounds are applied by joining
+    the hotel ids against the processed-hotel dataset (``hotels_dir``).
+    """
+    columns = ["hotel_id", "name", "price_pkr", "observed_at"]
+    lowest = _fold_minimum(iter_observations(store_dir, columns, observation_filter(city, days, today=today)))
+    if min_stars is not None or max_stars is not None:
+        if not Path(hotels_dir).exists():
+            raise ValueError(f"Star filters need the processed hotel dataset, but {hotels_dir} does not exist")
+        stars = ds.field("city") == city
+        if min_stars is not None:
+            stars = stars & (ds.field("star_rating") >= min_stars)
+        if max_stars is not None:
+            stars = stars & (ds.field("star_rating") <= max_stars)
+        ratings = read_hotels(hotels_dir, columns=["id", "star_rating"], filter=stars)
+        ratings = ratings.drop_duplicates("id", keep="last").rename(columns={"id": "hotel_id"})
+        lowest = lowest.merge(ratings, on="hotel_id")
+    return lowest.nsmallest(k, "price_pkr").reset_index(drop=True)
+
+
+def price_trend(hotel_id: str, days: Optional[int] = None, city: Optional[str] = None,
+                store_dir: str = DEFAULT_STORE_DIR, today: Optional[date] = None) -> pd.DataFrame:
+    """Daily min/mean/max PKR price and observation count for one hotel, oldest first.
+
+    Passing the hotel's ``city`` lets the other cities' partitions be skipped.
+    """
+    frames = list(iter_observations(store_dir, ["date", "price_pkr"],
+                                    observation_filter(city, days, hotel_id, today)))
+    if not frames:
+        return pd.DataFrame(columns=["min_pkr", "mean_pkr", "max_pkr", "observations"])
+    observations = pd.concat(frames, ignore_index=True)
+    return observations.groupby("date").agg(
+        min_pkr=("price_pkr", "min"),
+        mean_pkr=("price_pkr", "mean"),
+        max_pkr=("price_pkr", "max"),
+        observations=("price_pkr", "size"),
+    ).sort_index()
+
+
+def price_changes(city: Optional[str] = None, days: int = 30, store_dir: str = DEFAULT_STORE_DIR,
+                  today: Optional[date] = None) -> pd.DataFrame:
+    """Per hotel: first and last price, range and least-squares slope in PKR/day.
+
+    Each batch is reduced to per-hotel sums, which are added across
+    batches, so only one row per hotel is ever held.
+    """
+    totals = None
+    # Days relative to today keep the squared sums small
+    origin = np.datetime64(today or date.today(), "us")
+    for frame in iter_observations(store_dir, ["hotel_id", "name", "price_pkr", "observed_at"],
+                                   observation_filter(city, days, today=today)):
+        t = (frame["observed_at"].to_numpy(dtype="datetime64[us]") - origin) / np.timedelta64(1, "D")
+        p = frame["price_pkr"].to_numpy()
+        frame = frame.assign(t=t, tt=t * t, tp=t * p)
+        first = frame.loc[frame.groupby("hotel_id", sort=False)["t"].idxmin(), ["hotel_id", "t", "price_pkr"]]
+        last = frame.loc[frame.groupby("hotel_id", sort=False)["t"].idxmax(), ["hotel_id", "t", "price_pkr"]]
+        sums = frame.groupby("hotel_id", sort=False).agg(
+            name=("name", "last"), n=("t", "size"), st=("t", "sum"), sp=("price_pkr", "sum"),
+            stt=("tt", "sum"), stp=("tp", "sum"), min_pkr=("price_pkr", "min"), max_pkr=("price_pkr", "max"),
+        )
+        sums = sums.join(first.set_index("hotel_id").rename(columns={"t": "first_t", "price_pkr": "first_pkr"}))
+        sums = sums.join(last.set_index("hotel_id").rename(columns={"t": "last_t", "price_pkr": "last_pkr"}))
+        totals = sums if totals is None else _combine_changes(totals, sums)
+    if totals is None:
+        return pd.DataFrame(columns=["name", "observations", "first_pkr", "last_pkr", "min_pkr", "max_pkr",
+                                     "slope_pkr_per_day"])
+    n = totals["n"].to_numpy(dtype=np.float64)
+    variance = totals["stt"].to_numpy() - totals["st"].to_numpy() ** 2 / n
+    covariance = totals["stp"].to_numpy() - totals["st"].to_numpy() * totals["sp"].to_numpy() / n
+    # Hotels seen once (or only at one instant) have no slope
+    slope = np.divide(covariance, variance, out=np.full(len(totals), np.nan), where=variance > 1e-9)
+    return pd.DataFrame({
+        "name": totals["name"],
+        "observations": totals["n"],
+        "first_pkr": totals["first_pkr"],
+        "last_pkr": totals["last_pkr"],
+        "min_pkr": totals["min_pkr"],
+        "max_pkr": totals["max_pkr"],
+        "slope_pkr_per_day": slope,
+    }, index=totals.index)
+
+
+def _combine_changes(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    """Add per-hotel sums of two batches, keeping the earlier first and the later last observation."""
+    both = pd.concat([left, right])
+    grouped = both.groupby(level=0, sort=False)
+    combined = grouped[["n", "st", "sp", "stt", "stp"]].sum()
+    combined["name"] = grouped["name"].last()
+    combined["min_pkr"] = grouped["min_pkr"].min()
+    combined["max_pkr"] = grouped["max_pkr"].max()
+    firsts = both.reset_index().sort_values("first_t", kind="stable").drop_duplicates("hotel_id", keep="first")
+    lasts = both.reset_index().sort_values("last_t", kind="stable").drop_duplicates("hotel_id", keep="last")
+    combined = combined.join(firsts.set_index("hotel_id")[["first_t", "first_pkr"]])
+    return combined.join(lasts.set_index("hotel_id")[["last_t", "last_pkr"]])
+
+
+@functools.lru_cache(maxsize=4)
+def _observed_ranges(store_dir: str, days: int, today: date) -> Dict[str, Tuple[float, float]]:
+    ranges = None
+    for frame in iter_observations(store_dir, ["hotel_id", "price_pkr"], observation_filter(days=days, today=today)):
+        batch = frame.groupby("hotel_id")["price_pkr"].agg(["min", "max"])
+        ranges = batch if ranges is None else pd.concat([ranges, batch]).groupby(level=0).agg(
+            {"min": "min", "max": "max"})
+    if ranges is None:
+        return {}
+    return dict(zip(ranges.index, zip(ranges["min"].tolist(), ranges["max"].tolist())))
+
+
+def observed_price_ranges(store_dir: str = DEFAULT_STORE_DIR, days: int = 30) -> Dict[str, Tuple[float, float]]:
+    """Lowest and highest PKR price per hotel id over the last ``days`` days, loaded once per day per process."""
+    return _observed_ranges(str(store_dir), days, date.today())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or backfill the hotel price history")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cheapest_parser = commands.add_parser("cheapest", help="Cheapest hotels in a city over recent days")
+    cheapest_parser.add_argument("--city", required=True)
+    cheapest_parser.add_argument("--days", type=int, default=30)
+    cheapest_parser.add_argument("--stars", type=int, help="Exact star rating")
+    cheapest_parser.add_argument("--min-stars", type=int)
+    cheapest_parser.add_argument("--max-stars", type=int)
+    cheapest_parser.add_argument("--hotels-dir", default=DEFAULT_DATASET_DIR)
+    cheapest_parser.add_argument("-k", type=int, default=1)
+
+    trend_parser = commands.add_parser("trend", help="Daily prices of one hotel")
+    trend_parser.add_argument("hotel_id")
+    trend_parser.add_argument("--city")
+    trend_parser.add_argument("--days", type=int)
+
+    changes_parser = commands.add_parser("changes", help="Price change and slope per hotel")
+    changes_parser.add_argument("--city")
+    changes_parser.add_argument("--days", type=int, default=30)
+
+    import_parser = commands.add_parser("import", help="Record the prices of a scraped city CSV")
+    import_parser.add_argument("csv_path")
+    import_parser.add_argument("--observed-at", help="ISO timestamp (defaults to the file's mtime)")
+    args = parser.parse_args()
+
+    pd.set_option("display.width", 160)
+    if args.command == "cheapest":
+        min_stars = args.stars if args.stars is not None else args.min_stars
+        max_stars = args.stars if args.stars is not None else args.max_stars
+        print(cheapest(args.city, args.days, args.k, min_stars, max_stars, args.store_dir, args.hotels_dir))
+    elif args.command == "trend":
+        print(price_trend(args.hotel_id, args.days, args.city, args.store_dir))
+    elif args.command == "changes":
+        print(price_changes(args.city, args.days, args.store_dir).sort_values("slope_pkr_per_day"))
+    else:
+        observed_at = datetime.fromisoformat(args.observed_at) if args.observed_at \
+            else datetime.fromtimestamp(Path(args.csv_path).stat().st_mtime)
+        listings = pd.read_csv(args.csv_path).to_dict(orient="records")
+        written = append_observations(listings, args.store_dir, observed_at)
+        print(f"✅ Recorded {written} price observations from {args.csv_path} in {args.store_dir}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,359 @@
+"""Concurrent multi-city Booking.com scraping.
+
+Pages are fetched over plain HTTP where possible and otherwise by a fixed
+pool of headless Chrome drivers. Requests to each host are paced by a token
+bucket instead of fixed sleeps, and each city's results are written to
+``data/raw/`` as soon as that city finishes. With ``price_history_dir``
+each city's listing prices are also appended to the price history
+(``scraping.price_history``).
+
+Point ``base_url`` at ``scraping.fixture_server`` to run fully offline.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from agent.instrumentation import count, span
+from scraping.booking_scraper import (
+    BOOKING_BASE_URL,
+    init_driver,
+    parse_listings,
+    search_url,
+    wait_for_listings,
+)
+from scraping.crawl_state import CrawlState
+from scraping.http_fetcher import HttpListingFetcher, make_session
+from scraping.normalize import listing_to_raw_hotel, listings_hash
+from scraping.price_history import append_observations
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` requests/sec with bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """One token bucket per host."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> None:
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.setdefault(host, TokenBucket(self.rate, self.capacity))
+        bucket.acquire()
+
+
+class DriverPool:
+    """Lazily created, reusable pool of at most ``size`` WebDrivers."""
+
+    def __init__(self, size: int, headless: bool = True):
+        self.size = size
+        self.headless = headless
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                driver = init_driver(headless=self.headless)
+                self._all.append(driver)
+                return driver
+        return self._idle.get()
+
+    def release(self, driver) -> None:
+        self._idle.put(driver)
+
+    def close(self) -> None:
+        with self._lock:
+            for driver in self._all:
+                try:
+                    driver.quit()
+                except Exception as e:
+                    logger.warning(f"Error closing driver: {e}")
+            self._all.clear()
+
+
+def _write_city(hotels: List[dict], city: str, out_dir: Path) -> Path:
+    """Atomically write one city's raw hotels so readers never see a partial file."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = out_dir / f"booking_{city.lower().replace(' ', '_')}_{timestamp}.json"
+    tmp = path.with_suffix(".json.tmp")
+    with span("scrape.write"):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(hotels, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    return path
+
+
+def _browser_page(pool: DriverPool, url: str, city: str, timeout: float) -> List[dict]:
+    """Load one page in a pooled driver and parse its property cards."""
+    with span("scrape.driver_wait"):
+        driver = pool.acquire()
+    try:
+        with span("scrape.page_load", fetcher="browser"):
+            driver.get(url)
+            found = wait_for_listings(driver, timeout=timeout)
+        if not found:
+            return []
+        count("scrape.pages", fetcher="browser")
+        with span("scrape.parse", fetcher="browser"):
+            return parse_listings(driver, city)
+    finally:
+        pool.release(driver)
+
+
+def _browser_page_conditional(pool: DriverPool, url: str, city: str, timeout: float,
+                              content_hash: str = None, **validators) -> Dict[str, Any]:
+    """Browser counterpart of ``HttpListingFetcher.fetch_page_conditional``."""
+    listings = _browser_page(pool, url, city, timeout)
+    new_hash = listings_hash(listings)
+    return {
+        'not_modified': bool(listings) and new_hash == content_hash,
+        'listings': listings,
+        'etag': None,
+        'last_modified': None,
+        'content_hash': new_hash,
+    }
+
+
+def _write_removed(removed: List[str], city: str, out_dir: Path) -> Path:
+    """Write removed hotel ids under ``deltas/`` so raw-file globbing skips them."""
+    deltas = out_dir / "deltas"
+    deltas.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = deltas / f"removed_{city.lower().replace(' ', '_')}_{timestamp}.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(removed, f)
+    return path
+
+
+def _record_prices(listings: List[dict], city: str, price_history_dir: Optional[str]) -> None:
+    if not price_history_dir or not listings:
+        return
+    with span("scrape.record_prices"):
+        written = append_observations(listings, price_history_dir)
+    logger.debug(f"Recorded {written} price observations for {city}")
+
+
+def _scrape_city_incremental(city: str, fetch_conditional: Callable[..., Dict[str, Any]],
+                             limiter: HostRateLimiter, max_pages: int, base_url: str,
+                             state: CrawlState, run_id: int, price_history_dir: Optional[str] = None) -> Optional[int]:
+    """Scrape the remaining pages of a city for a run, queueing only changes.
+
+    Prices are recorded for the pages fetched, not the unchanged ones.
+    Returns the number of pages that held listings, or None if the city
+    already finished in this run.
+    """
+    start, done = state.city_progress(run_id, city)
+    if done:
+        return None
+    for page in range(start, max_pages):
+        url = search_url(city, page, base_url)
+        with span("scrape.rate_limit"):
+            limiter.acquire(url)
+        result = fetch_conditional(url, city, **state.validators(url))
+        if result['not_modified']:
+            state.page_unchanged(run_id, city, url, page)
+            continue
+        if not result['listings']:
+            logger.info(f"No listings for {city} on page {page + 1}, stopping")
+            return page
+        # Per page, since pages done before a failure are not fetched again when the run resumes
+        _record_prices(result['listings'], city, price_history_dir)
+        hotels = [listing_to_raw_hotel(listing) for listing in result['listings']]
+        changed = state.page_fetched(
+            run_id, city, url, page, hotels,
+            etag=result['etag'],
+            last_modified=result['last_modified'],
+            listing_hash=result['content_hash']
+        )
+        logger.info(f"{city} page {page + 1}: {changed}/{len(hotels)} hotels added or changed")
+    return max_pages
+
+
+def _scrape_city(city: str, fetch_page: Callable[[str, str], List[dict]], limiter: HostRateLimiter,
+                 max_pages: int, base_url: str, price_history_dir: Optional[str] = None) -> List[dict]:
+    hotels, fetched = [], []
+    for page in range(max_pages):
+        url = search_url(city, page, base_url)
+        with span("scrape.rate_limit"):
+            limiter.acquire(url)
+        listings = fetch_page(url, city)
+        if not listings:
+            logger.info(f"No listings for {city} on page {page + 1}, stopping")
+            break
+        fetched.extend(listings)
+        hotels.extend(listing_to_raw_hotel(listing) for listing in listings)
+    _record_prices(fetched, city, price_history_dir)
+    return hotels
+
+
+def scrape_cities(
+    cities: List[str],
+    workers: int = 4,
+    max_pages: int = 1,
+    requests_per_sec: float = 0.5,
+    burst: int = 2,
+    timeout: float = 15,
+    out_dir: str = "data/raw",
+    base_url: str = BOOKING_BASE_URL,
+    headless: bool = True,
+    use_http: bool = True,
+    state: CrawlState = None,
+    price_history_dir: Optional[str] = None
+) -> Dict[str, Path]:
+    """Scrape several cities concurrently.
+
+    Args:
+        cities: City names to search for
+        workers: Number of concurrent headless drivers
+        max_pages: Result pages per city
+        requests_per_sec: Sustained page loads per second per host
+        burst: Token bucket capacity per host
+        timeout: Maximum seconds to wait for property cards on a page
+        out_dir: Directory that receives one raw JSON file per city
+        base_url: Site root (a local fixture server in tests)
+        headless: Run Chrome without a window
+        use_http: Fetch pages over plain HTTP and only start Chrome for
+            JS-gated pages
+        state: Crawl state for incremental runs. An interrupted run is
+            resumed, unchanged pages are skipped, raw files hold only added
+            or changed hotels and removed ids go to ``deltas/``
+        price_history_dir: Append every fetched listing's price to this
+            price-history dataset
+
+    Returns:
+        Mapping of city to the raw file written for it
+    """
+    if state is not None:
+        return _scrape_cities_incremental(
+            cities, state, workers, max_pages, requests_per_sec, burst, timeout,
+            out_dir, base_url, headless, use_http, price_history_dir
+        )
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    # Drivers are created lazily, so HTTP-only runs never start Chrome
+    pool = DriverPool(workers, headless=headless)
+    limiter = HostRateLimiter(requests_per_sec, burst)
+    browser_page = partial(_browser_page, pool, timeout=timeout)
+    fetcher = None
+    fetch_page = browser_page
+    if use_http:
+        fetcher = HttpListingFetcher(make_session(pool_size=workers), browser_fallback=browser_page)
+        fetch_page = fetcher.fetch_page
+    written = {}
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_scrape_city, city, fetch_page, limiter, max_pages, base_url, price_history_dir): city
+                for city in cities
+            }
+            for future in as_completed(futures):
+                city = futures[future]
+                try:
+                    hotels = future.result()
+                except Exception as e:
+                    logger.error(f"Scraping {city} failed: {e}")
+                    continue
+                written[city] = _write_city(hotels, city, out)
+                logger.info(f"Saved {len(hotels)} hotels for {city} to {written[city]}")
+    finally:
+        pool.close()
+        if fetcher is not None:
+            fetcher.close()
+            logger.info(f"Pages fetched over HTTP: {fetcher.http_pages}, via browser: {fetcher.browser_pages}")
+
+    return written
+
+
+def _scrape_cities_incremental(cities: List[str], state: CrawlState, workers: int, max_pages: int,
+                               requests_per_sec: float, burst: int, timeout: float, out_dir: str,
+                               base_url: str, headless: bool, use_http: bool,
+                               price_history_dir: Optional[str] = None) -> Dict[str, Path]:
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    pool = DriverPool(workers, headless=headless)
+    limiter = HostRateLimiter(requests_per_sec, burst)
+    browser_page = partial(_browser_page, pool, timeout=timeout)
+    fetcher = None
+    fetch_conditional = partial(_browser_page_conditional, pool, timeout=timeout)
+    if use_http:
+        fetcher = HttpListingFetcher(make_session(pool_size=workers), browser_fallback=browser_page)
+        fetch_conditional = fetcher.fetch_page_conditional
+    run_id = state.start_run(cities)
+    written = {}
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_scrape_city_incremental, city, fetch_conditional, limiter,
+                                max_pages, base_url, state, run_id, price_history_dir): city
+                for city in cities
+            }
+            for future in as_completed(futures):
+                city = futures[future]
+                try:
+                    pages_scanned = future.result()
+                except Exception as e:
+                    logger.error(f"Scraping {city} failed, it will resume on the next run: {e}")
+                    continue
+                if pages_scanned is None:
+                    logger.info(f"{city} already finished in run {run_id}")
+                    continue
+                # Write before finishing the city so a crash re-emits rather than drops changes
+                changed = state.pending_hotels(run_id, city)
+                if changed:
+                    written[city] = _write_city(changed, city, out)
+                removed = state.finish_city(run_id, city, pages_scanned)
+                if removed:
+                    _write_removed(removed, city, out)
+                logger.info(f"{city}: {len(changed)} added/changed, {len(removed)} removed")
+        state.finish_run(run_id)
+    finally:
+        pool.close()
+        if fetcher is not None:
+            fetcher.close()
+
+    return written
@@ -0,0 +1,71 @@
+"""Speed and accuracy of cross-source hotel deduplication on synthetic listings.
+
+    python scripts/benchmark_dedup.py --listings 500000
+
+Generates listings where some hotels are re-listed under reworded names and
+addresses (see ``iter_synthetic_listings``), normalizes them with
+``HotelDataProcessor`` and runs ``scraping.dedup.dedupe``. Prints one JSON
+row with per-stage timings, peak RSS and pairwise precision/recall against
+the known duplicates.
+"""
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+from scraping.data_processor import HotelDataProcessor
+from scraping.dedup import DedupConfig, dedupe
+from scripts.synthetic_data import iter_synthetic_listings
+
+
+def pair_count(sizes: np.ndarray) -> int:
+    return int((sizes * (sizes - 1) // 2).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=500_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--threshold", type=float, default=DedupConfig().jaccard_threshold)
+    args = parser.parse_args()
+
+    # Only used to normalize listings; nothing is written
+    processor = HotelDataProcessor(processed_data_dir=str(Path(tempfile.gettempdir()) / "benchmark_processed"),
+                                   write_parquet=False, deduplicate=False)
+    start = time.perf_counter()
+    hotels = [processor._process_hotel(h) for h in iter_synthetic_listings(args.listings, args.duplicate_rate)]
+    prepare_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    records, stats = dedupe(hotels, DedupConfig(jaccard_threshold=args.threshold))
+    stats['seconds'] = time.perf_counter() - start
+    stats['prepare_s'] = prepare_s
+    stats['listings_per_sec'] = len(hotels) / stats['seconds']
+    stats['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    # Pairwise precision/recall: a predicted pair is two listings merged into
+    # the same record, a true pair two listings of the same synthetic hotel
+    _, truth_sizes = np.unique([h['id'].split("~")[0] for h in hotels], return_counts=True)
+    true_pairs = pair_count(truth_sizes)
+    predicted, correct = 0, 0
+    for record in records:
+        members = [p['source_id'].split("~")[0] for p in record['provenance']]
+        predicted += pair_count(np.array([len(members)]))
+        _, sizes = np.unique(members, return_counts=True)
+        correct += pair_count(sizes)
+    stats['precision'] = correct / predicted if predicted else 1.0
+    stats['recall'] = correct / true_pairs if true_pairs else 1.0
+    stats['true_hotels'] = len(truth_sizes)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Cold-start and encode-throughput benchmark for the embedding backends.
+
+    python scripts/benchmark_encoders.py --texts 2000 --backends torch onnx static
+
+Each backend runs in a fresh interpreter so import and model-load time
+(including torch for the default backend) are measured from a cold start.
+Prints one JSON row per backend with startup seconds, RSS after loading,
+texts/sec and mean cosine similarity to the torch embeddings. Export the
+ONNX and static artifacts first (see ``vector_store/encoders.py``).
+"""
+import argparse
+import json
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+from scripts.synthetic_data import iter_synthetic_hotels
+
+
+def run_child(backend: str, texts_path: str, out_path: str, batch_size: int) -> None:
+    """Measure one backend in this (fresh) process and save its embeddings."""
+    start = time.perf_counter()
+    from vector_store.encoders import EncoderConfig, load_model
+    model = load_model(EncoderConfig.from_env(backend=backend))
+    model.encode(["warm up"])
+    startup_s = time.perf_counter() - start
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    texts = json.loads(Path(texts_path).read_text(encoding='utf-8'))
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+    encode_s = time.perf_counter() - start
+    np.save(out_path, embeddings)
+    print(json.dumps({
+        'backend': backend,
+        'startup_s': startup_s,
+        'rss_mb': rss_mb,
+        'texts_per_sec': len(texts) / encode_s,
+        'torch_imported': 'torch' in sys.modules,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "static"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--texts-path", help=argparse.SUPPRESS)
+    parser.add_argument("--out-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.texts_path, args.out_path, args.batch_size)
+        return
+
+    work_dir = Path(tempfile.mkdtemp(prefix="encoder_bench_"))
+    try:
+        texts = [f"{h['name'].strip()} {h['description']}" for h in iter_synthetic_hotels(args.texts)]
+        random.Random(0).shuffle(texts)
+        texts_path = work_dir / "texts.json"
+        texts_path.write_text(json.dumps(texts), encoding='utf-8')
+
+        reference = None
+        for backend in args.backends:
+            out_path = work_dir / f"{backend}.npy"
+            proc = subprocess.run(
+                [sys.executable, __file__, "--child", backend, "--texts-path", str(texts_path),
+                 "--out-path", str(out_path), "--batch-size", str(args.batch_size)],
+                capture_output=True, text=True, cwd=str(project_root)
+            )
+            if proc.returncode != 0:
+                print(json.dumps({'backend': backend, 'error': proc.stderr.strip().splitlines()[-1:]}))
+                continue
+            row = json.loads(proc.stdout.strip().splitlines()[-1])
+            embeddings = np.load(out_path)
+            if backend == "torch":
+                reference = embeddings
+            if reference is not None and reference.shape == embeddings.shape:
+                row['cosine_vs_torch'] = float(np.mean(np.sum(reference * embeddings, axis=1)))
+            print(json.dumps(row))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
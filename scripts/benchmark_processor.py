@@ -0,0 +1,72 @@
+"""Throughput benchmark for HotelDataProcessor on synthetic raw hotels.
+
+    python scripts/benchmark_processor.py --hotels 1000000 --workers 8
+
+Generates an NDJSON input under a temporary directory, runs the streaming
+processor and prints hotels/sec and peak RSS. ``--compare`` also runs the
+in-memory ``process_all_files`` path (only sensible for small inputs).
+"""
+import argparse
+import json
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from scraping.data_processor import HotelDataProcessor
+from scripts.synthetic_data import iter_synthetic_hotels, write_synthetic_ndjson
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process and its finished children, in MB (Linux reports KB)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotels", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--compare", action="store_true", help="Also time the in-memory path")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="hotel_bench_"))
+    try:
+        raw_dir, processed_dir = work_dir / "raw", work_dir / "processed"
+        start = time.perf_counter()
+        write_synthetic_ndjson(str(raw_dir / "synthetic.ndjson"), args.hotels)
+        print(f"Generated {args.hotels} hotels in {time.perf_counter() - start:.1f}s")
+
+        processor = HotelDataProcessor(str(raw_dir), str(processed_dir))
+        stats = processor.process_all_files_streaming(workers=args.workers, chunk_size=args.chunk_size)
+        stats['peak_rss_mb'] = peak_rss_mb()
+        print(json.dumps({'mode': 'streaming', **stats}))
+
+        if args.compare:
+            # The in-memory path only reads JSON arrays
+            (raw_dir / "synthetic.ndjson").unlink()
+            with open(raw_dir / "synthetic.json", 'w', encoding='utf-8') as f:
+                json.dump(list(iter_synthetic_hotels(args.hotels)), f)
+            start = time.perf_counter()
+            hotels = processor.process_all_files()
+            elapsed = time.perf_counter() - start
+            print(json.dumps({
+                'mode': 'in_memory',
+                'processed': len(hotels),
+                'seconds': elapsed,
+                'hotels_per_sec': args.hotels / elapsed,
+                'peak_rss_mb': peak_rss_mb(),
+            }))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""Offline performance suite: parse, process, embed, index build and search.
+
+    python scripts/benchmark_suite.py --scales 1k 100k 1m
+    python scripts/benchmark_suite.py --scales 1k --baseline data/benchmarks/<earlier>.json
+
+Every stage runs at every scale in a fresh interpreter, so each row's peak
+RSS is that stage's own. Stages:
+
+- ``parse``: ``parse_listings_html`` + ``listing_to_raw_hotel`` over the
+  saved Booking.com fixture page, repeated up to the scale.
+- ``process``: ``HotelDataProcessor._process_hotel`` on synthetic raw hotels.
+- ``embed``: batch encoding with the configured backend
+  (``HOTEL_ENCODER_BACKEND``), capped at ``--embed-limit`` texts.
+- ``index``: document store, lexical index, hotel table and FAISS index
+  build over random unit vectors (so scale does not depend on encoding time).
+- ``filter``: parsed query constraints plus a price sort, applied through
+  the columnar ``HotelTable`` and, for comparison, per processed-hotel dict.
+- ``geo``: ``GeoIndex`` radius (5 km) and 10-nearest queries around city
+  centres, against a haversine scan over every hotel.
+- ``prices``: vectorized ``parse_prices`` against ``parse_price`` per
+  string, appending the observations as 30 daily scrapes, and
+  ``cheapest``/``price_changes`` over the last 30 days of one city.
+- ``search_faiss`` / ``search_chroma``: single-query p50/p99 and
+  throughput through ``RetrievalEngine``, the path behind ``app.py`` and
+  ``HotelAgent``. Queries are distinct so the result cache never answers.
+
+Results are written as one JSON file per run (commit, machine and a row
+per stage and scale) under ``data/benchmarks/``; with ``--baseline`` rows
+slower than the baseline by more than ``--tolerance`` are reported.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+from scripts.synthetic_data import CENTERS, CITIES, iter_synthetic_hotels
+
+STAGES = ["parse", "process", "embed", "index", "filter", "geo", "prices", "search_faiss", "search_chroma"]
+FIXTURE = project_root / "scraping" / "fixtures" / "booking_search.html"
+# Metric name suffixes compared against a baseline run
+LOWER_IS_BETTER = ("_s", "_ms", "_mb")
+HIGHER_IS_BETTER = ("_per_sec", "qps")
+
+
+def parse_scale(text: str) -> int:
+    """``"1k"`` -> 1000, ``"1m"`` -> 1000000."""
+    text = text.lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def normalizer():
+    """Processor used only for ``_process_hotel``; it writes nothing."""
+    from scraping.data_processor import HotelDataProcessor
+    return HotelDataProcessor(processed_data_dir=str(Path(tempfile.gettempdir()) / "benchmark_processed"),
+                              write_parquet=False, deduplicate=False)
+
+
+def processed_hotels(n: int) -> List[Dict[str, Any]]:
+    processor = normalizer()
+    return [processor._process_hotel(h) for h in iter_synthetic_hotels(n)]
+
+
+def sample_queries(n: int) -> List[str]:
+    kinds = ["cheap hotel", "3-star hotel", "guest house with parking", "hotel with wifi", "resort near the lake"]
+    return [f"{kinds[i % len(kinds)]} in {CITIES[i % len(CITIES)]} for {i % 7 + 1} nights" for i in range(n)]
+
+
+def latency_row(engine, queries: List[str], k: int) -> Dict[str, Any]:
+    engine.search(queries[0], k)
+    latencies = []
+    start = time.perf_counter()
+    for query in queries[1:]:
+        begin = time.perf_counter()
+        engine.search(query, k)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    elapsed = time.perf_counter() - start
+    return {
+        'queries': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'qps': len(latencies) / elapsed,
+    }
+
+
+def make_encoder(work_dir: Path):
+    """Configured model behind a throwaway embedding cache."""
+    from vector_store.embedding_cache import CachedEncoder, EmbeddingCache
+    from vector_store.encoders import EncoderConfig, load_model
+    config = EncoderConfig.from_env()
+    return CachedEncoder(load_model(config), config.cache_key, EmbeddingCache(str(work_dir / "embedding_cache")))
+
+
+def run_stage(stage: str, n: int, work_dir: Path, args) -> Dict[str, Any]:
+    """Run one stage in this (fresh) process and return its metrics."""
+    row: Dict[str, Any] = {}
+    if stage == "parse":
+        from scraping.http_fetcher import parse_listings_html
+        from scraping.normalize import listing_to_raw_hotel
+        page = FIXTURE.read_text(encoding='utf-8')
+        start = time.perf_counter()
+        parsed, pages = 0, 0
+        while parsed < n:
+            listings = parse_listings_html(page, "Skardu")
+            parsed += len([listing_to_raw_hotel(listing) for listing in listings])
+            pages += 1
+        elapsed = time.perf_counter() - start
+        row.update({'pages': pages, 'listings': parsed, 'seconds': elapsed, 'listings_per_sec': parsed / elapsed})
+
+    elif stage == "process":
+        processor = normalizer()
+        raw = list(iter_synthetic_hotels(n))
+        start = time.perf_counter()
+        processed = [processor._process_hotel(h) for h in raw]
+        elapsed = time.perf_counter() - start
+        row.update({'hotels': len(processed), 'seconds': elapsed, 'hotels_per_sec': n / elapsed})
+
+    elif stage == "embed":
+        from vector_store.encoders import EncoderConfig, load_model
+        from vector_store.retrieval import hotel_text
+        config = EncoderConfig.from_env()
+        start = time.perf_counter()
+        model = load_model(config)
+        model.encode(["warm up"])
+        load_s = time.perf_counter() - start
+        texts = [hotel_text(h) for h in processed_hotels(min(n, args.embed_limit))]
+        start = time.perf_counter()
+        model.encode(texts, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        row.update({'backend': config.variant, 'texts': len(texts), 'load_s': load_s, 'seconds': elapsed,
+                    'texts_per_sec': len(texts) / elapsed})
+
+    elif stage == "index":
+        from vector_store.ann_index import IndexConfig, build_index, resident_bytes, save_index
+        from agent.hotel_table import HotelTable
+        from vector_store.doc_store import DocStore
+        from vector_store.lexical_index import LexicalIndex
+        hotels = processed_hotels(n)
+        vectors = np.random.default_rng(0).standard_normal((n, args.dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index_dir = work_dir / "index"
+        config = IndexConfig(kind=args.index_kind)
+
+        start = time.perf_counter()
+        DocStore.write(hotels, str(index_dir))
+        row['docstore_s'] = time.perf_counter() - start
+        start = time.perf_counter()
+        LexicalIndex.build(hotels).save(str(index_dir))
+        row['lexical_s'] = time.perf_counter() - start
+        start = time.perf_counter()
+        HotelTable.build(hotels).save(str(index_dir))
+        row['table_s'] = time.perf_counter() - start
+        start = time.perf_counter()
+        index = build_index(vectors, config)
+        save_index(index, config, str(index_dir))
+        row['faiss_s'] = time.perf_counter() - start
+        row.update({'kind': config.kind, 'vectors': n, 'index_mb': resident_bytes(index) / 2 ** 20})
+
+    elif stage == "filter":
+        from agent.hotel_table import HotelTable
+        from agent.query_parser import parse_query
+        hotels = processed_hotels(n)
+        start = time.perf_counter()
+        table = HotelTable.build(hotels)
+        row['build_s'] = time.perf_counter() - start
+        row['table_mb'] = sum(array.nbytes for array in table._arrays().values()) / 2 ** 20
+        constraints = [parse_query(query) for query in sample_queries(10)]
+        for name, select in (
+            ('table', lambda c: table.select(c, sort="min_price", limit=args.k)),
+            ('dicts', lambda c: sorted((h for h in hotels if c.matches(h)),
+                                       key=lambda h: h['price_range']['min_price'])[:args.k]),
+        ):
+            latencies = []
+            for c in constraints:
+                begin = time.perf_counter()
+                select(c)
+                latencies.append((time.perf_counter() - begin) * 1000)
+            row[f'{name}_p50_ms'] = float(np.percentile(latencies, 50))
+
+    elif stage == "geo":
+        from agent.geo import GeoIndex, haversine_km
+        hotels = processed_hotels(n)
+        lats = np.array([h['latitude'] for h in hotels])
+        lons = np.array([h['longitude'] for h in hotels])
+        start = time.perf_counter()
+        index = GeoIndex(lats, lons)
+        row['build_s'] = time.perf_counter() - start
+        points = [CENTERS[city] for city in CITIES]
+        for name, query in (
+            ('radius', lambda lat, lon: index.within(lat, lon, 5.0)),
+            ('nearest', lambda lat, lon: index.nearest(lat, lon, args.k)),
+            ('scan', lambda lat, lon: np.flatnonzero(haversine_km(lat, lon, lats, lons) <= 5.0)),
+        ):
+            latencies = []
+            for lat, lon in points * 10:
+                begin = time.perf_counter()
+                query(lat, lon)
+                latencies.append((time.perf_counter() - begin) * 1000)
+            row[f'{name}_p50_ms'] = float(np.percentile(latencies, 50))
+
+    elif stage == "prices":
+        from datetime import datetime, timedelta
+        from scraping.normalize import parse_price
+        from scraping.price_history import append_observations, cheapest, parse_prices, price_changes
+        rng = np.random.default_rng(0)
+        amounts = rng.integers(2_000, 60_000, n)
+        texts = [f"PKR {amount:,}" if amount % 10 else "N/A" for amount in amounts]
+        # Best of two: the first pass also pays for Arrow's allocator warming up
+        for name, parse in (('parse', parse_prices), ('parse_loop', lambda t: [parse_price(x) for x in t])):
+            timings = []
+            for _ in range(2):
+                start = time.perf_counter()
+                parse(texts)
+                timings.append(time.perf_counter() - start)
+            row[f'{name}_s'] = min(timings)
+
+        # The same hotels re-scraped daily, so the store holds n observations in total
+        days = 30
+        per_day = max(n // days, 1)
+        store_dir = str(work_dir / "price_history")
+        start = time.perf_counter()
+        for day in range(days):
+            observed_at = datetime.now() - timedelta(days=days - 1 - day)
+            listings = [
+                {"hotel_name": f"Hotel {i}", "city": CITIES[i % len(CITIES)], "price": texts[day * per_day + i]}
+                for i in range(min(per_day, n - day * per_day))
+            ]
+            append_observations(listings, store_dir, observed_at)
+        row['append_s'] = time.perf_counter() - start
+        for name, query in (('cheapest', lambda: cheapest("Skardu", days, args.k, store_dir=store_dir)),
+                            ('changes', lambda: price_changes("Skardu", days, store_dir))):
+            start = time.perf_counter()
+            query()
+            row[f'{name}_ms'] = (time.perf_counter() - start) * 1000
+
+    elif stage == "search_faiss":
+        from vector_store.retrieval import FaissBackend, RetrievalEngine
+        index_dir = work_dir / "index"
+        if not index_dir.exists():
+            return {'skipped': "run the index stage first"}
+        start = time.perf_counter()
+        engine = RetrievalEngine(FaissBackend(str(index_dir)), encoder=make_encoder(work_dir))
+        row['load_s'] = time.perf_counter() - start
+        dim = len(engine.encoder.encode(["dimension check"])[0])
+        if dim != engine.backend.index.d:
+            return {'error': f"encoder dim {dim} != index dim {engine.backend.index.d}; pass --dim {dim}"}
+        row.update(latency_row(engine, sample_queries(args.queries + 1), args.k))
+
+    elif stage == "search_chroma":
+        try:
+            import chromadb  # noqa: F401
+        except ImportError:
+            return {'skipped': "chromadb not installed"}
+        from agent.ingest import content_hash
+        from agent.main import HotelAgent
+        from vector_store.retrieval import ChromaBackend, RetrievalEngine
+        count = min(n, args.chroma_limit)
+        hotels = processed_hotels(count)
+        vectors = np.random.default_rng(0).standard_normal((count, args.dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        backend = ChromaBackend(str(work_dir / "chroma"))
+        start = time.perf_counter()
+        # Chroma caps the size of a single add
+        for i in range(0, count, 5000):
+            chunk = hotels[i:i + 5000]
+            backend.collection.add(
+                ids=[str(h['id']) for h in chunk],
+                embeddings=vectors[i:i + len(chunk)].tolist(),
+                metadatas=[HotelAgent._to_metadata(h, content_hash(h)) for h in chunk]
+            )
+        row['build_s'] = time.perf_counter() - start
+        row['vectors'] = count
+        engine = RetrievalEngine(backend, encoder=make_encoder(work_dir))
+        row.update(latency_row(engine, sample_queries(args.queries + 1), args.k))
+
+    row['peak_rss_mb'] = peak_rss_mb()
+    return row
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=str(project_root), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def regressions(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[Dict[str, Any]]:
+    """Metrics that got worse than the baseline run by more than ``tolerance``."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['stage'], r['scale']): r for r in json.load(f)['results']}
+    found = []
+    for row in results:
+        before = baseline.get((row['stage'], row['scale']))
+        if not before:
+            continue
+        for metric, value in row.items():
+            old = before.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if metric.endswith(LOWER_IS_BETTER):
+                change = value / old - 1
+            elif metric.endswith(HIGHER_IS_BETTER):
+                change = old / value - 1 if value else float("inf")
+            else:
+                continue
+            if change > tolerance:
+                found.append({'stage': row['stage'], 'scale': row['scale'], 'metric': metric,
+                              'baseline': old, 'current': value, 'worse_by': change})
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=["1k", "100k"], help="e.g. 1k 100k 1m")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--out", help="Result file (default: data/benchmarks/<timestamp>-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--embed-limit", type=int, default=5000)
+    parser.add_argument("--chroma-limit", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--index-kind", default="flat")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_stage(args.child, args.scale, Path(args.work_dir), args)))
+        return
+
+    passthrough = ["--embed-limit", str(args.embed_limit), "--chroma-limit", str(args.chroma_limit),
+                   "--batch-size", str(args.batch_size), "--dim", str(args.dim), "--index-kind", args.index_kind,
+                   "--queries", str(args.queries), "-k", str(args.k)]
+    results = []
+    for scale in args.scales:
+        n = parse_scale(scale)
+        work_dir = Path(tempfile.mkdtemp(prefix=f"hotel_suite_{scale}_"))
+        try:
+            for stage in args.stages:
+                proc = subprocess.run(
+                    [sys.executable, __file__, "--child", stage, "--scale", str(n), "--work-dir", str(work_dir)]
+                    + passthrough,
+                    capture_output=True, text=True, cwd=str(project_root)
+                )
+                if proc.returncode == 0:
+                    row = json.loads(proc.stdout.strip().splitlines()[-1])
+                else:
+                    row = {'error': proc.stderr.strip().splitlines()[-1:]}
+                row = {'stage': stage, 'scale': n, **row}
+                print(json.dumps(row))
+                results.append(row)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'encoder_backend': os.getenv("HOTEL_ENCODER_BACKEND", "torch"),
+        'results': results,
+    }
+    out = Path(args.out or project_root / "data" / "benchmarks" /
+               f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{commit}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"✅ Wrote {len(results)} results to {out}")
+
+    if args.baseline:
+        found = regressions(results, args.baseline, args.tolerance)
+        for regression in found:
+            print(json.dumps({'regression': regression}))
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Closed-loop load test for the search API (``agent/api.py``).
+
+    uvicorn agent.api:app --port 8000
+    python scripts/load_test_api.py --url http://127.0.0.1:8000 --concurrency 32 --duration 30
+
+Each worker thread sends /search requests back to back over its own
+keep-alive session. Client-side p50/p99 latency and QPS are printed
+together with the server's /metrics (including the mean micro-batch size).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+import requests
+
+QUERIES = [
+    "hotels in Skardu",
+    "cheap hotel in Hunza with wifi",
+    "4 star hotel in Islamabad with pool",
+    "family guest house near Naran with parking",
+    "hotel in Lahore under 15000 with breakfast",
+    "luxury resort in Murree",
+    "budget stay in Gilgit",
+    "hotel with airport shuttle in Karachi",
+]
+
+
+def run_worker(url: str, k: int, deadline: float, latencies: List[float], errors: List[int], lock: threading.Lock):
+    session = requests.Session()
+    local, failed = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.get(f"{url}/search", params={'q': random.choice(QUERIES), 'k': k}, timeout=30)
+            response.raise_for_status()
+            local.append(time.perf_counter() - start)
+        except requests.RequestException:
+            failed += 1
+    with lock:
+        latencies.extend(local)
+        errors.append(failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    latencies: List[float] = []
+    errors: List[int] = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(run_worker, args.url, args.k, deadline, latencies, errors, lock)
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    print(json.dumps({
+        'concurrency': args.concurrency,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'qps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(ms, 50)) if len(ms) else None,
+        'p99_ms': float(np.percentile(ms, 99)) if len(ms) else None,
+    }))
+    print(json.dumps({'server': requests.get(f"{args.url}/metrics", timeout=10).json()}))
+
+
+if __name__ == "__main__":
+    main()
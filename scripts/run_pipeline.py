@@ -1,16 +1,18 @@
 import logging
 from pathlib import Path
 import sys
-import time
 from datetime import datetime
 
 # Add the project root to Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
-from scraping.booking_scraper import BookingScraper
+from scraping.crawl_state import CrawlState
+from scraping.scheduler import scrape_cities
 from scraping.data_processor import HotelDataProcessor
 
+(project_root / "logs").mkdir(exist_ok=True)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,41 +24,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def run_pipeline():
-    """Run the complete data collection and processing pipeline."""
+CITIES = [
+    "Islamabad",
+    "Karachi",
+    "Lahore",
+    "Peshawar",
+    "Quetta",
+    "Skardu",
+    "Gilgit",
+    "Murree"
+]
+
+def run_pipeline(workers: int = 4, max_pages: int = 1, incremental: bool = True):
+    """Run the complete data collection and processing pipeline.
+    
+    Incremental runs resume an interrupted crawl, skip unchanged pages and
+    only pass added/changed/removed hotels downstream.
+    """
     try:
         # Create necessary directories
         (project_root / "logs").mkdir(exist_ok=True)
         (project_root / "data" / "raw").mkdir(parents=True, exist_ok=True)
         (project_root / "data" / "processed").mkdir(parents=True, exist_ok=True)
         
-        # Step 1: Scrape hotel data
+        # Step 1: Scrape hotel data with a pool of headless drivers; each
+        # city's raw file lands in data/raw/ as soon as it finishes
         logger.info("Starting data collection phase...")
-        scraper = BookingScraper()
+        state = CrawlState(str(project_root / "data" / "crawl_state.sqlite")) if incremental else None
         try:
-            cities = [
-                "Islamabad",
-                "Karachi",
-                "Lahore",
-                "Peshawar",
-                "Quetta",
-                "Skardu",
-                "Gilgit",
-                "Murree"
-            ]
-            
-            for city in cities:
-                logger.info(f"Scraping hotels in {city}")
-                scraper.scrape_city(city)
-                time.sleep(5)  # Be nice to the server
-                
+            written = scrape_cities(
+                CITIES,
+                workers=workers,
+                max_pages=max_pages,
+                out_dir=str(project_root / "data" / "raw"),
+                state=state,
+                price_history_dir=str(project_root / "data" / "price_history")
+            )
         finally:
-            scraper.close()
+            if state is not None:
+                state.close()
+        logger.info(f"Scraped {len(written)}/{len(CITIES)} cities")
             
         # Step 2: Process the collected data
         logger.info("Starting data processing phase...")
-        processor = HotelDataProcessor()
-        processed_hotels = processor.process_all_files()
+        processor = HotelDataProcessor(
+            raw_data_dir=str(project_root / "data" / "raw"),
+            processed_data_dir=str(project_root / "data" / "processed"),
+            price_history_dir=str(project_root / "data" / "price_history")
+        )
+        processed_hotels = processor.process_all_files(incremental=incremental)
         
         logger.info(f"Pipeline completed successfully. Processed {len(processed_hotels)} hotels.")
         
@@ -0,0 +1,159 @@
+"""Synthetic raw hotel records for offline benchmarks."""
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+CITIES = ["Islamabad", "Karachi", "Lahore", "Peshawar", "Quetta", "Skardu", "Gilgit", "Murree", "Hunza"]
+REGIONS = {
+    "Islamabad": "Islamabad Capital Territory",
+    "Karachi": "Sindh",
+    "Lahore": "Punjab",
+    "Peshawar": "Khyber Pakhtunkhwa",
+    "Quetta": "Balochistan",
+    "Skardu": "Gilgit-Baltistan",
+    "Gilgit": "Gilgit-Baltistan",
+    "Murree": "Punjab",
+    "Hunza": "Gilgit-Baltistan",
+}
+# City centres that synthetic hotels are scattered around (within about 10 km)
+CENTERS = {
+    "Islamabad": (33.6844, 73.0479),
+    "Karachi": (24.8607, 67.0011),
+    "Lahore": (31.5204, 74.3587),
+    "Peshawar": (34.0151, 71.5249),
+    "Quetta": (30.1798, 66.9750),
+    "Skardu": (35.2971, 75.6333),
+    "Gilgit": (35.9208, 74.3144),
+    "Murree": (33.9070, 73.3943),
+    "Hunza": (36.3167, 74.6500),
+}
+NAME_PARTS = ["Grand", "Royal", "Serena", "Pearl", "Mountain", "Lake", "View", "Palace", "Inn", "Lodge",
+              "Resort", "Continental", "Heritage", "Karakoram", "Shangrila", "Green", "Hill", "Pine"]
+AMENITIES = ["Wi-Fi", "Parking", "Breakfast", "Restaurant", "Room service", "Heating", "Airport shuttle", "Gym"]
+
+
+def synthetic_raw_hotel(i: int, rng: random.Random) -> Dict[str, Any]:
+    """One raw hotel in the shape HotelDataProcessor reads."""
+    city = rng.choice(CITIES)
+    name = " ".join(rng.sample(NAME_PARTS, 2)) + f" Hotel {i}"
+    min_price = rng.randrange(2000, 60000, 500)
+    # Separate stream so coordinates do not shift the other fields of later hotels
+    jitter = random.Random(i)
+    lat, lon = CENTERS[city]
+    return {
+        "id": f"synthetic_{i}",
+        "name": f"  {name}  ",
+        "description": f"{name} in {city} -- {rng.choice(['mountain', 'lake', 'city'])} views & free parking!",
+        "star_rating": rng.choice([None, 1, 2, 3, 3.5, 4, 5, "4"]),
+        "contact_info": {
+            "phone": f"+92-{rng.randrange(300, 350)}-{rng.randrange(1000000, 9999999)}",
+            "email": f"info@hotel{i}.pk",
+            "website": f"https://hotel{i}.pk",
+            "address": f"{rng.randrange(1, 500)} Main Road, {city}",
+            "city": city,
+            "region": REGIONS[city],
+        },
+        "price_range": {"min_price": min_price, "max_price": rng.choice([None, min_price * 2])},
+        "amenities": [{"name": a, "is_available": True} for a in rng.sample(AMENITIES, rng.randrange(0, 5))],
+        "images": [],
+        "source": rng.choice(["booking", "sastaticket"]),
+        "latitude": lat + jitter.uniform(-0.09, 0.09),
+        "longitude": lon + jitter.uniform(-0.09, 0.09),
+    }
+
+
+def iter_synthetic_hotels(n: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for i in range(n):
+        yield synthetic_raw_hotel(i, rng)
+
+
+def write_synthetic_ndjson(path: str, n: int, seed: int = 0) -> Path:
+    """Write ``n`` synthetic raw hotels as NDJSON without holding them in memory."""
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        for hotel in iter_synthetic_hotels(n, seed):
+            f.write(json.dumps(hotel, ensure_ascii=False) + "\n")
+    return out
+
+
+SYLLABLES = ["ka", "ra", "shi", "ma", "bal", "tis", "nan", "ga", "hun", "za", "deo", "sai", "pir", "lu",
+             "kho", "sha", "dar", "bu", "gul", "mir", "na", "sto", "ba", "zin", "rak", "po", "ti", "yar"]
+STREETS = ["Airport", "College", "Satpara", "Shigar", "Hospital", "Mall", "Canal", "Jinnah", "Iqbal", "Station"]
+
+
+def _pseudo_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randrange(2, 4))).capitalize()
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    """Drop, double or swap one inner character."""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    edit = rng.randrange(3)
+    if edit == 0:
+        return word[:i] + word[i + 1:]
+    if edit == 1:
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def _variant(hotel: Dict[str, Any], copy: int, rng: random.Random) -> Dict[str, Any]:
+    """Another source's listing of ``hotel``: reworded name, address and price."""
+    city = hotel["contact_info"]["city"]
+    words = hotel["name"].split()
+    if rng.random() < 0.5:
+        words = [_typo(w, rng) if rng.random() < 0.3 else w for w in words]
+    if "Hotel" in words and rng.random() < 0.5:
+        words.remove("Hotel")
+    elif rng.random() < 0.5:
+        words.insert(0, "Hotel")
+    if rng.random() < 0.4:
+        words.append(city)
+    name = " ".join(words)
+    name = name.upper() if rng.random() < 0.2 else name
+    return {
+        **hotel,
+        "id": f"{hotel['id']}~{copy}",
+        "name": name,
+        "contact_info": {
+            **hotel["contact_info"],
+            "phone": hotel["contact_info"]["phone"] if rng.random() < 0.5 else "",
+            "address": hotel["contact_info"]["address"].replace("Road", "Rd") if rng.random() < 0.5
+            else hotel["contact_info"]["address"],
+        },
+        "price_range": {"min_price": hotel["price_range"]["min_price"] + rng.randrange(-1000, 1500, 500),
+                        "max_price": None},
+        "source": "sastaticket" if hotel["source"] == "booking" else "booking",
+    }
+
+
+def iter_synthetic_listings(n: int, duplicate_rate: float = 0.3, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """``n`` raw listings where about ``duplicate_rate`` of them re-list an earlier hotel.
+
+    Hotels get distinct made-up names; a duplicate's id is its original's id
+    plus ``~<copy>``, which gives the ground truth for dedup benchmarks.
+    """
+    rng = random.Random(seed)
+    emitted, i = 0, 0
+    while emitted < n:
+        hotel = synthetic_raw_hotel(i, rng)
+        city = hotel["contact_info"]["city"]
+        name = f"{_pseudo_word(rng)} {rng.choice(NAME_PARTS)} Hotel"
+        hotel.update({
+            "name": name,
+            "description": f"{name} in {city} with {rng.choice(['mountain', 'lake', 'city'])} views",
+            "source": "booking",
+        })
+        hotel["contact_info"]["address"] = f"{rng.randrange(1, 2000)} {rng.choice(STREETS)} Road, {city}"
+        yield hotel
+        emitted += 1
+        copies = 0
+        while emitted < n and rng.random() < duplicate_rate:
+            copies += 1
+            yield _variant(hotel, copies, rng)
+            emitted += 1
+        i += 1
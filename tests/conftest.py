@@ -0,0 +1,81 @@
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from agent.hotel_table import HotelTable
+from vector_store.ann_index import IndexConfig, build_index, save_index
+from vector_store.doc_store import DocStore
+from vector_store.embedding_cache import CachedEncoder, EmbeddingCache
+from vector_store.lexical_index import LexicalIndex
+from vector_store.retrieval import hotel_text
+from vector_store.snapshots import publish_snapshot
+
+DIM = 32
+
+
+class HashModel:
+    """Bag-of-words hashing "model": texts sharing words get similar vectors."""
+
+    def encode(self, texts, **kwargs):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r'\w+', text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % DIM] += 1.0
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def make_hotel(hotel_id, name, city="Skardu", stars=3, price=8000.0, description="", amenities=()):
+    """Processed hotel record as written by ``HotelDataProcessor``."""
+    return {
+        'id': hotel_id,
+        'name': name,
+        'description': description or f"{name} is a hotel in {city}",
+        'star_rating': stars,
+        'price_range': {'min_price': price, 'max_price': price * 1.2, 'currency': 'PKR'},
+        'contact_info': {'city': city, 'address': f"Main Road, {city}"},
+        'amenities': [{'name': a, 'is_available': True} for a in amenities],
+    }
+
+
+def publish_hotels(index_dir, hotels, encoder):
+    """Publish ``hotels`` as a flat FAISS generation, the way ``embed_store`` does."""
+    embeddings = np.asarray(encoder.encode([hotel_text(h) for h in hotels]), dtype=np.float32)
+    config = IndexConfig()
+
+    def build(out):
+        DocStore.write(hotels, str(out))
+        LexicalIndex.build(hotels).save(str(out))
+        HotelTable.build(hotels).save(str(out))
+        save_index(build_index(embeddings, config), config, str(out))
+        return {'hotels': len(hotels), 'kind': config.kind, 'dim': DIM}
+
+    return publish_snapshot(str(index_dir), build)
+
+
+@pytest.fixture
+def encoder(tmp_path):
+    return CachedEncoder(HashModel(), "hash-test", EmbeddingCache(str(tmp_path / "embedding_cache")))
+
+
+@pytest.fixture
+def hotels():
+    return [
+        make_hotel("h1", "Kesar Palace", stars=4, price=15000.0, amenities=("WiFi", "Parking")),
+        make_hotel("h2", "Shangrila Resort", stars=5, price=30000.0, amenities=("WiFi", "Restaurant")),
+        make_hotel("h3", "Mountain View Guest House", stars=2, price=4000.0, amenities=("Parking",)),
+        make_hotel("h4", "Lake View Hotel", stars=3, price=9000.0, amenities=("WiFi", "Breakfast")),
+        make_hotel("h5", "Serena Hotel", city="Islamabad", stars=5, price=45000.0, amenities=("Pool",)),
+        make_hotel("h6", "Pearl Continental", city="Lahore", stars=5, price=40000.0, amenities=("Gym",)),
+        make_hotel("h7", "Budget Inn", stars=1, price=2500.0),
+        make_hotel("h8", "Riverside Lodge", stars=3, price=7000.0, amenities=("Heating",)),
+    ]
+
+
+@pytest.fixture
+def index_dir(tmp_path, hotels, encoder):
+    path = tmp_path / "faiss_index"
+    publish_hotels(path, hotels, encoder)
+    return path
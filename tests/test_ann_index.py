@@ -0,0 +1,98 @@
+import faiss
+import numpy as np
+import pytest
+
+from vector_store.ann_index import (
+    COMPACT_KINDS,
+    VECTORS_FILE,
+    IndexConfig,
+    RescoredIndex,
+    _load_embeddings,
+    build_index,
+    load_index,
+    save_index,
+)
+
+DIM = 16
+
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).standard_normal((300, DIM)).astype(np.float32)
+
+
+# Small enough for 300 training vectors of DIM=16
+KIND_CONFIGS = [
+    IndexConfig(kind="flat"),
+    IndexConfig(kind="ivf_flat", nlist=4, nprobe=4),
+    IndexConfig(kind="ivf_pq", nlist=2, nprobe=2, pq_m=4, pq_nbits=4),
+    IndexConfig(kind="hnsw", hnsw_m=8),
+    IndexConfig(kind="sq_fp16"),
+    IndexConfig(kind="sq_int8"),
+    IndexConfig(kind="binary", rescore=300),
+]
+
+
+@pytest.mark.parametrize("config", KIND_CONFIGS, ids=lambda c: c.kind)
+def test_every_kind_round_trips(tmp_path, embeddings, config):
+    index = build_index(embeddings, config)
+    save_index(index, config, str(tmp_path))
+    loaded = load_index(str(tmp_path))
+
+    assert loaded.ntotal == len(embeddings)
+    assert isinstance(loaded, RescoredIndex) == (config.kind in COMPACT_KINDS)
+    queries = embeddings[:20]
+    distances, ids = index.search(queries, 5)
+    loaded_distances, loaded_ids = loaded.search(queries, 5)
+    np.testing.assert_array_equal(loaded_ids, ids)
+    np.testing.assert_allclose(loaded_distances, distances, rtol=1e-5)
+    if config.kind != "ivf_pq":
+        # Everything but PQ codes finds each stored vector first
+        np.testing.assert_array_equal(ids[:, 0], np.arange(20))
+
+
+def test_rescoring_reorders_coarse_candidates_by_exact_distance():
+    # One sign pattern, so every row ties at Hamming distance 0
+    vectors = np.stack([np.full(8, value, dtype=np.float32) for value in (5.0, 3.0, 1.0, 2.0)])
+    coarse = faiss.IndexBinaryFlat(8)
+    coarse.add(np.packbits(vectors > 0, axis=1))
+    query = np.ones((1, 8), dtype=np.float32)
+
+    _, coarse_ids = RescoredIndex(coarse, vectors, rescore=0).search(query, 4)
+    assert coarse_ids[0].tolist() == [0, 1, 2, 3]
+
+    distances, ids = RescoredIndex(coarse, vectors, rescore=2).search(query, 4)
+    assert ids[0].tolist() == [2, 3, 1, 0]
+    np.testing.assert_allclose(distances[0], [0.0, 8.0, 32.0, 128.0])
+
+
+def test_rescoring_pads_missing_candidates():
+    vectors = np.eye(8, dtype=np.float32)[:3]
+    index = build_index(vectors, IndexConfig(kind="sq_fp16"))
+    distances, ids = index.search(vectors[:1], 5)
+    assert ids[0, 0] == 0 and ids[0, 3:].tolist() == [-1, -1]
+    assert np.isinf(distances[0, 3:]).all()
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf_flat", "hnsw", "sq_int8", "binary"])
+def test_reindexing_reads_exact_vectors(tmp_path, embeddings, kind):
+    config = IndexConfig(kind=kind, nlist=4)
+    save_index(build_index(embeddings, config), config, str(tmp_path))
+    np.testing.assert_array_equal(_load_embeddings(str(tmp_path), None), embeddings)
+
+
+def test_reindexing_refuses_lossy_vectors(tmp_path, embeddings):
+    config = IndexConfig(kind="ivf_pq", nlist=2, pq_m=4, pq_nbits=4)
+    save_index(build_index(embeddings, config), config, str(tmp_path))
+    with pytest.raises(ValueError, match="--embeddings"):
+        _load_embeddings(str(tmp_path), None)
+
+    config = IndexConfig(kind="sq_fp16")
+    save_index(build_index(embeddings, config), config, str(tmp_path))
+    (tmp_path / VECTORS_FILE).unlink()
+    with pytest.raises(FileNotFoundError, match=VECTORS_FILE):
+        _load_embeddings(str(tmp_path), None)
+
+    path = tmp_path / "embeddings.npy"
+    np.save(path, embeddings)
+    np.testing.assert_array_equal(_load_embeddings(str(tmp_path), str(path)), embeddings)
@@ -0,0 +1,43 @@
+import json
+
+from agent.main import HotelAgent
+from tests.conftest import make_hotel
+
+
+class FakeCollection:
+    """In-memory stand-in for the Chroma collection methods bulk loading uses."""
+
+    def __init__(self):
+        self.metadatas = {}
+
+    def get(self, ids, include):
+        found = [i for i in ids if i in self.metadatas]
+        return {'ids': found, 'metadatas': [self.metadatas[i] for i in found]}
+
+    def upsert(self, ids, embeddings, metadatas):
+        self.metadatas.update(zip(ids, metadatas))
+
+
+def make_agent(encoder):
+    agent = HotelAgent.__new__(HotelAgent)
+    agent.encoder = encoder
+    agent.collection = FakeCollection()
+    agent._index_changed = lambda: None
+    return agent
+
+
+def test_duplicates_are_counted_apart_from_unchanged(tmp_path, encoder):
+    path = tmp_path / "processed.ndjson"
+    records = [make_hotel("h1", "Kesar Palace"), make_hotel("h2", "Budget Inn"),
+               make_hotel("h1", "Kesar Palace", price=9999.0), make_hotel("h3", "Lake View Hotel"),
+               make_hotel("h2", "Budget Inn")]
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    agent = make_agent(encoder)
+
+    stats = agent.bulk_load_processed_data(str(path), chunk_size=2)
+    assert (stats['seen'], stats['duplicates']) == (5, 2)
+    # The last occurrence of h1 is the one stored
+    assert json.loads(agent.collection.metadatas["h1"]["price_range"])["min_price"] == 9999.0
+
+    stats = agent.bulk_load_processed_data(str(path), chunk_size=10)
+    assert (stats['upserted'], stats['skipped'], stats['duplicates']) == (0, 3, 2)
@@ -0,0 +1,50 @@
+from scraping.crawl_state import CrawlState
+
+
+def hotel(hotel_id, price="PKR 8,000"):
+    return {'id': hotel_id, 'name': f"Hotel {hotel_id}", 'price': price}
+
+
+def test_interrupted_run_resumes_at_the_next_page(tmp_path):
+    db = str(tmp_path / "crawl_state.sqlite")
+    state = CrawlState(db)
+    run_id = state.start_run(["Skardu", "Hunza"])
+    assert state.page_fetched(run_id, "Skardu", "skardu?page=0", 0, [hotel("a"), hotel("b")]) == 2
+    state.close()
+
+    state = CrawlState(db)
+    try:
+        assert state.start_run(["Skardu", "Hunza"]) == run_id
+        assert state.city_progress(run_id, "Skardu") == (1, False)
+        assert state.city_progress(run_id, "Hunza") == (0, False)
+        # Hotels queued before the interruption are still pending
+        assert {h['id'] for h in state.pending_hotels(run_id, "Skardu")} == {"a", "b"}
+    finally:
+        state.close()
+
+
+def test_next_run_reports_only_changes_and_removals(tmp_path):
+    state = CrawlState(str(tmp_path / "crawl_state.sqlite"))
+    try:
+        first = state.start_run(["Skardu"])
+        state.page_fetched(first, "Skardu", "skardu?page=0", 0, [hotel("a"), hotel("b")], etag="v1")
+        state.page_fetched(first, "Skardu", "skardu?page=1", 1, [hotel("c")])
+        state.finish_city(first, "Skardu", pages_scanned=2)
+        state.finish_run(first)
+        assert state.validators("skardu?page=0")['etag'] == "v1"
+
+        second = state.start_run(["Skardu"])
+        assert second != first
+        changed = state.page_fetched(second, "Skardu", "skardu?page=0", 0, [hotel("a"), hotel("b", "PKR 9,000")])
+        assert changed == 1
+        assert [h['id'] for h in state.pending_hotels(second, "Skardu")] == ["b"]
+        state.page_unchanged(second, "Skardu", "skardu?page=1", 1)
+        assert state.finish_city(second, "Skardu", pages_scanned=2) == []
+        state.finish_run(second)
+
+        third = state.start_run(["Skardu"])
+        state.page_fetched(third, "Skardu", "skardu?page=0", 0, [hotel("a")])
+        # Only page 0 was scanned, so "c" on page 1 is not treated as removed
+        assert state.finish_city(third, "Skardu", pages_scanned=1) == ["b"]
+    finally:
+        state.close()
@@ -0,0 +1,62 @@
+import json
+
+import pandas as pd
+import pytest
+
+from scraping.data_processor import PROCESSED_COLUMNS, HotelDataProcessor
+from scraping.hotel_dataset import read_hotels
+
+
+def raw_hotel(i, city="Skardu", **extra):
+    return {"id": f"h{i}", "name": f"Hotel {i}", "contact_info": {"city": city},
+            "price_range": {"min_price": 1000 + i}, **extra}
+
+
+def write_ndjson(path, records, tail=""):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records) + tail, encoding="utf-8")
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    # Key order differs from file to file and some records carry extra fields
+    write_ndjson(raw / "a.ndjson", [raw_hotel(i) for i in range(5)])
+    write_ndjson(raw / "b.ndjson", [
+        {"extra": "x", **dict(reversed(list(raw_hotel(i, "Lahore", latitude=31.5, longitude=74.3).items())))}
+        for i in range(10, 14)
+    ])
+    return raw
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_streaming_csv_columns_are_fixed(raw_dir, tmp_path, workers):
+    out = tmp_path / "processed"
+    stats = HotelDataProcessor(str(raw_dir), str(out)).process_all_files_streaming(workers=workers, chunk_size=2)
+    assert stats["processed"] == 9
+    frame = pd.read_csv(next(out.glob("*.csv")))
+    assert list(frame.columns) == PROCESSED_COLUMNS
+    assert frame["id"].tolist() == [f"h{i}" for i in range(5)] + [f"h{i}" for i in range(10, 14)]
+    assert frame.loc[frame["id"] == "h10", "latitude"].item() == pytest.approx(31.5)
+    assert len(read_hotels(str(out / "hotels_parquet"))) == 9
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failed_file_leaves_no_rows_and_is_retried(raw_dir, tmp_path, workers):
+    write_ndjson(raw_dir / "c.ndjson", [raw_hotel(i, "Murree") for i in range(20, 26)], tail="{broken\n")
+    out = tmp_path / "processed"
+    processor = HotelDataProcessor(str(raw_dir), str(out))
+    stats = processor.process_all_files_streaming(workers=workers, chunk_size=2, incremental=True)
+
+    assert stats["processed"] == 9
+    assert sum(1 for _ in open(stats["output"], encoding="utf-8")) == 9
+    assert "Murree" not in set(read_hotels(str(out / "hotels_parquet"))["city"])
+    assert sorted(json.loads((out / "processed_files.json").read_text())) == ["a.ndjson", "b.ndjson"]
+    # No staging parts or .part files are left behind
+    assert not (out / "hotels_parquet" / "_staging").exists()
+    assert not list(out.glob(".*.part"))
+
+    write_ndjson(raw_dir / "c.ndjson", [raw_hotel(i, "Murree") for i in range(20, 26)])
+    stats = processor.process_all_files_streaming(workers=workers, chunk_size=2, incremental=True)
+    assert stats["processed"] == 6
+    assert (read_hotels(str(out / "hotels_parquet"))["city"] == "Murree").sum() == 6
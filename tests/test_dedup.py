@@ -0,0 +1,84 @@
+from scraping.dedup import dedupe, merge_listings, normalize_name
+
+
+def listing(hotel_id, name, source, address="Satellite Town Road, Skardu", city="Skardu", price=8000.0,
+            description="", amenities=()):
+    return {
+        'id': hotel_id,
+        'name': name,
+        'description': description or f"{name} is a hotel in {city}",
+        'star_rating': 3,
+        'price_range': {'min_price': price, 'max_price': price * 1.2, 'currency': 'PKR'},
+        'contact_info': {'city': city, 'address': address},
+        'amenities': [{'name': a, 'is_available': True} for a in amenities],
+        'source': source,
+    }
+
+
+def test_normalize_name_drops_generic_and_city_words():
+    assert normalize_name("Hotel Mashabrum Skardu", "Skardu") == "mashabrum"
+    # Nothing distinctive left: the whole name is kept
+    assert normalize_name("Skardu Hotel", "Skardu") == "skardu hotel"
+
+
+def test_listings_of_the_same_property_are_merged():
+    hotels = [
+        listing("b1", "Hotel Mashabrum Skardu", "booking", price=9000.0, amenities=("WiFi",)),
+        listing("s1", "Mashabrum Hotel", "sastaticket", price=7500.0, amenities=("Parking", "wifi"),
+                description="Mashabrum Hotel sits on Satellite Town Road with views of the Indus valley"),
+        listing("b2", "Kesar Palace", "booking", address="College Road, Skardu"),
+    ]
+    records, stats = dedupe(hotels)
+    assert stats['input'] == 3 and stats['output'] == 2 and stats['merged_clusters'] == 1
+
+    merged, single = records
+    assert {p['source_id'] for p in merged['provenance']} == {"b1", "s1"}
+    assert {p['source'] for p in merged['provenance']} == {"booking", "sastaticket"}
+    assert merged['price_range']['min_price'] == 7500.0
+    assert merged['price_range']['max_price'] == 9000.0 * 1.2
+    assert sorted(a['name'].lower() for a in merged['amenities']) == ["parking", "wifi"]
+    assert merged['description'].startswith("Mashabrum Hotel sits")
+    assert [p['source_id'] for p in single['provenance']] == ["b2"]
+
+
+def test_same_name_on_a_different_street_stays_apart():
+    hotels = [
+        listing("b1", "Karakoram Hotel", "booking", address="12 Canal Road, Skardu"),
+        listing("s1", "Karakoram Hotel", "sastaticket", address="7 Airport Road, Skardu"),
+    ]
+    records, stats = dedupe(hotels)
+    assert len(records) == 2 and stats['merged_clusters'] == 0
+
+
+def test_hotels_in_different_cities_never_merge():
+    hotels = [
+        listing("b1", "Serena Hotel", "booking", city="Islamabad", address="Khayaban-e-Suhrwardy"),
+        listing("b2", "Serena Hotel", "booking", city="Gilgit", address="Khayaban-e-Suhrwardy"),
+    ]
+    records, stats = dedupe(hotels)
+    assert len(records) == 2 and stats['candidate_pairs'] == 0
+
+
+def test_encoder_can_veto_a_match():
+    hotels = [
+        listing("b1", "Hotel Mashabrum Skardu", "booking"),
+        listing("s1", "Mashabrum Hotel", "sastaticket"),
+    ]
+    assert len(dedupe(hotels)[0]) == 1
+
+
+    def orthogonal(texts):
+        return [[1.0, 0.0], [0.0, 1.0]][:len(texts)]
+
+    records, stats = dedupe(hotels, encode=orthogonal)
+    assert len(records) == 2 and stats['matched_pairs'] == 0
+
+
+def test_merge_keeps_existing_provenance_and_coordinates():
+    first = listing("b1", "Mashabrum Hotel", "booking")
+    first['provenance'] = [{'source': "booking", 'source_id': "b0"}, {'source': "sastaticket", 'source_id': "s0"}]
+    second = listing("s1", "Mashabrum Hotel", "sastaticket")
+    second['latitude'], second['longitude'] = 35.3, 75.6
+    merged = merge_listings([first, second])
+    assert [p['source_id'] for p in merged['provenance']] == ["b0", "s0", "s1"]
+    assert (merged['latitude'], merged['longitude']) == (35.3, 75.6)
@@ -0,0 +1,84 @@
+from vector_store.doc_store import DELTA_SEGMENT, DocStore, SegmentedDocStore, record_from_csv_row
+
+RECORDS = [{"id": f"h{i}", "name": f"Hotel {i}", "city": "Skardu"} for i in range(5)]
+
+
+def test_write_get_and_get_many(tmp_path):
+    assert DocStore.write(RECORDS, str(tmp_path)) == 5
+    assert not list(tmp_path.glob("*.tmp"))
+
+    store = DocStore(str(tmp_path))
+    assert len(store) == 5
+    assert store.get(3) == RECORDS[3]
+    assert store.get_many([4, 0, 4]) == [RECORDS[4], RECORDS[0], RECORDS[4]]
+    # FAISS pads short result lists with -1
+    assert store.get_many([1, -1, -1]) == [RECORDS[1]]
+    assert store.get_many([5]) == []
+    store.close()
+
+
+def test_non_ascii_text_round_trips(tmp_path):
+    record = {"id": "h1", "name": "Shangrila Résort — شنگریلا"}
+    DocStore.write([record], str(tmp_path))
+    store = DocStore(str(tmp_path))
+    assert store.get(0) == record
+    store.close()
+
+
+def test_empty_store(tmp_path):
+    assert DocStore.write([], str(tmp_path)) == 0
+    assert (tmp_path / "docs.bin").stat().st_size == 0
+
+    store = DocStore(str(tmp_path))
+    assert len(store) == 0
+    assert store.get_many([0, -1]) == []
+    store.close()
+
+
+def test_rewrite_replaces_the_store(tmp_path):
+    DocStore.write(RECORDS, str(tmp_path))
+    DocStore.write(RECORDS[:2], str(tmp_path))
+    store = DocStore(str(tmp_path))
+    assert store.get_many(range(5)) == RECORDS[:2]
+    store.close()
+
+
+def test_segments_continue_row_numbers(tmp_path):
+    DocStore.write(RECORDS[:3], str(tmp_path))
+    store = SegmentedDocStore.open(str(tmp_path))
+    assert len(store.segments) == 1 and len(store) == 3
+    store.close()
+
+    DocStore.write(RECORDS[3:], str(tmp_path), DELTA_SEGMENT)
+    store = SegmentedDocStore.open(str(tmp_path))
+    assert len(store.segments) == 2 and len(store) == 5
+    assert [store.get(i)["id"] for i in range(5)] == [r["id"] for r in RECORDS]
+    assert store.get_many([4, -1, 2, 5]) == [RECORDS[4], RECORDS[2]]
+    store.close()
+
+
+def test_empty_middle_segment_is_skipped(tmp_path):
+    DocStore.write(RECORDS[:2], str(tmp_path))
+    DocStore.write([], str(tmp_path), "empty")
+    DocStore.write(RECORDS[2:], str(tmp_path), DELTA_SEGMENT)
+    store = SegmentedDocStore([
+        DocStore(str(tmp_path)), DocStore(str(tmp_path), "empty"), DocStore(str(tmp_path), DELTA_SEGMENT)
+    ])
+    assert store.starts == [0, 2, 2, 5]
+    assert store.get_many(range(5)) == RECORDS
+    store.close()
+
+
+def test_record_from_csv_row():
+    record = record_from_csv_row({
+        "hotel_name": " Serena Hotel ",
+        "city": "Skardu",
+        "location": "Satellite Town",
+        "price": "PKR 12,500",
+        "url": "https://www.booking.com/hotel/pk/serena.html?aid=1",
+        "rating": "8.7",
+    })
+    assert record["name"] == "Serena Hotel"
+    assert record["price_range"]["min_price"] == 12500
+    assert record["contact_info"]["city"] == "Skardu"
+    assert record["id"]
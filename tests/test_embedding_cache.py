@@ -0,0 +1,106 @@
+import multiprocessing
+import zlib
+
+import numpy as np
+
+from vector_store.embedding_cache import CachedEncoder, EmbeddingCache
+
+MODEL = "all-MiniLM-L6-v2"
+
+
+def vector_for(text, dim=8):
+    """Deterministic vector per text, so a wrong row is detectable."""
+    return np.random.default_rng(zlib.crc32(text.encode())).random(dim, dtype=np.float32)
+
+
+def _writer(cache_dir, worker, n):
+    cache = EmbeddingCache(cache_dir, capacity=10_000)
+    for start in range(0, n, 10):
+        texts = [f"worker {worker} text {i}" for i in range(start, start + 10)]
+        cache.store(MODEL, texts, np.stack([vector_for(t) for t in texts]))
+    cache.close()
+
+
+def test_store_and_lookup(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    texts = ["a", "b", "c"]
+    cache.store(MODEL, texts, np.stack([vector_for(t) for t in texts]))
+    # The sentence-transformers/ prefix names the same model
+    found = cache.lookup(f"sentence-transformers/{MODEL}", ["c", "x", "a"])
+    assert sorted(found) == [0, 2]
+    np.testing.assert_array_equal(found[0], vector_for("c"))
+    np.testing.assert_array_equal(found[2], vector_for("a"))
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), capacity=2)
+    cache.store(MODEL, ["a"], vector_for("a")[None])
+    cache.store(MODEL, ["b"], vector_for("b")[None])
+    cache.lookup(MODEL, ["a"])
+    cache.store(MODEL, ["c"], vector_for("c")[None])
+    assert sorted(cache.lookup(MODEL, ["a", "b", "c"])) == [0, 2]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lookup_before_any_store_writes_nothing(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    assert cache.lookup(MODEL, ["a"]) == {}
+    assert not list(tmp_path.glob("*.f32"))
+    assert cache._conn.execute("SELECT COUNT(*) FROM models").fetchone()[0] == 0
+
+
+def test_batch_store_evicts_oldest_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), capacity=3)
+    cache.store(MODEL, ["a", "b", "c"], np.stack([vector_for(t) for t in "abc"]))
+    cache.lookup(MODEL, ["b"])
+    # "c" is rewritten in place; "d" and "e" take the rows of "a" and "b"
+    cache.store(MODEL, ["c", "d", "e"], np.stack([vector_for(t) for t in "cde"]))
+    found = cache.lookup(MODEL, ["a", "b", "c", "d", "e"])
+    assert sorted(found) == [2, 3, 4]
+    for pos, text in zip([2, 3, 4], "cde"):
+        np.testing.assert_array_equal(found[pos], vector_for(text))
+    assert cache.stats()["evictions"] == 2
+
+
+def test_overwritten_row_is_a_miss(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.store(MODEL, ["a"], vector_for("a")[None])
+    # Simulate another process reusing the row for a different vector
+    cache._matrices[MODEL][0] = vector_for("other")
+    assert cache.lookup(MODEL, ["a"]) == {}
+
+
+def test_processes_never_share_rows(tmp_path):
+    n = 200
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_writer, args=(str(tmp_path), w, n)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    cache = EmbeddingCache(str(tmp_path), capacity=10_000)
+    texts = [f"worker {w} text {i}" for w in range(4) for i in range(n)]
+    found = cache.lookup(MODEL, texts)
+    assert len(found) == len(texts)
+    for pos, text in enumerate(texts):
+        np.testing.assert_array_equal(found[pos], vector_for(text))
+
+
+def test_cached_encoder_only_encodes_misses(tmp_path):
+    class Model:
+        calls = []
+
+        def encode(self, texts, **kwargs):
+            self.calls.append(list(texts))
+            return np.stack([vector_for(t) for t in texts])
+
+    model = Model()
+    encoder = CachedEncoder(model, MODEL, EmbeddingCache(str(tmp_path)))
+    encoder.encode(["a", "b"])
+    vectors = encoder.encode(["b", "c"])
+    assert model.calls == [["a", "b"], ["c"]]
+    np.testing.assert_array_equal(vectors[1], vector_for("c"))
+    assert encoder.encode("a").shape == (8,)
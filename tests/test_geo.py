@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from agent.geo import GeoIndex, haversine_km
+
+SKARDU = (35.2971, 75.6333)
+HUNZA = (36.3167, 74.6500)
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(7)
+    # Clusters around two towns plus a scatter over northern Pakistan
+    lats = np.concatenate([
+        rng.normal(SKARDU[0], 0.1, 400), rng.normal(HUNZA[0], 0.05, 200), rng.uniform(24, 37, 400)
+    ])
+    lons = np.concatenate([
+        rng.normal(SKARDU[1], 0.1, 400), rng.normal(HUNZA[1], 0.05, 200), rng.uniform(61, 77, 400)
+    ])
+    # Unknown coordinates are never inside any radius
+    lats[::50] = np.nan
+    lons[::70] = np.nan
+    return lats, lons
+
+
+GEO_CASES = [
+    # (cell_deg, lat, lon, radius_km)
+    (0.05, *SKARDU, 0.5),
+    (0.05, *SKARDU, 5.0),
+    (0.05, *SKARDU, 25.0),
+    (0.05, *HUNZA, 3.0),
+    (0.05, *HUNZA, 150.0),
+    (0.05, 30.0, 70.0, 50.0),
+    (0.05, 33.6844, 73.0479, 0.0),
+    (1.0, *SKARDU, 5.0),
+    (1.0, *SKARDU, 400.0),
+    (0.01, *SKARDU, 12.0),
+]
+
+
+@pytest.mark.parametrize("cell_deg, lat, lon, radius_km", GEO_CASES)
+def test_mask_matches_brute_force(points, cell_deg, lat, lon, radius_km):
+    lats, lons = points
+    index = GeoIndex(lats, lons, cell_deg=cell_deg)
+    with np.errstate(invalid="ignore"):
+        expected = haversine_km(lat, lon, lats, lons) <= radius_km
+    np.testing.assert_array_equal(index.mask(lat, lon, radius_km), expected)
+
+
+@pytest.mark.parametrize("cell_deg, lat, lon, radius_km", GEO_CASES)
+def test_within_is_sorted_by_distance(points, cell_deg, lat, lon, radius_km):
+    lats, lons = points
+    rows, distances = GeoIndex(lats, lons, cell_deg=cell_deg).within(lat, lon, radius_km)
+    assert np.all(np.diff(distances) >= 0)
+    np.testing.assert_allclose(distances, haversine_km(lat, lon, lats[rows], lons[rows]))
+
+
+def test_nearest_matches_brute_force(points):
+    lats, lons = points
+    index = GeoIndex(lats, lons)
+    distances = haversine_km(*HUNZA, lats, lons)
+    distances[np.isnan(distances)] = np.inf
+    rows, found = index.nearest(*HUNZA, k=10)
+    np.testing.assert_allclose(found, np.sort(distances)[:10])
+
+    allowed = np.arange(len(lats)) % 3 == 0
+    rows, found = index.nearest(*HUNZA, k=5, allowed=allowed)
+    assert allowed[rows].all()
+    np.testing.assert_allclose(found, np.sort(distances[allowed])[:5])
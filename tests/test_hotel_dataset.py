@@ -0,0 +1,91 @@
+import pyarrow.dataset as ds
+import pytest
+
+from scraping import hotel_dataset
+from scraping.hotel_dataset import (
+    EMBEDDING_COLUMNS,
+    append_hotels,
+    compact,
+    iter_hotel_records,
+    read_hotels,
+)
+from tests.conftest import make_hotel
+
+
+def hotel(hotel_id, city="Skardu", scraped_at="2024-05-01", **kwargs):
+    record = make_hotel(hotel_id, f"Hotel {hotel_id}", city=city, amenities=("Wi-Fi", "Parking"), **kwargs)
+    record.update(source="booking", scraped_at=scraped_at, latitude=35.3, longitude=75.6)
+    return record
+
+
+def files_under(path):
+    return sorted(p.relative_to(path).as_posix() for p in path.rglob("*") if p.is_file())
+
+
+def test_round_trip_keeps_nested_fields(tmp_path):
+    hotels = [hotel("h1"), hotel("h2", city="Hunza", stars=5, price=20000.0)]
+    assert append_hotels(hotels, str(tmp_path)) == 2
+
+    records = {r["id"]: r for r in iter_hotel_records(str(tmp_path))}
+    assert set(records) == {"h1", "h2"}
+    h2 = records["h2"]
+    assert h2["name"] == "Hotel h2" and h2["star_rating"] == 5
+    assert h2["contact_info"]["city"] == "Hunza"
+    assert h2["contact_info"]["address"] == "Main Road, Hunza"
+    assert h2["price_range"]["min_price"] == 20000.0 and h2["price_range"]["currency"] == "PKR"
+    assert [a["name"] for a in h2["amenities"]] == ["Wi-Fi", "Parking"]
+    assert (h2["source"], h2["scraped_at"], h2["latitude"]) == ("booking", "2024-05-01", 35.3)
+
+
+def test_partitions_projection_and_filters(tmp_path):
+    append_hotels([hotel("h1"), hotel("h2", city="Hunza"), hotel("h3", stars=5)], str(tmp_path))
+    assert {p.parent.as_posix() for p in tmp_path.rglob("*.parquet")} == {
+        (tmp_path / "city=Skardu" / "source=booking").as_posix(),
+        (tmp_path / "city=Hunza" / "source=booking").as_posix(),
+    }
+
+    df = read_hotels(str(tmp_path), columns=EMBEDDING_COLUMNS,
+                     filter=(ds.field("city") == "Skardu") & (ds.field("star_rating") >= 4))
+    assert list(df.columns) == EMBEDDING_COLUMNS
+    assert df["id"].tolist() == ["h3"]
+
+
+def test_append_never_rewrites_existing_files(tmp_path):
+    append_hotels([hotel("h1")], str(tmp_path))
+    before = files_under(tmp_path)
+    mtimes = {name: (tmp_path / name).stat().st_mtime_ns for name in before}
+
+    append_hotels([hotel("h1", scraped_at="2024-06-01")], str(tmp_path))
+    after = files_under(tmp_path)
+    assert set(before) < set(after) and len(after) == 2
+    assert all((tmp_path / name).stat().st_mtime_ns == mtimes[name] for name in before)
+    assert len(read_hotels(str(tmp_path))) == 2
+
+
+def test_compact_keeps_latest_row_and_leaves_no_staging(tmp_path):
+    dataset = tmp_path / "hotels_parquet"
+    append_hotels([hotel("h1", stars=2), hotel("h2")], str(dataset))
+    append_hotels([hotel("h1", stars=4, scraped_at="2024-06-01")], str(dataset))
+
+    assert compact(str(dataset)) == 2
+    df = read_hotels(str(dataset)).set_index("id")
+    assert df.loc["h1", "star_rating"] == 4
+    assert [p.name for p in tmp_path.iterdir()] == ["hotels_parquet"]
+    assert all(name.endswith(".parquet") and "/part-compacted-" in name for name in files_under(dataset))
+
+
+def test_failed_compaction_leaves_the_dataset_and_no_partial_files(tmp_path, monkeypatch):
+    dataset = tmp_path / "hotels_parquet"
+    append_hotels([hotel("h1"), hotel("h1", scraped_at="2024-06-01")], str(dataset))
+    before = files_under(dataset)
+    write_dataset = ds.write_dataset
+
+    def fail_after_writing(*args, **kwargs):
+        write_dataset(*args, **kwargs)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(hotel_dataset.ds, "write_dataset", fail_after_writing)
+    with pytest.raises(OSError):
+        compact(str(dataset))
+    assert [p.name for p in tmp_path.iterdir()] == ["hotels_parquet"]
+    assert files_under(dataset) == before
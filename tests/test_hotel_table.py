@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from agent.hotel_table import HotelTable
+from agent.query_parser import QueryConstraints
+from tests.conftest import make_hotel
+
+
+def located(hotel, lat, lon):
+    # Stored as float32 in the table; keep the records on the same values
+    hotel.update(latitude=float(np.float32(lat)), longitude=float(np.float32(lon)))
+    return hotel
+
+
+def unknown_price(hotel):
+    hotel["price_range"] = {"min_price": None, "max_price": None, "currency": "PKR"}
+    return hotel
+
+
+def unknown_stars(hotel):
+    hotel["star_rating"] = None
+    return hotel
+
+
+HOTELS = [
+    located(make_hotel("h1", "Serena", stars=5, price=30000.0, amenities=("Wi-Fi", "Swimming pool")), 35.2971, 75.6333),
+    located(make_hotel("h2", "Mashabrum", stars=3, price=9000.0, amenities=("Free parking",)), 35.3050, 75.6280),
+    located(make_hotel("h3", "Karimabad Inn", city="Hunza", stars=2, price=4000.0), 36.3167, 74.6500),
+    make_hotel("h4", "Old Town Lodge", city="skardu", stars=4, price=12000.0, amenities=("wifi", "Parking")),
+    located(unknown_price(make_hotel("h5", "Lakeside", stars=3, amenities=("Internet",))), 35.4140, 75.4450),
+    located(unknown_stars(make_hotel("h6", "Guest House", price=3000.0)), 35.2990, 75.6400),
+    unknown_stars(unknown_price(make_hotel("h7", "Unlisted", city="Hunza"))),
+]
+HOTELS[1]["amenities"].append({"name": "Breakfast", "is_available": False})
+
+NEAR_SKARDU = dict(latitude=35.2971, longitude=75.6333)
+
+CONSTRAINTS = [
+    QueryConstraints(),
+    QueryConstraints(city="Skardu"),
+    QueryConstraints(city="HUNZA"),
+    QueryConstraints(city="Gilgit"),
+    QueryConstraints(min_stars=3),
+    QueryConstraints(max_stars=3),
+    QueryConstraints(min_stars=2, max_stars=4),
+    QueryConstraints(max_price=10000),
+    QueryConstraints(max_price=3000),
+    QueryConstraints(amenities=["wifi"]),
+    QueryConstraints(amenities=["wifi", "parking"]),
+    QueryConstraints(amenities=["breakfast"]),
+    QueryConstraints(amenities=["spa"]),
+    QueryConstraints(radius_km=2.0, **NEAR_SKARDU),
+    QueryConstraints(radius_km=25.0, **NEAR_SKARDU),
+    QueryConstraints(radius_km=500.0, **NEAR_SKARDU),
+    QueryConstraints(city="skardu", max_price=15000, amenities=["wifi"]),
+    QueryConstraints(min_stars=3, max_price=20000, radius_km=25.0, **NEAR_SKARDU),
+]
+
+
+@pytest.fixture(scope="module")
+def table():
+    return HotelTable.build(HOTELS)
+
+
+@pytest.mark.parametrize("constraints", CONSTRAINTS, ids=lambda c: repr(c.model_dump(exclude_defaults=True)))
+def test_mask_agrees_with_matches(table, constraints):
+    assert table.mask(constraints).tolist() == [constraints.matches(h) for h in HOTELS]
+
+
+def test_no_constraints_keep_every_row(table):
+    assert table.mask(None).all()
+
+
+def city_names(table):
+    return [table.cities[code].lower() for code in table.city]
+
+
+def test_concat_remaps_string_pools(table):
+    first = HotelTable.build(HOTELS[:3])
+    second = HotelTable.build([make_hotel("h8", "Eagle's Nest", city="Hunza"), *HOTELS[3:]])
+    assert first.cities == ["Skardu", "Hunza"] and second.cities == ["Hunza", "skardu"]
+
+    merged = HotelTable.concat([first, second])
+    assert merged.cities == ["Skardu", "Hunza"]
+    assert city_names(merged) == city_names(first) + city_names(second)
+    for constraints in (QueryConstraints(city="Skardu"), QueryConstraints(city="hunza")):
+        expected = np.concatenate([first.mask(constraints), second.mask(constraints)])
+        assert merged.mask(constraints).tolist() == expected.tolist()
+    np.testing.assert_array_equal(merged.min_price, np.concatenate([first.min_price, second.min_price]))
+    assert HotelTable.concat([table]) is table
+
+
+def test_concat_keeps_missing_coordinates(table):
+    merged = HotelTable.concat([table, HotelTable.build(HOTELS[:1])])
+    assert np.isnan(merged.latitude[[3, 6]]).all() and merged.latitude[7] == table.latitude[0]
+
+
+SORT_CASES = [
+    # (column, descending, expected ids)
+    ("min_price", False, ["h6", "h3", "h2", "h4", "h1", "h5", "h7"]),
+    ("min_price", True, ["h1", "h4", "h2", "h3", "h6", "h5", "h7"]),
+    ("max_price", True, ["h1", "h4", "h2", "h3", "h6", "h5", "h7"]),
+    ("star_rating", False, ["h3", "h2", "h5", "h4", "h1", "h6", "h7"]),
+    ("star_rating", True, ["h1", "h4", "h2", "h5", "h3", "h6", "h7"]),
+]
+
+
+@pytest.mark.parametrize("by, descending, expected", SORT_CASES)
+def test_sort_puts_unknown_values_last(table, by, descending, expected):
+    rows = table.sort(np.arange(len(table)), by, descending)
+    assert [HOTELS[i]["id"] for i in rows] == expected
+
+
+def test_sort_only_reorders_the_given_rows(table):
+    assert table.sort(np.array([6, 0, 2]), "min_price").tolist() == [2, 0, 6]
+    with pytest.raises(ValueError):
+        table.sort(np.arange(len(table)), "name")
+
+
+def test_save_and_load_round_trip(table, tmp_path):
+    table.save(str(tmp_path))
+    loaded = HotelTable.load(str(tmp_path))
+    assert loaded.cities == table.cities
+    for constraints in CONSTRAINTS:
+        assert loaded.mask(constraints).tolist() == table.mask(constraints).tolist()
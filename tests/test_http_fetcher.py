@@ -0,0 +1,123 @@
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from scraping.booking_scraper import search_url
+from scraping.fixture_server import FIXTURES_DIR, serve_fixtures
+from scraping.http_fetcher import HttpListingFetcher, is_js_gated, make_session, parse_listings_html
+
+FIXTURE_NAMES = ["Shangrila Resort Skardu", "MONTAGNA PODS", "Areena Hotel"]
+
+
+@contextmanager
+def serve_statuses(statuses, page):
+    """Answer with each status in turn (then 200), counting requests."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            status = statuses[len(calls) - 1] if len(calls) <= len(statuses) else 200
+            body = page.encode() if status == 200 else b"busy"
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", calls
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_parses_saved_fixture_page():
+    page = (FIXTURES_DIR / "booking_search.html").read_text(encoding="utf-8")
+    hotels = parse_listings_html(page, "Skardu")
+    assert [h["hotel_name"] for h in hotels] == FIXTURE_NAMES
+    assert hotels[0] == {
+        "hotel_name": "Shangrila Resort Skardu",
+        "location": "Lower Kachura, Skardu",
+        "price": "PKR 32,500",
+        "rating": "8.6",
+        "url": "https://www.booking.com/hotel/pk/shangrila-resort.html?aid=1&hpos=1",
+        "city": "Skardu",
+    }
+    # Missing fields fall back like the Selenium parser
+    assert hotels[1]["rating"] == "N/A" and hotels[2]["price"] == "N/A"
+
+
+def test_cards_without_title_or_link_are_skipped():
+    page = """<html><body>
+        <div data-testid="property-card"><div data-testid="title">No link</div></div>
+        <div data-testid="property-card"><a href="/hotel/pk/x.html">untitled</a></div>
+    </body></html>"""
+    assert parse_listings_html(page, "Skardu") == []
+
+
+@pytest.mark.parametrize("status, page, gated", [
+    (200, '<div data-testid="property-card"></div>', False),
+    (200, "<script>window.awsWafCookieDomainList = []</script>", True),
+    (200, "<noscript>Please enable JavaScript</noscript>", True),
+    (200, "<html><body>No properties found</body></html>", False),
+    (202, "", True),
+    (429, "", True),
+])
+def test_is_js_gated(status, page, gated):
+    assert is_js_gated(status, page) is gated
+
+
+def test_fetches_fixture_server_over_http():
+    fetcher = HttpListingFetcher(make_session(pool_size=2))
+    with serve_fixtures() as base_url:
+        listings = fetcher.fetch_page(search_url("Hunza", 0, base_url), "Hunza")
+        assert [h["hotel_name"] for h in listings] == FIXTURE_NAMES
+        assert {h["city"] for h in listings} == {"Hunza"}
+
+        first = fetcher.fetch_page_conditional(search_url("Hunza", 0, base_url), "Hunza")
+        again = fetcher.fetch_page_conditional(
+            search_url("Hunza", 0, base_url), "Hunza", content_hash=first["content_hash"]
+        )
+    fetcher.close()
+    assert not first["not_modified"] and again["not_modified"]
+    assert fetcher.http_pages == 3 and fetcher.browser_pages == 0
+
+
+def test_js_gated_page_uses_browser_fallback(tmp_path):
+    (tmp_path / "gated.html").write_text("<p>captcha</p>", encoding="utf-8")
+    fallback_calls = []
+
+    def fallback(url, city):
+        fallback_calls.append(city)
+        return [{"hotel_name": "From browser", "city": city}]
+
+    fetcher = HttpListingFetcher(make_session(), browser_fallback=fallback)
+    with serve_fixtures(tmp_path, "gated.html") as base_url:
+        listings = fetcher.fetch_page(search_url("Skardu", 0, base_url), "Skardu")
+        no_fallback = HttpListingFetcher(make_session()).fetch_page(search_url("Skardu", 0, base_url), "Skardu")
+    assert listings == [{"hotel_name": "From browser", "city": "Skardu"}]
+    assert fallback_calls == ["Skardu"] and fetcher.browser_pages == 1
+    assert no_fallback == []
+
+
+def test_retries_server_errors():
+    page = (FIXTURES_DIR / "booking_search.html").read_text(encoding="utf-8")
+    with serve_statuses([503], page) as (base_url, calls):
+        listings = HttpListingFetcher(make_session(retries=2)).fetch_page(search_url("Skardu", 0, base_url), "Skardu")
+    assert len(calls) == 2
+    assert [h["hotel_name"] for h in listings] == FIXTURE_NAMES
+
+
+def test_gives_up_after_the_retry_budget():
+    with serve_statuses([502, 502], "") as (base_url, calls):
+        with pytest.raises(requests.exceptions.RetryError):
+            HttpListingFetcher(make_session(retries=1)).fetch_page(search_url("Skardu", 0, base_url), "Skardu")
+    assert len(calls) == 2
@@ -0,0 +1,79 @@
+from tests.conftest import make_hotel
+from vector_store.ann_index import INDEX_FILE
+from vector_store.index_updates import IndexState, apply_changes, compact
+from vector_store.retrieval import FaissBackend
+from vector_store.snapshots import current_generation, resolve_snapshot
+
+
+def search_names(index_dir, encoder, text, k=8):
+    backend = FaissBackend(str(index_dir))
+    answers = backend.search(encoder.model.encode([text]), k)
+    return [hit['name'] for hit in answers[0]]
+
+
+def index_state(index_dir):
+    live_dir, _ = resolve_snapshot(str(index_dir), INDEX_FILE)
+    return IndexState(live_dir)
+
+
+def test_upserts_and_deletes_become_a_delta_generation(index_dir, encoder, hotels):
+    before = current_generation(str(index_dir))
+    renamed = make_hotel("h4", "Lake Side Retreat", stars=3, price=9500.0)
+    added = make_hotel("h9", "Glacier Breeze Hotel", stars=4, price=12000.0)
+    stats = apply_changes(str(index_dir), [renamed, added, hotels[0]], ["h7"], encoder, compact_ratio=1.0)
+
+    assert stats['upserted'] == 2 and stats['unchanged'] == 1 and stats['deleted'] == 1
+    assert stats['generation'] == current_generation(str(index_dir)) > before
+    assert stats['compaction'] is None
+
+    state = index_state(index_dir)
+    try:
+        # Both the replaced h4 row and the deleted h7 row are tombstoned
+        assert len(state.tombstones) == 2
+        assert state.total_rows == len(hotels) + 2
+    finally:
+        state.close()
+
+    names = search_names(index_dir, encoder, "hotel in Skardu", k=10)
+    assert "Glacier Breeze Hotel" in names and "Lake Side Retreat" in names
+    assert "Lake View Hotel" not in names and "Budget Inn" not in names
+    assert len(names) == len(hotels)
+
+
+def test_unchanged_upserts_publish_nothing(index_dir, encoder, hotels):
+    before = current_generation(str(index_dir))
+    stats = apply_changes(str(index_dir), hotels[:3], [], encoder)
+    assert stats['unchanged'] == 3 and stats['generation'] is None
+    assert current_generation(str(index_dir)) == before
+
+
+def test_compact_round_trip_keeps_search_results(index_dir, encoder, hotels):
+    added = make_hotel("h9", "Glacier Breeze Hotel", stars=4, price=12000.0)
+    apply_changes(str(index_dir), [added], ["h2"], encoder, compact_ratio=1.0)
+    query = "Glacier Breeze Hotel in Skardu"
+    delta_names = search_names(index_dir, encoder, query)
+
+    snapshot = compact(str(index_dir), encoder=encoder)
+    assert snapshot is not None
+    state = index_state(index_dir)
+    try:
+        assert not state.tombstones
+        assert state.base_rows == state.total_rows == len(hotels)
+        assert set(state.rows) == {h['id'] for h in hotels if h['id'] != "h2"} | {"h9"}
+    finally:
+        state.close()
+
+    assert search_names(index_dir, encoder, query) == delta_names
+    assert delta_names[0] == "Glacier Breeze Hotel" and "Shangrila Resort" not in delta_names
+    # Nothing left to fold in
+    assert compact(str(index_dir), encoder=encoder) is None
+
+
+def test_compaction_runs_once_the_ratio_is_passed(index_dir, encoder):
+    stats = apply_changes(str(index_dir), [], ["h1", "h2"], encoder, compact_ratio=0.2)
+    assert stats['deleted'] == 2 and stats['compaction'] == "done"
+    state = index_state(index_dir)
+    try:
+        assert not state.tombstones and "h1" not in state.rows
+    finally:
+        state.close()
@@ -0,0 +1,167 @@
+import re
+import threading
+
+import pytest
+
+from agent import instrumentation
+from agent.instrumentation import REGISTRY, Histogram, Registry, count, observe, span, timed, trace
+
+
+@pytest.fixture(autouse=True)
+def metrics(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_enabled", True)
+    REGISTRY.reset()
+    yield REGISTRY
+    REGISTRY.reset()
+
+
+def span_counts():
+    return {h['labels']['span']: h['count'] for h in instrumentation.snapshot()['histograms']}
+
+
+def test_spans_nest_inside_a_trace():
+    with trace("search") as t:
+        with span("outer"):
+            with span("inner"):
+                with span("innermost"):
+                    pass
+            with span("sibling"):
+                pass
+        with span("second"):
+            pass
+
+    timeline = t.to_dict()
+    assert timeline['name'] == "search" and timeline['total_ms'] >= 0
+    assert [(s['name'], s['depth']) for s in timeline['spans']] == [
+        ("outer", 0), ("inner", 1), ("innermost", 2), ("sibling", 1), ("second", 0)
+    ]
+    by_name = {s['name']: s for s in timeline['spans']}
+    for parent, child in (("outer", "inner"), ("inner", "innermost"), ("outer", "sibling")):
+        assert by_name[parent]['start_ms'] <= by_name[child]['start_ms']
+        assert by_name[child]['start_ms'] + by_name[child]['duration_ms'] <= (
+            by_name[parent]['start_ms'] + by_name[parent]['duration_ms']
+        )
+    assert span_counts() == {"outer": 1, "inner": 1, "innermost": 1, "sibling": 1, "second": 1}
+
+
+def test_failed_span_is_still_recorded():
+    with trace() as t:
+        with pytest.raises(KeyError):
+            with span("outer"):
+                with span("lookup"):
+                    raise KeyError("missing")
+        with span("after"):
+            pass
+    assert [(s['name'], s['depth']) for s in t.to_dict()['spans']] == [("outer", 0), ("lookup", 1), ("after", 0)]
+
+
+def test_trace_only_sees_its_own_thread():
+    def work():
+        with span("other thread"):
+            pass
+
+    with trace() as t:
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    assert t.spans == []
+    assert span_counts() == {"other thread": 1}
+
+
+def test_disabled_metrics_still_trace(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_enabled", False)
+    assert span("idle") is instrumentation._NOOP
+    count("requests")
+    observe("latency", 0.1)
+
+    @timed("decorated")
+    def work():
+        return 42
+
+    with trace() as t:
+        with span("traced"):
+            assert work() == 42
+    assert [s['name'] for s in t.spans] == ["decorated", "traced"]
+    assert instrumentation.snapshot() == {'counters': [], 'histograms': []}
+
+
+def test_timed_defaults_to_the_qualified_name():
+    @timed()
+    def handler():
+        pass
+
+    handler()
+    assert span_counts() == {f"{__name__}.test_timed_defaults_to_the_qualified_name.<locals>.handler": 1}
+
+
+def test_snapshot_reports_counters_and_histograms():
+    count("scrape.pages", fetcher="http", status="ok")
+    count("scrape.pages", 2, status="ok", fetcher="http")
+    count("scrape.pages", fetcher="selenium", status="ok")
+    for value in (0.003, 0.004, 0.02, 40.0):
+        observe("retrieval.seconds", value)
+
+    snap = instrumentation.snapshot()
+    assert snap['counters'] == [
+        {'name': "scrape.pages", 'labels': {'fetcher': "http", 'status': "ok"}, 'value': 3.0},
+        {'name': "scrape.pages", 'labels': {'fetcher': "selenium", 'status': "ok"}, 'value': 1.0},
+    ]
+    [histogram] = snap['histograms']
+    assert histogram['name'] == "retrieval.seconds" and histogram['labels'] == {}
+    assert histogram['count'] == 4 and histogram['sum'] == pytest.approx(40.027)
+    # Bucket upper bounds; past the last bound is +Inf
+    assert histogram['p50'] == 0.005 and histogram['p99'] == float("inf")
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(1.0, 2.0, 5.0))
+    assert histogram.quantile(0.5) is None
+    for value in (0.5, 1.0, 1.5, 4.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 0]
+    assert [histogram.quantile(q) for q in (0.25, 0.5, 0.75, 1.0)] == [1.0, 1.0, 2.0, 5.0]
+
+
+def test_prometheus_text_format():
+    registry = Registry()
+    registry.count("scrape.pages", 3, (("fetcher", "http"),))
+    registry.count("scrape.pages", 1, (("fetcher", "selenium"),))
+    registry.observe("span_seconds", 0.003, (("span", 'say "hi"\\'),))
+    registry.observe("span_seconds", 0.2, (("span", 'say "hi"\\'),))
+
+    lines = registry.prometheus_text().splitlines()
+    assert lines[:3] == [
+        "# TYPE hotel_scrape_pages_total counter",
+        'hotel_scrape_pages_total{fetcher="http"} 3.0',
+        'hotel_scrape_pages_total{fetcher="selenium"} 1.0',
+    ]
+    assert lines.count("# TYPE hotel_span_seconds histogram") == 1
+    label = 'span="say \\"hi\\"\\\\"'
+    buckets = [line for line in lines if line.startswith("hotel_span_seconds_bucket")]
+    assert len(buckets) == len(instrumentation.DEFAULT_BUCKETS) + 1
+    assert buckets[0] == f'hotel_span_seconds_bucket{{{label},le="0.0005"}} 0'
+    assert f'hotel_span_seconds_bucket{{{label},le="0.005"}} 1' in buckets
+    assert buckets[-1] == f'hotel_span_seconds_bucket{{{label},le="+Inf"}} 2'
+    cumulative = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert cumulative == sorted(cumulative)
+    assert lines[-2:] == [f"hotel_span_seconds_sum{{{label}}} 0.203", f"hotel_span_seconds_count{{{label}}} 2"]
+
+    sample = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^{}]*\})? \S+$')
+    assert all(line.startswith("# TYPE ") or sample.match(line) for line in lines)
+
+
+def test_module_exports_use_the_registry():
+    with span("retrieval.encode", backend="faiss"):
+        pass
+    text = instrumentation.prometheus_text()
+    assert 'hotel_span_seconds_count{span="retrieval.encode",backend="faiss"} 1' in text
+    assert text.endswith("\n")
+
+
+def test_trace_profile():
+    with trace(profiler="cprofile") as t:
+        sum(range(1000))
+    assert "function calls" in t.profile
+    with pytest.raises(ValueError):
+        with trace(profiler="perf"):
+            pass
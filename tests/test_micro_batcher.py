@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+
+from agent.api import MicroBatcher
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_items_share_a_batch():
+    batches = []
+
+    def handler(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(handler, max_batch=8, max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        await batcher.stop()
+        return results
+
+    assert run(main()) == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_one_bad_item_only_fails_itself():
+    def handler(items):
+        if "bad" in items:
+            raise ValueError("bad query")
+        return [item.upper() for item in items]
+
+    async def main():
+        batcher = MicroBatcher(handler, max_batch=8, max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(q) for q in ("a", "bad", "c")), return_exceptions=True)
+        await batcher.stop()
+        return results, batcher.fallbacks
+
+    (first, bad, last), fallbacks = run(main())
+    assert (first, last) == ("A", "C")
+    assert isinstance(bad, ValueError)
+    assert fallbacks == 1
+
+
+def test_short_result_list_does_not_hang():
+    async def main():
+        batcher = MicroBatcher(lambda items: items[:1], max_batch=8, max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.wait_for(asyncio.gather(batcher.submit(1), batcher.submit(2)), 2)
+        await batcher.stop()
+        return results
+
+    assert run(main()) == [1, 2]
+
+
+def test_stop_fails_waiting_requests():
+    release = threading.Event()
+
+    def handler(items):
+        release.wait(5)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(handler, max_batch=1, max_wait_ms=0)
+        batcher.start()
+        tasks = [asyncio.create_task(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        release.set()
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 2)
+        with pytest.raises(RuntimeError):
+            await batcher.submit(4)
+        return results
+
+    results = run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scraping.price_history import append_observations, cheapest, parse_prices, price_changes, price_trend
+
+TODAY = date(2025, 6, 30)
+
+
+def listing(name, price, city="Skardu"):
+    return {'hotel_name': name, 'price': price, 'city': city, 'url': None}
+
+
+def record_days(store_dir, days):
+    """Append one scrape per ``(days_ago, listings)`` entry."""
+    for days_ago, listings in days:
+        append_observations(listings, str(store_dir), observed_at=datetime(2025, 6, 30, 12) - timedelta(days=days_ago))
+
+
+def test_parse_prices_converts_to_pkr():
+    frame = parse_prices(["PKR 12,500", "US$ 100", "€50", "N/A", None, "3,000"])
+    assert frame['price_pkr'].tolist()[:3] == [12500.0, 27800.0, 15000.0]
+    assert np.isnan(frame['price_pkr'][3]) and np.isnan(frame['price_pkr'][4])
+    assert frame['price_pkr'][5] == 3000.0
+    assert frame['currency'].tolist() == ["PKR", "USD", "EUR", np.nan, np.nan, "PKR"]
+
+
+@pytest.mark.parametrize("text", ["¥ 300", "INR 5,000", "CHF12"])
+def test_unknown_currency_prefix_is_not_pkr(text):
+    frame = parse_prices([text, "5,000 PKR", "Price: Rs 7,000"])
+    assert pd.isna(frame['currency'][0]) and np.isnan(frame['price_pkr'][0])
+    assert frame['price_pkr'].tolist()[1:] == [5000.0, 7000.0]
+
+
+def test_history_survives_across_scrapes(tmp_path):
+    store = tmp_path / "price_history"
+    record_days(store, [
+        (40, [listing("Kesar Palace", "PKR 5,000")]),
+        (10, [listing("Kesar Palace", "PKR 12,000"), listing("Budget Inn", "PKR 4,000"),
+              listing("Serena Hotel", "PKR 1,000", city="Islamabad")]),
+        (1, [listing("Kesar Palace", "PKR 9,000"), listing("Budget Inn", "N/A")]),
+    ])
+
+    lowest = cheapest("Skardu", days=30, k=2, store_dir=str(store), today=TODAY)
+    # The 40-day-old price is outside the window; Islamabad is another partition
+    assert lowest['name'].tolist() == ["Budget Inn", "Kesar Palace"]
+    assert lowest['price_pkr'].tolist() == [4000.0, 9000.0]
+
+    kesar = lowest['hotel_id'][1]
+    trend = price_trend(kesar, city="Skardu", store_dir=str(store), today=TODAY)
+    assert trend['min_pkr'].tolist() == [5000.0, 12000.0, 9000.0]
+    assert len(price_trend(kesar, days=30, store_dir=str(store), today=TODAY)) == 2
+
+
+def test_price_changes_fit_a_slope(tmp_path):
+    store = tmp_path / "price_history"
+    record_days(store, [(days_ago, [listing("Kesar Palace", f"PKR {10000 - 100 * days_ago}")])
+                        for days_ago in (20, 10, 0)])
+    changes = price_changes("Skardu", days=30, store_dir=str(store), today=TODAY)
+    row = changes.iloc[0]
+    assert row['observations'] == 3
+    assert (row['first_pkr'], row['last_pkr']) == (8000.0, 10000.0)
+    assert row['slope_pkr_per_day'] == pytest.approx(100.0)
+
+
+def test_empty_store_answers_empty(tmp_path):
+    store = str(tmp_path / "missing")
+    assert cheapest("Skardu", store_dir=store).empty
+    assert price_changes(store_dir=store).empty
+    assert append_observations([listing("", "PKR 1")], store) == 0
@@ -0,0 +1,86 @@
+import numpy as np
+
+from vector_store import query_cache
+from vector_store.query_cache import LRUTTLCache, QueryCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUTTLCache(capacity=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    cache = LRUTTLCache(capacity=4, ttl_seconds=10)
+    cache.put("a", 1)
+    clock.now += 9
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats['expirations'] == 1 and stats['hits'] == 1 and stats['misses'] == 1
+
+
+def test_results_are_dropped_on_generation_change():
+    cache = QueryCache()
+    cache.put_results("skardu hotels", None, 5, [{'hotel_id': "h1"}], cache.generation)
+    assert cache.get_results("skardu hotels", None, 5) == [{'hotel_id': "h1"}]
+    cache.bump_generation()
+    assert cache.get_results("skardu hotels", None, 5) is None
+
+
+def test_results_for_an_old_generation_are_not_stored():
+    cache = QueryCache()
+    stale = cache.generation
+    cache.bump_generation()
+    cache.put_results("skardu hotels", None, 5, [{'hotel_id': "h1"}], stale)
+    assert cache.get_results("skardu hotels", None, 5) is None
+
+
+def test_encode_only_encodes_misses_once():
+    cache = QueryCache()
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    first = cache.encode(["hotel", "lodge", "hotel"], encode)
+    second = cache.encode(["lodge", "resort"], encode)
+    assert calls == [["hotel", "lodge"], ["resort"]]
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(second[0], first[1])
+
+
+def test_equivalent_queries_share_entries():
+    cache = QueryCache()
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+    cache.encode(["Hotels in Skardu?"], encode)
+    cache.encode(["  hotels, in   SKARDU!"], encode)
+    assert calls == [["hotels in skardu"]]
+
+    cache.put_results("Hotels in Skardu?", {'city': "Skardu"}, 5, ["h1"])
+    assert cache.get_results("hotels in skardu", {'city': "Skardu"}, 5) == ["h1"]
+    assert cache.get_results("hotels in skardu", None, 5) is None
+    # Punctuation inside numbers and words is kept
+    assert normalize_query("Wi-Fi under Rs. 5,000") == "wi-fi under rs 5,000"
@@ -0,0 +1,66 @@
+import pytest
+
+from agent.query_parser import parse_query
+
+
+@pytest.mark.parametrize("query", ["hotels up to 4 stars in Lahore", "max 4 star hotel", "at most 4-star hotels"])
+def test_star_cap_sets_only_max_stars(query):
+    constraints = parse_query(query)
+    assert constraints.min_stars is None
+    assert constraints.max_stars == 4
+    assert constraints.max_price is None
+
+
+def test_star_cap_and_budget_in_one_query():
+    constraints = parse_query("max 3 stars in Skardu under PKR 8,000")
+    assert (constraints.city, constraints.min_stars, constraints.max_stars) == ("Skardu", None, 3)
+    assert constraints.max_price == 8000.0
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("3-star hotels in Skardu", (3, 3)),
+    ("at least 4 stars", (4, None)),
+    ("4+ star hotels", (4, None)),
+    ("2 to 4 stars", (2, 4)),
+    ("5-3 star hotels", (3, 5)),
+])
+def test_star_phrasings(query, expected):
+    constraints = parse_query(query)
+    assert (constraints.min_stars, constraints.max_stars) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("hotels under PKR 5,000", 5000.0),
+    ("up to 5000", 5000.0),
+    ("budget of rs. 12k", 12000.0),
+    ("max 7500.5 rupees", 7500.5),
+    ("hotels within 5 km of Skardu airport", None),
+    ("hotels in Murree", None),
+])
+def test_price_ceiling(query, expected):
+    assert parse_query(query).max_price == expected
+
+
+def test_city_and_amenities():
+    constraints = parse_query("hotel in skardu with wi-fi, free parking and breakfast")
+    assert constraints.city == "Skardu"
+    assert constraints.amenities == ["wifi", "parking", "breakfast"]
+
+
+def test_location_radius_and_near():
+    constraints = parse_query("hotels within 500 m of Skardu airport")
+    assert constraints.near == "Skardu Airport"
+    assert constraints.radius_km == pytest.approx(0.5)
+    assert parse_query("near Shangrila").near == "Shangrila Resort"
+    # A city is not a point: "near Skardu" means "in Skardu"
+    constraints = parse_query("hotels near Skardu")
+    assert constraints.city == "Skardu" and not constraints.has_location()
+
+
+def test_matches_mirrors_constraints():
+    constraints = parse_query("up to 4 stars in Skardu under 10k")
+    hotel = {"contact_info": {"city": "Skardu"}, "star_rating": 3, "price_range": {"min_price": 8000.0}}
+    assert constraints.matches(hotel)
+    assert not constraints.matches({**hotel, "star_rating": 5})
+    # Unknown prices (0) never satisfy a budget
+    assert not constraints.matches({**hotel, "price_range": {"min_price": 0.0}})
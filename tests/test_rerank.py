@@ -0,0 +1,64 @@
+import numpy as np
+
+from agent.query_parser import parse_query
+from vector_store.rerank import RerankConfig, candidate_fields, hit_fields, rerank
+from vector_store.retrieval import FaissBackend
+
+
+def test_candidate_fields_marks_unknown_as_nan():
+    fields = candidate_fields(np.array([3, 0], dtype=np.int8), np.array([0.0, 5000.0], dtype=np.float32))
+    assert fields.dtype == np.float32
+    assert np.isnan(fields[0, 1]) and np.isnan(fields[1, 0])
+    assert fields[0, 0] == 3 and fields[1, 1] == 5000
+
+
+def test_hit_fields_reads_result_dicts():
+    fields = hit_fields([{'star_rating': 4, 'price_range': {'min_price': 9000.0}}, {'star_rating': None}])
+    np.testing.assert_array_equal(fields[0], [4, 9000])
+    assert np.isnan(fields[1]).all()
+    assert hit_fields([]).shape == (0, 2)
+
+
+def test_faiss_fields_come_from_the_hotel_table(index_dir, encoder, hotels):
+    backend = FaissBackend(str(index_dir))
+    query = encoder.model.encode(["hotel in Skardu"])
+    candidates, vectors, fields = backend.search_candidates(query, 8)
+    assert len(candidates[0][0]) == len(vectors[0]) == len(fields[0]) == len(hotels)
+    answers = backend.materialize(candidates, [np.arange(len(hotels))])
+    np.testing.assert_array_equal(fields[0], hit_fields(answers[0]))
+
+
+def test_only_the_reranked_hotels_are_decoded(index_dir, encoder):
+    from vector_store.retrieval import RetrievalEngine
+
+    backend = FaissBackend(str(index_dir))
+    engine = RetrievalEngine(backend, encoder=encoder, hybrid=False)
+    decoded = []
+    with backend.pinned() as snapshot:
+        get_many = snapshot.docs.get_many
+        snapshot.docs.get_many = lambda rows: decoded.append(list(rows)) or get_many(rows)
+        results = engine.search("hotel with wifi", k=2)
+    assert len(results) == 2
+    assert [len(rows) for rows in decoded] == [2]
+
+
+def test_constraint_fit_and_duplicates():
+    query = np.array([[1.0, 0.0]], dtype=np.float32)
+    hits = [{'hotel_id': name} for name in ("over_budget", "twin", "fits", "other")]
+    vectors = np.array([[1.0, 0.0], [0.99, 0.01], [0.99, 0.01], [0.0, 1.0]], dtype=np.float32)
+    fields = [np.array([[4, 50000], [4, 9000], [4, 9000], [4, 9000]], dtype=np.float32)]
+    config = RerankConfig(fit_weight=1.0)
+    ranked = rerank(query, [hits], [vectors], 3, [parse_query("4 star hotel under 10k")], config, fields)[0]
+    names = [hit['hotel_id'] for hit in ranked]
+    # The budget fit outweighs a slightly higher cosine
+    assert names[0] == "twin"
+    # Its near-identical twin is dropped rather than taking a second slot
+    assert "fits" not in names and "other" in names
+
+
+def test_engine_reranks_with_table_fields(index_dir, encoder):
+    from vector_store.retrieval import RetrievalEngine
+
+    engine = RetrievalEngine(FaissBackend(str(index_dir)), encoder=encoder, hybrid=False)
+    results = engine.search("3 star hotel in Skardu under 10000", k=3)
+    assert results and all(hit['star_rating'] == 3 for hit in results)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from agent.query_parser import parse_query
+from vector_store.query_cache import QueryCache
+from vector_store.retrieval import FaissBackend, RetrievalEngine
+
+
+def engine_for(index_dir, encoder, **kwargs):
+    return RetrievalEngine(FaissBackend(str(index_dir)), encoder=encoder, query_cache=QueryCache(), **kwargs)
+
+
+def test_named_hotel_comes_first_and_the_rest_is_filled(index_dir, encoder):
+    engine = engine_for(index_dir, encoder)
+    results = engine.search("Kesar Palace", k=5)
+    assert len(results) == 5
+    assert results[0]['name'] == "Kesar Palace"
+    assert len({hit['hotel_id'] for hit in results}) == 5
+    assert engine.lexical_short_circuits == 0
+
+
+def test_named_hotel_alone_skips_encoding(index_dir, encoder):
+    engine = engine_for(index_dir, encoder)
+    encoded = []
+    model_encode = encoder.model.encode
+    encoder.model.encode = lambda texts, **kwargs: encoded.append(texts) or model_encode(texts, **kwargs)
+    assert [hit['name'] for hit in engine.search("Kesar Palace", k=1)] == ["Kesar Palace"]
+    assert engine.lexical_short_circuits == 1 and not encoded
+
+
+def test_filters_are_pushed_down(index_dir, encoder):
+    engine = engine_for(index_dir, encoder)
+    results = engine.search("hotel in Skardu with parking", k=5)
+    assert results
+    for hit in results:
+        assert hit['contact_info']['city'] == "Skardu"
+        assert any(a['name'] == "Parking" for a in hit['amenities'])
+
+
+def test_unmatched_filter_falls_back_to_unfiltered_search(index_dir, encoder):
+    results = engine_for(index_dir, encoder).search("5 star hotel in Multan", k=3)
+    assert len(results) == 3
+
+
+def test_results_are_cached_per_generation(index_dir, encoder):
+    engine = engine_for(index_dir, encoder)
+    first = engine.search("lake view hotel", k=3)
+    assert engine.search("lake view hotel", k=3) == first
+    assert engine.query_cache.stats()['results']['hits'] == 1
+
+
+def test_collect_drops_padding_and_skipped_rows_per_query():
+    ids = np.array([[3, -1, 1, 2, 0], [4, 2, 0, -1, -1]])
+    distances = np.arange(10, dtype=np.float32).reshape(2, 5)
+    skip = np.array([False, False, True, False, False])
+    rows, kept = FaissBackend._collect(distances, ids, skip, 2)
+    assert [r.tolist() for r in rows] == [[3, 1], [4, 0]]
+    assert [d.tolist() for d in kept] == [[0.0, 2.0], [5.0, 7.0]]
+
+
+def test_filtered_search_decodes_only_the_returned_rows(index_dir, encoder):
+    backend = FaissBackend(str(index_dir))
+    decoded = []
+    with backend.pinned() as snapshot:
+        get_many = snapshot.docs.get_many
+        snapshot.docs.get_many = lambda rows: decoded.append(list(rows)) or get_many(rows)
+        answers = backend.search(encoder.model.encode(["hotel", "lodge"]), 2, parse_query("hotel in Skardu"))
+    assert [len(hits) for hits in answers] == [2, 2]
+    assert [len(rows) for rows in decoded] == [4]
@@ -0,0 +1,66 @@
+import pytest
+
+from scraping import scheduler
+from scraping.scheduler import HostRateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Stands in for the ``time`` module: sleeping just advances the clock."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler, "time", fake)
+    return fake
+
+
+def test_bucket_allows_a_burst_then_paces(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.5), pytest.approx(0.5)]
+    assert clock.now == pytest.approx(101.0)
+
+
+def test_bucket_refills_while_idle_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    # Idle long enough for many tokens, but only `capacity` accumulate
+    clock.now += 60
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_partial_refill_waits_only_for_the_remainder(clock):
+    bucket = TokenBucket(rate=4.0, capacity=1)
+    bucket.acquire()
+    clock.now += 0.1
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.15)]
+
+
+def test_limiter_paces_each_host_separately(clock):
+    limiter = HostRateLimiter(rate=1.0, capacity=1)
+    limiter.acquire("https://www.booking.com/searchresults.html?ss=Skardu")
+    limiter.acquire("http://127.0.0.1:8000/searchresults.html?ss=Skardu")
+    assert clock.sleeps == []
+    limiter.acquire("https://www.booking.com/searchresults.html?ss=Hunza")
+    assert clock.sleeps == [pytest.approx(1.0)]
@@ -0,0 +1,54 @@
+import pytest
+
+from tests.conftest import make_hotel, publish_hotels
+from vector_store.retrieval import FaissBackend
+from vector_store.snapshots import current_generation, list_generations, prune_snapshots, rollback
+
+
+def names(backend, encoder, text="hotel in Skardu", k=10):
+    return {hit['name'] for hit in backend.search(encoder.model.encode([text]), k)[0]}
+
+
+def test_refresh_swaps_to_a_new_generation(index_dir, encoder, hotels):
+    backend = FaissBackend(str(index_dir))
+    first = backend.generation
+    publish_hotels(index_dir, hotels + [make_hotel("h9", "Glacier Breeze Hotel")], encoder)
+
+    # Nothing changes until the backend looks at CURRENT again
+    assert "Glacier Breeze Hotel" not in names(backend, encoder)
+    assert backend.refresh() == current_generation(str(index_dir)) > first
+    assert "Glacier Breeze Hotel" in names(backend, encoder)
+
+
+def test_pinned_searches_finish_on_the_old_generation(index_dir, encoder, hotels):
+    backend = FaissBackend(str(index_dir))
+    with backend.pinned() as held:
+        publish_hotels(index_dir, hotels[:2], encoder)
+        backend.refresh()
+        assert backend.generation != held.generation
+        assert len(names(backend, encoder)) == len(hotels)
+    assert names(backend, encoder) == {h['name'] for h in hotels[:2]}
+
+
+def test_rollback_serves_the_previous_generation(index_dir, encoder, hotels):
+    first = current_generation(str(index_dir))
+    publish_hotels(index_dir, hotels[:2], encoder)
+    backend = FaissBackend(str(index_dir))
+    assert len(names(backend, encoder)) == 2
+
+    assert rollback(str(index_dir)) == first
+    backend.refresh()
+    assert len(names(backend, encoder)) == len(hotels)
+    with pytest.raises(ValueError):
+        rollback(str(index_dir))
+
+
+def test_prune_keeps_the_newest_and_current_generations(index_dir, encoder, hotels):
+    for _ in range(3):
+        publish_hotels(index_dir, hotels, encoder)
+    # Publishing already prunes down to three generations
+    generations = list_generations(str(index_dir))
+    assert len(generations) == 3
+    rollback(str(index_dir), generations[0])
+    assert prune_snapshots(str(index_dir), keep=1) == generations[1:2]
+    assert list_generations(str(index_dir)) == [generations[0], generations[2]]
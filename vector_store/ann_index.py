@@ -0,0 +1,383 @@
+"""Configurable FAISS index builder for the hotel search path.
+
+Builds flat, IVF-Flat, IVF-PQ or HNSW indexes, or compact scalar-quantized
+(fp16 / int8) and sign-binary indexes whose candidates are rescored exactly
+against a memory-mapped ``vectors.f32``. Persists the build/search settings
+next to ``index.bin`` (the CLI publishes a new generation of
+``faiss_index/`` with the live documents carried over) and reports recall@k
+and resident index size against the exact flat index so settings can be
+chosen with data::
+
+    python -m vector_store.ann_index --report
+    python -m vector_store.ann_index --kind hnsw --ef-search 64
+    python -m vector_store.ann_index --kind sq_int8 --rescore 4
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional
+
+import faiss
+import numpy as np
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.bin"
+CONFIG_FILE = "index_config.json"
+VECTORS_FILE = "vectors.f32"
+
+# Kinds that search compact codes and rescore from VECTORS_FILE
+COMPACT_KINDS = ("sq_fp16", "sq_int8", "binary")
+# Kinds whose own storage holds the exact float32 vectors
+EXACT_KINDS = ("flat", "ivf_flat", "hnsw")
+# Coarse candidates per requested result when IndexConfig.rescore is unset;
+# sign bits lose the most, so binary looks furthest
+DEFAULT_RESCORE = {"sq_fp16": 2, "sq_int8": 4, "binary": 16}
+
+
+class IndexConfig(BaseModel):
+    """Build and search settings for a FAISS index."""
+    kind: Literal["flat", "ivf_flat", "ivf_pq", "hnsw", "sq_fp16", "sq_int8", "binary"] = "flat"
+    nlist: int = 100
+    pq_m: int = 16
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    nprobe: int = 8
+    ef_search: int = 64
+    train_sample: int = 50_000
+    # Compact kinds: coarse candidates per result rescored exactly (0 = coarse distances only)
+    rescore: Optional[int] = None
+
+    def rescore_factor(self) -> int:
+        return DEFAULT_RESCORE.get(self.kind, 0) if self.rescore is None else self.rescore
+
+
+class RescoredIndex:
+    """Coarse search over compact codes, exact L2 rescoring from float32 vectors.
+
+    ``vectors`` is a read-only memmap of ``vectors.f32`` once loaded: only
+    rescored rows are paged in and workers on one box share those pages
+    through the OS cache, so each process keeps just the codes resident.
+    Quacks like the parts of ``faiss.Index`` the search path uses.
+    """
+
+    def __init__(self, coarse: Any, vectors: np.ndarray, rescore: int):
+        self.coarse = coarse
+        self.vectors = vectors
+        self.rescore = rescore
+        self.binary = isinstance(coarse, faiss.IndexBinary)
+        self.d = int(vectors.shape[1])
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.coarse.ntotal)
+
+    def code_bytes(self) -> int:
+        """Resident size of the coarse codes."""
+        if self.binary:
+            return int(faiss.serialize_index_binary(self.coarse).nbytes)
+        return int(faiss.serialize_index(self.coarse).nbytes)
+
+    def _coarse_search(self, queries: np.ndarray, k: int):
+        if self.binary:
+            return self.coarse.search(np.packbits(queries > 0, axis=1), k)
+        return self.coarse.search(queries, k)
+
+    def search(self, queries: np.ndarray, k: int):
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if not self.rescore:
+            distances, ids = self._coarse_search(queries, k)
+            return distances.astype(np.float32), ids
+        fetch = max(k, min(k * self.rescore, self.ntotal))
+        _, candidates = self._coarse_search(queries, fetch)
+
+        # Read each candidate row once, in file order
+        rows, inverse = np.unique(np.where(candidates < 0, 0, candidates), return_inverse=True)
+        gathered = np.asarray(self.vectors[rows])[inverse.reshape(candidates.shape)]
+        exact = ((gathered - queries[:, None, :]) ** 2).sum(axis=2)
+        exact[candidates < 0] = np.inf
+
+        order = np.argsort(exact, axis=1, kind="stable")[:, :k]
+        distances = np.take_along_axis(exact, order, axis=1).astype(np.float32)
+        ids = np.take_along_axis(candidates, order, axis=1)
+        ids[np.isinf(distances)] = -1
+        return distances, ids
+
+    def reconstruct_batch(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.vectors[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        return np.asarray(self.vectors[start:start + n], dtype=np.float32)
+
+
+def _train_sample(embeddings: np.ndarray, config: IndexConfig, seed: int) -> np.ndarray:
+    n = len(embeddings)
+    if n <= config.train_sample:
+        return embeddings
+    return embeddings[np.random.default_rng(seed).choice(n, config.train_sample, replace=False)]
+
+
+def _build_compact(embeddings: np.ndarray, config: IndexConfig, seed: int) -> RescoredIndex:
+    dim = embeddings.shape[1]
+    if config.kind == "binary":
+        if dim % 8:
+            raise ValueError(f"Binary codes need an embedding dim divisible by 8, got {dim}")
+        if not config.rescore_factor():
+            raise ValueError("Binary indexes return Hamming distances; set rescore >= 1")
+        coarse = faiss.IndexBinaryFlat(dim)
+        coarse.add(np.packbits(embeddings > 0, axis=1))
+    else:
+        qtype = faiss.ScalarQuantizer.QT_fp16 if config.kind == "sq_fp16" else faiss.ScalarQuantizer.QT_8bit
+        coarse = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_L2)
+        # int8 learns per-dimension ranges; fp16 needs no training
+        coarse.train(_train_sample(embeddings, config, seed))
+        coarse.add(embeddings)
+    return RescoredIndex(coarse, embeddings, config.rescore_factor())
+
+
+def build_index(embeddings: np.ndarray, config: IndexConfig, seed: int = 0) -> faiss.Index:
+    """Build and populate an index; IVF variants are trained on a random sample."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, dim = embeddings.shape
+
+    if config.kind in COMPACT_KINDS:
+        return _build_compact(embeddings, config, seed)
+    if config.kind == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif config.kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config.hnsw_m)
+        index.hnsw.efConstruction = config.ef_construction
+    else:
+        # FAISS wants roughly 39 training points per list
+        nlist = max(1, min(config.nlist, n // 39 or 1))
+        if nlist != config.nlist:
+            logger.warning(f"Reducing nlist from {config.nlist} to {nlist} for {n} vectors")
+        quantizer = faiss.IndexFlatL2(dim)
+        if config.kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            if dim % config.pq_m:
+                raise ValueError(f"pq_m={config.pq_m} must divide the embedding dim {dim}")
+            if n < 2 ** config.pq_nbits:
+                raise ValueError(f"IVF-PQ with {config.pq_nbits} bits needs at least {2 ** config.pq_nbits} vectors, got {n}")
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, config.pq_m, config.pq_nbits)
+
+        index.train(_train_sample(embeddings, config, seed))
+
+    index.add(embeddings)
+    apply_search_params(index, config)
+    return index
+
+
+def apply_search_params(index: faiss.Index, config: IndexConfig) -> None:
+    """Set query-time knobs (nprobe / efSearch / rescore) on a built or loaded index."""
+    if isinstance(index, RescoredIndex):
+        index.rescore = config.rescore_factor()
+    elif config.kind in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = config.nprobe
+    elif config.kind == "hnsw":
+        index.hnsw.efSearch = config.ef_search
+
+
+def enable_reconstruct(index: faiss.Index) -> None:
+    """Let ``index.reconstruct_batch`` return stored vectors (IVF indexes need a direct map)."""
+    if isinstance(index, RescoredIndex):
+        # Reconstructs exactly from vectors.f32
+        return
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        # Flat and HNSW indexes reconstruct from their storage directly
+        pass
+
+
+def load_config(index_dir: str = "faiss_index") -> IndexConfig:
+    """Persisted config, or the flat default for indexes built before configs existed."""
+    path = Path(index_dir) / CONFIG_FILE
+    if not path.exists():
+        return IndexConfig()
+    return IndexConfig(**json.loads(path.read_text(encoding='utf-8')))
+
+
+def save_index(index: faiss.Index, config: IndexConfig, index_dir: str = "faiss_index") -> None:
+    """Write the index and its config side by side (compact kinds add ``vectors.f32``)."""
+    out = Path(index_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    if isinstance(index, RescoredIndex):
+        if index.binary:
+            faiss.write_index_binary(index.coarse, str(out / INDEX_FILE))
+        else:
+            faiss.write_index(index.coarse, str(out / INDEX_FILE))
+        np.ascontiguousarray(index.vectors, dtype=np.float32).tofile(out / VECTORS_FILE)
+    else:
+        faiss.write_index(index, str(out / INDEX_FILE))
+    (out / CONFIG_FILE).write_text(config.model_dump_json(indent=2), encoding='utf-8')
+
+
+def load_index(index_dir: str = "faiss_index", **search_overrides) -> faiss.Index:
+    """Read an index and apply its persisted (or overridden) search params."""
+    config = load_config(index_dir).model_copy(update=search_overrides)
+    path = Path(index_dir) / INDEX_FILE
+    if config.kind == "binary":
+        coarse = faiss.read_index_binary(str(path))
+    else:
+        coarse = faiss.read_index(str(path))
+    if config.kind in COMPACT_KINDS:
+        vectors = np.memmap(Path(index_dir) / VECTORS_FILE, dtype=np.float32, mode='r').reshape(-1, coarse.d)
+        index = RescoredIndex(coarse, vectors, config.rescore_factor())
+    else:
+        index = coarse
+    apply_search_params(index, config)
+    return index
+
+
+def resident_bytes(index: Any) -> int:
+    """Bytes a process keeps in memory for ``index`` (compact kinds: the codes, not ``vectors.f32``)."""
+    if isinstance(index, RescoredIndex):
+        return index.code_bytes()
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def recall_latency_report(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    configs: List[IndexConfig],
+    k: int = 5
+) -> List[Dict[str, Any]]:
+    """Compare each config against the exact flat index.
+
+    Returns one row per config with build time, recall@k, single-query
+    p50/p99 latency in milliseconds, resident index size and the fraction
+    of the float32 flat index's memory it saves.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    exact = build_index(embeddings, IndexConfig(kind="flat"))
+    _, truth = exact.search(queries, k)
+    flat_bytes = resident_bytes(exact)
+
+    rows = []
+    for config in configs:
+        try:
+            start = time.perf_counter()
+            index = build_index(embeddings, config)
+            build_s = time.perf_counter() - start
+        except (ValueError, RuntimeError) as e:
+            logger.warning(f"Skipping {config.kind}: {e}")
+            continue
+
+        latencies = []
+        found = np.empty_like(truth)
+        for i in range(len(queries)):
+            start = time.perf_counter()
+            _, ids = index.search(queries[i:i + 1], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found[i] = ids[0]
+
+        hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+        size = resident_bytes(index)
+        rows.append({
+            'config': config.model_dump(),
+            'build_s': build_s,
+            f'recall@{k}': hits / (len(queries) * k),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'index_mb': size / 2 ** 20,
+            'memory_saved': 1 - size / flat_bytes,
+        })
+    return rows
+
+
+def _load_embeddings(index_dir: str, embeddings_path: Optional[str]) -> np.ndarray:
+    """Exact vectors to index: ``embeddings_path``, ``vectors.f32`` or a lossless index.
+
+    IVF-PQ codes are only approximations, and rebuilding from them would
+    carry their error into the new index, so that raises instead.
+    """
+    if embeddings_path:
+        return np.load(embeddings_path).astype(np.float32)
+    config = load_config(index_dir)
+    if config.kind in COMPACT_KINDS:
+        # Compact kinds reconstruct from vectors.f32, which is exact
+        if not (Path(index_dir) / VECTORS_FILE).exists():
+            raise FileNotFoundError(f"The {config.kind} index in {index_dir} has no {VECTORS_FILE}; "
+                                    f"pass --embeddings with the original .npy matrix")
+    elif config.kind not in EXACT_KINDS:
+        raise ValueError(f"The {config.kind} index in {index_dir} stores only approximate vectors; "
+                         f"pass --embeddings with the original .npy matrix")
+    index = load_index(index_dir)
+    enable_reconstruct(index)
+    return np.asarray(index.reconstruct_n(0, index.ntotal), dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or benchmark the FAISS hotel index")
+    parser.add_argument("--index-dir", default="faiss_index")
+    parser.add_argument("--embeddings", help=".npy matrix to index (defaults to the exact vectors of the current "
+                        f"index: {VECTORS_FILE}, or a flat, IVF-Flat or HNSW index; required for IVF-PQ)")
+    parser.add_argument("--kind", choices=["flat", "ivf_flat", "ivf_pq", "hnsw", *COMPACT_KINDS], default="flat")
+    parser.add_argument("--nlist", type=int, default=100)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--rescore", type=int, help="Compact kinds: candidates rescored per result "
+                        f"(default {DEFAULT_RESCORE})")
+    parser.add_argument("--report", action="store_true", help="Print recall@k vs latency instead of building")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    from agent.hotel_table import TABLE_FILE
+    from vector_store.doc_store import BLOB_FILE, OFFSETS_FILE
+    from vector_store.index_updates import DELTA_FILES
+    from vector_store.lexical_index import LEXICAL_FILE
+    from vector_store.snapshots import link_files, publish_snapshot, resolve_snapshot, writer_lock
+
+    if args.report:
+        embeddings = _load_embeddings(str(resolve_snapshot(args.index_dir, INDEX_FILE)[0]), args.embeddings)
+        rng = np.random.default_rng(0)
+        # Perturbed corpus vectors stand in for real queries
+        picks = rng.choice(len(embeddings), min(args.queries, len(embeddings)), replace=False)
+        queries = embeddings[picks] + rng.normal(0, 0.05, (len(picks), embeddings.shape[1])).astype(np.float32)
+        configs = [IndexConfig(kind="flat")]
+        configs += [IndexConfig(kind="ivf_flat", nlist=args.nlist, nprobe=p) for p in (1, 4, 16, 64)]
+        configs += [IndexConfig(kind="ivf_pq", nlist=args.nlist, pq_m=args.pq_m, nprobe=p) for p in (4, 16, 64)]
+        configs += [IndexConfig(kind="hnsw", hnsw_m=args.hnsw_m, ef_search=ef) for ef in (16, 64, 256)]
+        configs += [IndexConfig(kind=kind, rescore=r) for kind in ("sq_fp16", "sq_int8") for r in (0, 2, 4)]
+        configs += [IndexConfig(kind="binary", rescore=r) for r in (1, 4, 16, 32)]
+        for row in recall_latency_report(embeddings, queries, configs, k=args.k):
+            print(json.dumps(row))
+        return
+
+    config = IndexConfig(
+        kind=args.kind,
+        nlist=args.nlist,
+        pq_m=args.pq_m,
+        nprobe=args.nprobe,
+        hnsw_m=args.hnsw_m,
+        ef_search=args.ef_search,
+        rescore=args.rescore
+    )
+
+    def build(out):
+        # Documents, the lexical index, the hotel table and any incremental
+        # delta keep their rows; only the base ANN index is rebuilt
+        link_files(live_dir, out, [BLOB_FILE, OFFSETS_FILE, LEXICAL_FILE, TABLE_FILE] + DELTA_FILES)
+        save_index(index, config, str(out))
+        return {'kind': config.kind, 'vectors': int(index.ntotal), 'dim': int(index.d)}
+
+    with writer_lock(args.index_dir):
+        live_dir = resolve_snapshot(args.index_dir, INDEX_FILE)[0]
+        index = build_index(_load_embeddings(str(live_dir), args.embeddings), config)
+        snapshot = publish_snapshot(args.index_dir, build)
+    print(f"✅ Built {config.kind} index over {index.ntotal} vectors in {snapshot}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
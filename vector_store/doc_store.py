@@ -0,0 +1,167 @@
+"""Compact, memory-mapped hotel document store.
+
+Replaces ``faiss_index/docs.pkl``. Records are stored as packed UTF-8 JSON in
+``docs.bin`` with a ``docs.idx`` offset table (uint64, n + 1 entries), so a
+process maps the files once and decodes only the rows a query returns.
+Row ``i`` corresponds to FAISS id ``i``. Incremental updates
+(``vector_store.index_updates``) append rows in a ``docs_delta`` segment
+whose row numbers continue after the base rows; ``SegmentedDocStore``
+reads both.
+
+    python -m vector_store.doc_store data/skardu_hotels.csv --out faiss_index
+"""
+import argparse
+import json
+import mmap
+import os
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from agent.geo import coordinates
+from scraping.normalize import canonical_url, clean_value, listing_id, parse_price
+
+BASE_SEGMENT = "docs"
+DELTA_SEGMENT = "docs_delta"
+BLOB_FILE = f"{BASE_SEGMENT}.bin"
+OFFSETS_FILE = f"{BASE_SEGMENT}.idx"
+
+
+def record_from_csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a scraped listing row into a record shaped like ``agent.models.Hotel``."""
+    name = clean_value(row.get('hotel_name'))
+    city = clean_value(row.get('city'))
+    url = canonical_url(row.get('url'))
+    price = parse_price(row.get('price'))
+    record = {
+        "id": listing_id(name, city, url),
+        "name": name,
+        "description": f"{name} in {clean_value(row.get('location'))}",
+        # Booking review scores are not star ratings; use the processor's default
+        "star_rating": 3,
+        "contact_info": {
+            "phone": None,
+            "email": None,
+            "website": url or None,
+            "address": clean_value(row.get('location')),
+            "city": city,
+            "region": "",
+        },
+        "price_range": {
+            "min_price": price,
+            "max_price": price,
+            "currency": "PKR",
+            "price_per_night": True,
+        },
+        "amenities": [],
+        "images": [],
+        "review_score": clean_value(row.get('rating')) or None,
+    }
+    record.update(coordinates(record))
+    return record
+
+
+class DocStore:
+    """Read-only, mmap-backed view over records written by ``DocStore.write``."""
+
+    def __init__(self, store_dir: str = "faiss_index", segment: str = BASE_SEGMENT):
+        self.store_dir = Path(store_dir)
+        self._offsets = np.load(self.store_dir / f"{segment}.idx", mmap_mode='r')
+        self._file = open(self.store_dir / f"{segment}.bin", 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def get(self, i: int) -> Dict[str, Any]:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._blob[start:end].decode('utf-8'))
+
+    def get_many(self, ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """Decode the given rows, skipping FAISS's -1 padding for short result lists."""
+        n = len(self)
+        return [self.get(int(i)) for i in ids if 0 <= int(i) < n]
+
+    def close(self) -> None:
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+    @staticmethod
+    def write(records: Iterable[Dict[str, Any]], store_dir: str = "faiss_index", segment: str = BASE_SEGMENT) -> int:
+        """Write records in order, replacing any existing store atomically."""
+        out = Path(store_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        blob_file, offsets_file = f"{segment}.bin", f"{segment}.idx"
+        blob_tmp = out / (blob_file + ".tmp")
+        offsets = [0]
+        with open(blob_tmp, 'wb') as f:
+            for record in records:
+                data = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+
+        # np.save appends .npy to names without it, so write through a handle
+        offsets_tmp = out / (offsets_file + ".tmp")
+        with open(offsets_tmp, 'wb') as f:
+            np.save(f, np.asarray(offsets, dtype=np.uint64))
+        os.replace(blob_tmp, out / blob_file)
+        os.replace(offsets_tmp, out / offsets_file)
+        return len(offsets) - 1
+
+
+class SegmentedDocStore:
+    """Several ``DocStore`` segments read as one; row numbers continue from segment to segment."""
+
+    def __init__(self, segments: List[DocStore]):
+        self.segments = segments
+        self.starts = [0]
+        for segment in segments:
+            self.starts.append(self.starts[-1] + len(segment))
+
+    @classmethod
+    def open(cls, store_dir: str, base: Optional[DocStore] = None) -> "SegmentedDocStore":
+        """Base store (or an already open ``base``) plus the delta segment when present."""
+        segments = [base or DocStore(store_dir)]
+        if (Path(store_dir) / f"{DELTA_SEGMENT}.idx").exists():
+            segments.append(DocStore(store_dir, DELTA_SEGMENT))
+        return cls(segments)
+
+    def __len__(self) -> int:
+        return self.starts[-1]
+
+    def get(self, i: int) -> Dict[str, Any]:
+        s = bisect_right(self.starts, i) - 1
+        return self.segments[s].get(i - self.starts[s])
+
+    def get_many(self, ids: Sequence[int]) -> List[Dict[str, Any]]:
+        n = len(self)
+        return [self.get(int(i)) for i in ids if 0 <= int(i) < n]
+
+    def close(self, keep_base: bool = False) -> None:
+        for segment in self.segments[1:] if keep_base else self.segments:
+            segment.close()
+
+
+def records_from_csv(csv_path: str) -> List[Dict[str, Any]]:
+    df = pd.read_csv(csv_path)
+    df.columns = df.columns.str.strip()
+    return [record_from_csv_row(row) for row in df.to_dict(orient='records')]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the mmap document store from a scraped CSV")
+    parser.add_argument("csv_path")
+    parser.add_argument("--out", default="faiss_index")
+    args = parser.parse_args(argv)
+
+    count = DocStore.write(records_from_csv(args.csv_path), args.out)
+    print(f"✅ Wrote {count} documents to {args.out}/{BLOB_FILE}")
+
+
+if __name__ == "__main__":
+    main()
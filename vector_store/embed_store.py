@@ -1,39 +1,67 @@
-import pandas as pd
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.docstore.document import Document
-import os
-
-# Load hotel data
-df = pd.read_csv("data/skardu_hotels.csv")
-df.columns = df.columns.str.strip()  # Clean column names just in case
-
-# Combine relevant fields into one string per row
-df['combined'] = df.apply(
-    lambda row: (
-        f"Name: {row['hotel_name']}\n"
-        f"Location: {row['location']}\n"
-        f"City: {row['city']}\n"
-        f"Rating: {row['rating']}\n"
-        f"Price: {row['price']}\n"
-        f"URL: {row['url']}"
-    ),
-    axis=1
-)
-
-# Convert to Langchain Document objects
-documents = [Document(page_content=text) for text in df['combined']]
-
-# Split long texts (not really needed here but keeps things consistent)
-text_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-texts = text_splitter.split_documents(documents)
-
-# Initialize HuggingFace embeddings
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-# Store in Chroma vector DB (stored in ./vector_store/chroma_db/)
-vector_store = Chroma.from_documents(texts, embedding_model, persist_directory="vector_store/chroma_db")
-vector_store.persist()
-
-print("✅ Hotel data embedded and stored in ChromaDB.")
\ No newline at end of file
+"""Build both retrieval backends from a scraped CSV.
+
+Publishes the mmap document store, FAISS index, lexical (BM25/trigram)
+index and columnar hotel table as a new generation under ``faiss_index/generations/`` (running
+servers swap to it without a restart) and upserts the same hotels into the
+``hotels`` Chroma collection under ``data/vector_store``, so
+``vector_store.retrieval`` can serve either one::
+
+    python -m vector_store.embed_store data/skardu_hotels.csv
+"""
+import argparse
+
+from agent.hotel_table import HotelTable
+from agent.ingest import content_hash
+from agent.main import HotelAgent
+from vector_store.ann_index import INDEX_FILE, build_index, load_config, save_index
+from vector_store.doc_store import DocStore, records_from_csv
+from vector_store.lexical_index import LexicalIndex
+from vector_store.retrieval import get_engine, hotel_text, load_encoder
+from vector_store.snapshots import publish_snapshot, resolve_snapshot, writer_lock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed a scraped CSV into the FAISS and Chroma backends")
+    parser.add_argument("csv_path", nargs="?", default="data/skardu_hotels.csv")
+    parser.add_argument("--index-dir", default="faiss_index")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--skip-chroma", action="store_true")
+    parser.add_argument("--keep", type=int, default=3, help="Index generations to keep on disk")
+    args = parser.parse_args()
+
+    # Last occurrence wins for listings scraped twice
+    records = list({record['id']: record for record in records_from_csv(args.csv_path)}.values())
+
+    # Unchanged rows are served from the embedding cache
+    encoder = load_encoder()
+    embeddings = encoder.encode([hotel_text(record) for record in records])
+
+    def build(out):
+        DocStore.write(records, str(out))
+        LexicalIndex.build(records).save(str(out))
+        HotelTable.build(records).save(str(out))
+        save_index(build_index(embeddings, config), config, str(out))
+        return {'source': args.csv_path, 'hotels': len(records), 'kind': config.kind, 'dim': int(embeddings.shape[1])}
+
+    # A full build replaces the base and drops any incremental delta
+    with writer_lock(args.index_dir):
+        # The live generation's config carries over (flat directories included)
+        config = load_config(str(resolve_snapshot(args.index_dir, INDEX_FILE)[0]))
+        snapshot = publish_snapshot(args.index_dir, build, keep=args.keep)
+
+    if not args.skip_chroma:
+        engine = get_engine("chroma", data_dir=args.data_dir)
+        engine.backend.collection.upsert(
+            ids=[record['id'] for record in records],
+            embeddings=embeddings.tolist(),
+            metadatas=[HotelAgent._to_metadata(record, content_hash(record)) for record in records]
+        )
+        engine.invalidate()
+
+    print(f"✅ Embedded {len(records)} hotels into {snapshot}"
+          f"{'' if args.skip_chroma else ' and ' + args.data_dir + '/vector_store'}. "
+          f"Embedding cache: {encoder.stats()}")
+
+
+if __name__ == "__main__":
+    main()
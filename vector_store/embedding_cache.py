@@ -0,0 +1,307 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "data/embedding_cache"
+
+
+def text_key(text: str) -> str:
+    """sha1 of the exact text that is embedded."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def vector_checksum(vector: np.ndarray) -> str:
+    """Short digest of a stored vector's bytes."""
+    return hashlib.blake2b(np.ascontiguousarray(vector, dtype=np.float32).tobytes(), digest_size=8).hexdigest()
+
+
+def _normalize_model_name(model_name: str) -> str:
+    # "sentence-transformers/all-MiniLM-L6-v2" and "all-MiniLM-L6-v2" are the same model
+    return model_name.split("sentence-transformers/", 1)[-1]
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (model name, sha1(text)).
+
+    Vectors live in one memory-mapped float32 matrix per model and a sqlite
+    table maps each key to its row. Once a model's matrix is full, the least
+    recently used row is overwritten.
+
+    The directory may be shared by several processes (API workers and the
+    indexer). Rows are allocated, written and evicted inside one
+    ``BEGIN IMMEDIATE`` transaction, so only one process writes at a time,
+    and each entry keeps a checksum of its vector: a row that another
+    process overwrote under a reader is treated as a miss. Lookups never
+    register a model or grow its file; that only happens while storing.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, capacity: int = 100_000):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._matrices: Dict[str, np.memmap] = {}
+        # Autocommit mode; writers open their own BEGIN IMMEDIATE transactions
+        self._conn = sqlite3.connect(
+            str(self.cache_dir / "index.sqlite"), timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS models (
+                model TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                capacity INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                checksum TEXT,
+                PRIMARY KEY (model, text_hash)
+            );
+            CREATE INDEX IF NOT EXISTS entries_lru ON entries (model, last_used);
+        """)
+        columns = {info[1] for info in self._conn.execute("PRAGMA table_info(entries)")}
+        if "checksum" not in columns:
+            # Caches written before checksums: their entries are never trusted and get re-encoded
+            self._conn.execute("ALTER TABLE entries ADD COLUMN checksum TEXT")
+
+    def _path(self, model: str) -> Path:
+        return self.cache_dir / (re.sub(r'[^\w.-]', '_', model) + ".f32")
+
+    def _mapped(self, model: str, dim: int) -> Optional[np.memmap]:
+        """Map the rows a model's file already has, without creating or growing it."""
+        if model in self._matrices:
+            return self._matrices[model]
+        path = self._path(model)
+        rows = path.stat().st_size // (dim * 4) if path.exists() else 0
+        if rows == 0:
+            return None
+        matrix = np.memmap(path, dtype=np.float32, mode='r+', shape=(rows, dim))
+        self._matrices[model] = matrix
+        return matrix
+
+    def _writable_matrix(self, model: str, dim: int) -> np.memmap:
+        """Register a model and grow its file to full capacity; call inside BEGIN IMMEDIATE."""
+        row = self._conn.execute(
+            "SELECT dim, capacity FROM models WHERE model = ?", (model,)
+        ).fetchone()
+        capacity = self.capacity
+        if row is not None:
+            if row[0] != dim:
+                raise ValueError(f"Cached dim {row[0]} for {model} does not match {dim}")
+            if row[1] > capacity:
+                logger.warning(f"Embedding cache for {model} keeps its existing capacity of {row[1]}")
+            capacity = max(row[1], capacity)
+            if row[1] != capacity:
+                self._conn.execute("UPDATE models SET capacity = ? WHERE model = ?", (capacity, model))
+        else:
+            self._conn.execute(
+                "INSERT INTO models (model, dim, capacity) VALUES (?, ?, ?)", (model, dim, capacity)
+            )
+
+        matrix = self._matrices.get(model)
+        if matrix is not None and len(matrix) >= capacity:
+            return matrix
+        # Unmapped, or mapped before this or another process grew the file
+        nbytes = capacity * dim * 4
+        with open(self._path(model), 'ab') as f:
+            if f.tell() < nbytes:
+                f.truncate(nbytes)
+        self._matrices.pop(model, None)
+        matrix = np.memmap(self._path(model), dtype=np.float32, mode='r+', shape=(capacity, dim))
+        self._matrices[model] = matrix
+        return matrix
+
+    def lookup(self, model_name: str, texts: Sequence[str]) -> Dict[int, np.ndarray]:
+        """Return cached vectors as {position in texts: vector} and count hits/misses."""
+        model = _normalize_model_name(model_name)
+        keys = [text_key(t) for t in texts]
+        found: Dict[int, np.ndarray] = {}
+
+        with self._lock:
+            info = self._conn.execute("SELECT dim FROM models WHERE model = ?", (model,)).fetchone()
+            # Read-only: a model or file that no store has created yet is all misses
+            matrix = self._mapped(model, info[0]) if info is not None else None
+            if matrix is not None:
+                rows: Dict[str, Any] = {}
+                # Stay well under sqlite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    part = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(part))
+                    rows.update((key, (row, checksum)) for key, row, checksum in self._conn.execute(
+                        f"SELECT text_hash, row, checksum FROM entries "
+                        f"WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *part]
+                    ))
+                if rows and max(row for row, _ in rows.values()) >= len(matrix):
+                    # Another process grew the file since we mapped it
+                    del self._matrices[model]
+                    matrix = self._mapped(model, info[0])
+                used = set()
+                for pos, key in enumerate(keys):
+                    if key not in rows:
+                        continue
+                    row, checksum = rows[key]
+                    # Rows past the file belong to a writer that has not committed yet
+                    if row >= len(matrix):
+                        continue
+                    vector = np.array(matrix[row])
+                    if checksum is not None and vector_checksum(vector) == checksum:
+                        found[pos] = vector
+                        used.add(key)
+                if used:
+                    now = time.time()
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        self._conn.executemany(
+                            "UPDATE entries SET last_used = ? WHERE model = ? AND text_hash = ?",
+                            [(now, model, key) for key in used]
+                        )
+                    finally:
+                        self._conn.execute("COMMIT")
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def store(self, model_name: str, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Insert vectors for texts, evicting least recently used rows when full."""
+        model = _normalize_model_name(model_name)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+
+        # Later duplicates overwrite earlier ones
+        pending = {text_key(t): vectors[i] for i, t in enumerate(texts)}
+        with self._lock:
+            # Holds sqlite's write lock across allocation, the matrix write and
+            # eviction, so two processes never claim the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                matrix = self._writable_matrix(model, vectors.shape[1])
+                self._store_rows(model, matrix, pending, time.time())
+                matrix.flush()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _store_rows(self, model: str, matrix: np.memmap, pending: Dict[str, np.ndarray], now: float) -> None:
+        capacity = len(matrix)
+        keys = list(pending)
+        if len(keys) > capacity:
+            # Only the last `capacity` texts of an oversized batch can be kept
+            keys = keys[-capacity:]
+        rows = self._rows_for(model, keys)
+        count = self._conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE model = ?", (model,)
+        ).fetchone()[0]
+
+        new_keys = [key for key in keys if key not in rows]
+        free = list(range(count, min(capacity, count + len(new_keys))))
+        needed = len(new_keys) - len(free)
+        victims: List[Any] = []
+        if needed > 0:
+            # Oldest entries first, never one this batch is rewriting
+            for victim, row in self._conn.execute(
+                "SELECT text_hash, row FROM entries WHERE model = ? ORDER BY last_used LIMIT ?",
+                (model, needed + len(rows))
+            ):
+                if victim not in rows:
+                    victims.append((victim, row))
+                    if len(victims) == needed:
+                        break
+            self._conn.executemany(
+                "DELETE FROM entries WHERE model = ? AND text_hash = ?",
+                [(model, victim) for victim, _ in victims]
+            )
+            self.evictions += len(victims)
+        rows.update(zip(new_keys, free + [row for _, row in victims]))
+
+        order = np.array([rows[key] for key in keys], dtype=np.int64)
+        block = np.stack([pending[key] for key in keys])
+        matrix[order] = block
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO entries (model, text_hash, row, last_used, checksum) VALUES (?, ?, ?, ?, ?)",
+            [(model, key, int(row), now, vector_checksum(vector)) for key, row, vector in zip(keys, order, block)]
+        )
+
+    def _rows_for(self, model: str, keys: Sequence[str]) -> Dict[str, int]:
+        rows: Dict[str, int] = {}
+        # Stay well under sqlite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            rows.update(self._conn.execute(
+                f"SELECT text_hash, row FROM entries WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *part]
+            ))
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for matrix in self._matrices.values():
+                matrix.flush()
+            self._matrices.clear()
+            self._conn.close()
+
+
+class CachedEncoder:
+    """Drop-in wrapper around ``SentenceTransformer.encode`` backed by an EmbeddingCache.
+
+    Only texts that are not cached yet are passed to the model.
+    """
+
+    def __init__(self, model, model_name: str, cache: EmbeddingCache = None):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache or EmbeddingCache()
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        found = self.cache.lookup(self.model_name, texts)
+        missing = [i for i in range(len(texts)) if i not in found]
+        if missing:
+            kwargs.setdefault('show_progress_bar', False)
+            kwargs['convert_to_numpy'] = True
+            encoded = np.asarray(
+                self.model.encode([texts[i] for i in missing], batch_size=batch_size, **kwargs),
+                dtype=np.float32
+            )
+            self.cache.store(self.model_name, [texts[i] for i in missing], encoded)
+            for i, vector in zip(missing, encoded):
+                found[i] = vector
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        embeddings = np.stack([found[i] for i in range(len(texts))]).astype(np.float32)
+        return embeddings[0] if single else embeddings
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
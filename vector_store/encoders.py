@@ -0,0 +1,271 @@
+"""Selectable CPU inference backends for the sentence embedding model.
+
+- ``torch``: sentence-transformers, as before (imports torch).
+- ``onnx``: ONNX Runtime over an exported graph, int8 dynamically quantized
+  by default. Needs only ``onnxruntime`` and ``tokenizers`` at runtime.
+- ``static``: one precomputed vector per vocabulary token, averaged per
+  text. No network runs at query time; quality is lower and the vectors are
+  not interchangeable with the other backends, so indexes must be rebuilt
+  with the same backend.
+
+Every backend exposes ``encode(sentences, batch_size=32, **kwargs)`` like
+``SentenceTransformer`` and imports its dependencies only when loaded. The
+ONNX and static artifacts are exported once (this step needs torch)::
+
+    python -m vector_store.encoders export --backend onnx
+    python -m vector_store.encoders export --backend static
+
+and selected with ``HOTEL_ENCODER_BACKEND=onnx`` (or ``static``).
+"""
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Any, List, Literal, Union
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+MODEL_FILE = "model.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+STATIC_FILE = "static_embeddings.npy"
+
+
+class EncoderConfig(BaseModel):
+    """Which embedding backend to load and where its exported artifacts live."""
+    backend: Literal["torch", "onnx", "static"] = "torch"
+    model_name: str = DEFAULT_MODEL
+    model_dir: str = "data/models"
+    quantize: bool = True
+    max_length: int = 256
+    threads: int = 0
+
+    # model_name/model_dir are not pydantic internals
+    model_config = ConfigDict(protected_namespaces=())
+
+    @classmethod
+    def from_env(cls, **overrides) -> "EncoderConfig":
+        """Config from ``HOTEL_ENCODER_BACKEND`` / ``HOTEL_MODEL_DIR``, then ``overrides``."""
+        values = {}
+        if os.getenv("HOTEL_ENCODER_BACKEND"):
+            values['backend'] = os.environ["HOTEL_ENCODER_BACKEND"]
+        if os.getenv("HOTEL_MODEL_DIR"):
+            values['model_dir'] = os.environ["HOTEL_MODEL_DIR"]
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**values)
+
+    @property
+    def variant(self) -> str:
+        if self.backend == "onnx" and self.quantize:
+            return "onnx-int8"
+        return self.backend
+
+    @property
+    def artifact_dir(self) -> Path:
+        name = self.model_name.split("/")[-1]
+        return Path(self.model_dir) / f"{name}-{self.variant}"
+
+    @property
+    def cache_key(self) -> str:
+        """Embedding-cache model key; each backend's vectors are cached separately."""
+        return self.model_name if self.backend == "torch" else f"{self.model_name}-{self.variant}"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _as_batch(sentences: Union[str, List[str]]):
+    single = isinstance(sentences, str)
+    return single, [sentences] if single else list(sentences)
+
+
+def _load_tokenizer(path: Path, max_length: int, pad: bool):
+    from tokenizers import Tokenizer
+    tokenizer = Tokenizer.from_file(str(path))
+    tokenizer.enable_truncation(max_length)
+    if pad:
+        tokenizer.enable_padding(pad_id=tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+    else:
+        tokenizer.no_padding()
+    return tokenizer
+
+
+class OnnxEncoder:
+    """Mean-pooled, L2-normalized sentence embeddings from an exported ONNX graph.
+
+    Texts are sorted by length before batching so each batch pads to a
+    similar length.
+    """
+
+    def __init__(self, config: EncoderConfig):
+        import onnxruntime as ort
+
+        artifact_dir = config.artifact_dir
+        self.tokenizer = _load_tokenizer(artifact_dir / TOKENIZER_FILE, config.max_length, pad=True)
+        options = ort.SessionOptions()
+        if config.threads:
+            options.intra_op_num_threads = config.threads
+        self.session = ort.InferenceSession(
+            str(artifact_dir / MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single, texts = _as_batch(sentences)
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        out = None
+        for start in range(0, len(texts), batch_size):
+            positions = order[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in positions])
+            ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feed = {'input_ids': ids, 'attention_mask': mask}
+            if 'token_type_ids' in self.input_names:
+                feed['token_type_ids'] = np.zeros_like(ids)
+            hidden = self.session.run(None, feed)[0]
+
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            if out is None:
+                out = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[positions] = _normalize(pooled)
+
+        if out is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return out[0] if single else out
+
+
+class StaticEncoder:
+    """Average of precomputed per-token vectors; the tokenizer is the only moving part."""
+
+    def __init__(self, config: EncoderConfig):
+        artifact_dir = config.artifact_dir
+        self.tokenizer = _load_tokenizer(artifact_dir / TOKENIZER_FILE, config.max_length, pad=False)
+        self.vectors = np.load(artifact_dir / STATIC_FILE, mmap_mode="r")
+        self.special_ids = {
+            self.tokenizer.token_to_id(token) for token in ("[CLS]", "[SEP]", "[PAD]")
+        } - {None}
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single, texts = _as_batch(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        token_ids, lengths = [], []
+        for encoding in self.tokenizer.encode_batch(texts):
+            ids = [i for i in encoding.ids if i not in self.special_ids]
+            token_ids.extend(ids)
+            lengths.append(len(ids))
+
+        flat = np.asarray(self.vectors[np.asarray(token_ids, dtype=np.int64)], dtype=np.float32)
+        lengths = np.asarray(lengths)
+        out = np.zeros((len(texts), self.vectors.shape[1]), dtype=np.float32)
+        nonempty = lengths > 0
+        if nonempty.any():
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+            out[nonempty] = np.add.reduceat(flat, starts, axis=0) / lengths[nonempty, None]
+        out = _normalize(out)
+        return out[0] if single else out
+
+
+def load_model(config: EncoderConfig = None) -> Any:
+    """Instantiate the configured backend, importing only what it needs."""
+    config = config or EncoderConfig.from_env()
+    if config.backend == "onnx":
+        return OnnxEncoder(config)
+    if config.backend == "static":
+        return StaticEncoder(config)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(config.model_name)
+
+
+def export_onnx(config: EncoderConfig) -> Path:
+    """Export the transformer to ONNX and optionally quantize its weights to int8."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hub_name = config.model_name if "/" in config.model_name else f"sentence-transformers/{config.model_name}"
+    out = config.artifact_dir
+    out.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(hub_name)
+    model = AutoModel.from_pretrained(hub_name).eval()
+
+    sample = tokenizer(["a hotel in Skardu"], return_tensors="pt")
+    fp32_path = out / ("model.fp32.onnx" if config.quantize else MODEL_FILE)
+    dynamic = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic,
+                          "token_type_ids": dynamic, "last_hidden_state": dynamic},
+            opset_version=14,
+        )
+    if config.quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(fp32_path), str(out / MODEL_FILE), weight_type=QuantType.QInt8)
+        fp32_path.unlink()
+    tokenizer.backend_tokenizer.save(str(out / TOKENIZER_FILE))
+    return out
+
+
+def export_static(config: EncoderConfig, batch_size: int = 1024) -> Path:
+    """Embed every vocabulary token as its own ``[CLS] token [SEP]`` input.
+
+    Uses the same mean pooling as the sentence model; vectors are stored as
+    float16 (about 23 MB for MiniLM's 30k-token vocabulary).
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hub_name = config.model_name if "/" in config.model_name else f"sentence-transformers/{config.model_name}"
+    out = config.artifact_dir
+    out.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(hub_name)
+    model = AutoModel.from_pretrained(hub_name).eval()
+
+    vocab_size = tokenizer.vocab_size
+    vectors = None
+    with torch.no_grad():
+        for start in range(0, vocab_size, batch_size):
+            ids = torch.arange(start, min(start + batch_size, vocab_size))
+            input_ids = torch.stack([
+                torch.full_like(ids, tokenizer.cls_token_id), ids, torch.full_like(ids, tokenizer.sep_token_id)
+            ], dim=1)
+            hidden = model(input_ids=input_ids, attention_mask=torch.ones_like(input_ids)).last_hidden_state
+            pooled = hidden.mean(dim=1).numpy()
+            if vectors is None:
+                vectors = np.empty((vocab_size, pooled.shape[1]), dtype=np.float16)
+            vectors[start:start + len(ids)] = pooled
+            logger.info(f"Embedded {start + len(ids)}/{vocab_size} tokens")
+    np.save(out / STATIC_FILE, vectors)
+    tokenizer.backend_tokenizer.save(str(out / TOKENIZER_FILE))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export ONNX or static embedding artifacts")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--backend", choices=["onnx", "static"], required=True)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--no-quantize", action="store_true", help="Keep fp32 ONNX weights")
+    args = parser.parse_args()
+
+    config = EncoderConfig.from_env(
+        backend=args.backend, model_name=args.model, model_dir=args.model_dir, quantize=not args.no_quantize
+    )
+    out = export_onnx(config) if args.backend == "onnx" else export_static(config)
+    print(f"✅ Exported {config.variant} artifacts to {out}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,307 @@
+"""Incremental adds, updates and deletes for the published FAISS index.
+
+A full build (``vector_store.embed_store``) writes the *base* segment.
+``apply_changes`` then publishes each batch of new, changed and removed
+hotels as a generation that hard-links the base files and rewrites only a
+small *delta* segment next to them:
+
+- ``docs_delta.bin``/``.idx``, ``lexical_delta.npz`` and
+  ``hotel_table_delta.npz``: hotels added or
+  changed since the base was built. Their rows continue after the base rows.
+- ``delta_index.bin``: an exact ``IndexIDMap2`` over their vectors, labelled
+  with those rows.
+- ``tombstones.npy``: rows that were replaced or deleted. Searches skip them.
+
+Hotels are addressed by their ``id`` (``agent.models.Hotel``). Unchanged
+hotels are skipped by content hash and only the rest are encoded, so a
+nightly delta costs time proportional to the changes. Once tombstones or
+delta rows pass ``compact_ratio`` of all rows, ``compact`` folds everything
+into a new base (on a background thread with ``background=True``)::
+
+    python -m vector_store.index_updates data/processed/processed_hotels_<ts>.json \
+        --removed data/processed/removed_hotels_<ts>.json
+    python -m vector_store.index_updates --compact
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import faiss
+import numpy as np
+
+from agent.hotel_table import TABLE_DELTA_FILE, TABLE_FILE, HotelTable
+from agent.ingest import content_hash, iter_hotels
+from vector_store.ann_index import (
+    CONFIG_FILE, INDEX_FILE, VECTORS_FILE, build_index, enable_reconstruct, load_config, load_index, save_index
+)
+from vector_store.doc_store import BLOB_FILE, DELTA_SEGMENT, OFFSETS_FILE, DocStore
+from vector_store.lexical_index import LEXICAL_DELTA_FILE, LEXICAL_FILE, LexicalIndex
+from vector_store.snapshots import link_files, load_manifest, publish_snapshot, resolve_snapshot, writer_lock
+
+logger = logging.getLogger(__name__)
+
+DELTA_INDEX_FILE = "delta_index.bin"
+TOMBSTONES_FILE = "tombstones.npy"
+BASE_FILES = [INDEX_FILE, CONFIG_FILE, VECTORS_FILE, BLOB_FILE, OFFSETS_FILE, LEXICAL_FILE, TABLE_FILE]
+DELTA_FILES = [
+    f"{DELTA_SEGMENT}.bin", f"{DELTA_SEGMENT}.idx", LEXICAL_DELTA_FILE, TABLE_DELTA_FILE, DELTA_INDEX_FILE, TOMBSTONES_FILE
+]
+
+
+def load_tombstones(path: Path) -> np.ndarray:
+    """Sorted rows of replaced or deleted hotels (empty for a base-only snapshot)."""
+    tombstones = Path(path) / TOMBSTONES_FILE
+    if not tombstones.exists():
+        return np.zeros(0, dtype=np.int64)
+    return np.load(tombstones)
+
+
+def load_delta_index(path: Path) -> Optional[faiss.Index]:
+    delta = Path(path) / DELTA_INDEX_FILE
+    return faiss.read_index(str(delta)) if delta.exists() else None
+
+
+class IndexState:
+    """Which row holds each live hotel in one published generation."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.base_docs = DocStore(str(path))
+        self.base_rows = len(self.base_docs)
+        self.delta_records: List[Dict[str, Any]] = []
+        if (self.path / f"{DELTA_SEGMENT}.idx").exists():
+            delta = DocStore(str(path), DELTA_SEGMENT)
+            self.delta_records = delta.get_many(range(len(delta)))
+            delta.close()
+        self.tombstones = set(load_tombstones(path).tolist())
+
+        ids = self._base_ids() + [str(record['id']) for record in self.delta_records]
+        self.total_rows = len(ids)
+        self.rows = {hotel_id: row for row, hotel_id in enumerate(ids) if row not in self.tombstones}
+
+    def _base_ids(self) -> List[str]:
+        lexical = self.path / LEXICAL_FILE
+        if lexical.exists():
+            # The lexical index already lists every base row's hotel id
+            with np.load(lexical) as arrays:
+                return [str(hotel_id) for hotel_id in arrays["ids"]]
+        return [str(self.base_docs.get(row)['id']) for row in range(self.base_rows)]
+
+    def record(self, row: int) -> Dict[str, Any]:
+        if row < self.base_rows:
+            return self.base_docs.get(row)
+        return self.delta_records[row - self.base_rows]
+
+    def needs_compaction(self, ratio: float) -> bool:
+        delta_rows = self.total_rows - self.base_rows
+        return max(len(self.tombstones), delta_rows) > ratio * max(self.total_rows, 1)
+
+    def close(self) -> None:
+        self.base_docs.close()
+
+
+def _vector_dim(path: Path, delta_index: Optional[faiss.Index]) -> int:
+    if delta_index is not None:
+        return delta_index.d
+    dim = load_manifest(path).get('dim')
+    # Flat directories from older builds have no manifest
+    return int(dim) if dim else load_index(str(path)).d
+
+
+def apply_changes(
+    index_dir: str,
+    upserts: Iterable[Dict[str, Any]] = (),
+    deletes: Iterable[str] = (),
+    encoder=None,
+    compact_ratio: float = 0.2,
+    background: bool = False,
+    keep: int = 3
+) -> Dict[str, Any]:
+    """Publish added/changed hotels and deletions as a new delta generation.
+
+    Args:
+        index_dir: Root of the published index (``faiss_index``)
+        upserts: Processed hotels; the last one wins for repeated ids
+        deletes: Hotel ids that disappeared from the listings
+        encoder: ``CachedEncoder`` (defaults to the process-wide one)
+        compact_ratio: Compact once tombstones or delta rows exceed this share of all rows
+        background: Run that compaction on a background thread instead of inline
+        keep: Published generations to keep
+
+    Returns:
+        Update statistics; ``compaction`` is ``None``, ``"done"`` or ``"started"``
+    """
+    from vector_store.retrieval import hotel_text, load_encoder
+
+    start = time.perf_counter()
+    by_id = {str(hotel['id']): hotel for hotel in upserts}
+    stats = {'upserted': 0, 'unchanged': 0, 'deleted': 0, 'generation': None, 'compaction': None}
+
+    with writer_lock(index_dir):
+        live_dir, _ = resolve_snapshot(index_dir, INDEX_FILE)
+        state = IndexState(live_dir)
+        try:
+            changed = []
+            for hotel_id, hotel in by_id.items():
+                row = state.rows.get(hotel_id)
+                if row is not None and content_hash(state.record(row)) == content_hash(hotel):
+                    stats['unchanged'] += 1
+                else:
+                    changed.append(hotel)
+            removed = [state.rows[hotel_id] for hotel_id in dict.fromkeys(map(str, deletes))
+                       if hotel_id in state.rows and hotel_id not in by_id]
+            stats['upserted'], stats['deleted'] = len(changed), len(removed)
+
+            if changed or removed:
+                delta_index = load_delta_index(live_dir)
+                dim = _vector_dim(live_dir, delta_index)
+                if delta_index is None:
+                    delta_index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+                if changed:
+                    embeddings = np.asarray((encoder or load_encoder()).encode(
+                        [hotel_text(hotel) for hotel in changed]), dtype=np.float32)
+                    if embeddings.shape[1] != dim:
+                        raise ValueError(f"Encoder dim {embeddings.shape[1]} does not match index dim {dim}")
+                    delta_index.add_with_ids(embeddings, np.arange(
+                        state.total_rows, state.total_rows + len(changed), dtype=np.int64))
+
+                # The previous version of a changed hotel is replaced, not kept
+                tombstones = state.tombstones | set(removed) | {
+                    state.rows[str(hotel['id'])] for hotel in changed if str(hotel['id']) in state.rows
+                }
+                delta_records = state.delta_records + changed
+
+                def build(out):
+                    link_files(live_dir, out, BASE_FILES)
+                    DocStore.write(delta_records, str(out), DELTA_SEGMENT)
+                    LexicalIndex.build(delta_records).save(str(out), LEXICAL_DELTA_FILE)
+                    HotelTable.build(delta_records).save(str(out), TABLE_DELTA_FILE)
+                    faiss.write_index(delta_index, str(out / DELTA_INDEX_FILE))
+                    np.save(out / TOMBSTONES_FILE, np.array(sorted(tombstones), dtype=np.int64))
+                    return {
+                        'dim': dim,
+                        'base_rows': state.base_rows,
+                        'delta_rows': len(delta_records),
+                        'tombstones': len(tombstones),
+                        'live': state.base_rows + len(delta_records) - len(tombstones),
+                        'upserted': len(changed),
+                        'deleted': len(removed),
+                    }
+
+                snapshot = publish_snapshot(index_dir, build, keep=keep)
+                stats['generation'] = int(snapshot.name)
+        finally:
+            state.close()
+
+    stats['seconds'] = time.perf_counter() - start
+    logger.info(f"Applied {stats['upserted']} upserts ({stats['unchanged']} unchanged) and "
+                f"{stats['deleted']} deletes to {index_dir} in {stats['seconds']:.2f}s")
+
+    if stats['generation'] is not None:
+        live_dir, _ = resolve_snapshot(index_dir, INDEX_FILE)
+        state = IndexState(live_dir)
+        due = state.needs_compaction(compact_ratio)
+        state.close()
+        if due and background:
+            threading.Thread(target=_compact_logged, args=(index_dir, keep, encoder),
+                             name="index-compaction").start()
+            stats['compaction'] = "started"
+        elif due:
+            compact(index_dir, keep, encoder)
+            stats['compaction'] = "done"
+    return stats
+
+
+def _compact_logged(index_dir: str, keep: int, encoder) -> None:
+    try:
+        compact(index_dir, keep, encoder)
+    except Exception as e:
+        # The delta generation keeps serving; the next update retries
+        logger.error(f"Compaction of {index_dir} failed: {e}")
+
+
+def compact(index_dir: str, keep: int = 3, encoder=None) -> Optional[Path]:
+    """Fold the delta segment and tombstones into a new base generation.
+
+    Live vectors are read back from the indexes; IVF-PQ stores only
+    approximations, so those hotels are re-encoded through the embedding
+    cache instead. Returns ``None`` when there is nothing to compact.
+    """
+    from vector_store.retrieval import hotel_text, load_encoder
+
+    with writer_lock(index_dir):
+        live_dir, generation = resolve_snapshot(index_dir, INDEX_FILE)
+        state = IndexState(live_dir)
+        try:
+            if state.total_rows == state.base_rows and not state.tombstones:
+                return None
+            start = time.perf_counter()
+            live = np.array(sorted(state.rows.values()), dtype=np.int64)
+            records = [state.record(int(row)) for row in live]
+            config = load_config(str(live_dir))
+
+            if config.kind == "ivf_pq":
+                vectors = (encoder or load_encoder()).encode([hotel_text(record) for record in records])
+            else:
+                base = load_index(str(live_dir))
+                enable_reconstruct(base)
+                in_base = live[live < state.base_rows]
+                parts = [base.reconstruct_batch(in_base) if len(in_base) else np.zeros((0, base.d), dtype=np.float32)]
+                in_delta = live[live >= state.base_rows]
+                if len(in_delta):
+                    parts.append(load_delta_index(live_dir).reconstruct_batch(in_delta))
+                vectors = np.vstack(parts)
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+            def build(out):
+                DocStore.write(records, str(out))
+                LexicalIndex.build(records).save(str(out))
+                HotelTable.build(records).save(str(out))
+                save_index(build_index(vectors, config), config, str(out))
+                return {
+                    'compacted_from': generation,
+                    'hotels': len(records),
+                    'dropped': len(state.tombstones),
+                    'kind': config.kind,
+                    'dim': int(vectors.shape[1]),
+                }
+
+            snapshot = publish_snapshot(index_dir, build, keep=keep)
+        finally:
+            state.close()
+    logger.info(f"Compacted {index_dir} into {snapshot} ({len(records)} hotels, "
+                f"{time.perf_counter() - start:.1f}s)")
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply processed hotel changes to the FAISS index")
+    parser.add_argument("processed", nargs="*", help="Processed JSON/NDJSON files with new or changed hotels")
+    parser.add_argument("--removed", nargs="*", default=[], help="removed_hotels_*.json files")
+    parser.add_argument("--index-dir", default="faiss_index")
+    parser.add_argument("--compact-ratio", type=float, default=0.2)
+    parser.add_argument("--compact", action="store_true", help="Compact now, whatever the ratio")
+    parser.add_argument("--keep", type=int, default=3, help="Index generations to keep on disk")
+    args = parser.parse_args()
+
+    deletes = []
+    for path in args.removed:
+        with open(path, 'r', encoding='utf-8') as f:
+            deletes.extend(json.load(f))
+
+    if args.processed or deletes:
+        upserts = (hotel for path in args.processed for hotel in iter_hotels(path))
+        stats = apply_changes(args.index_dir, upserts, deletes, compact_ratio=args.compact_ratio, keep=args.keep)
+        print(json.dumps(stats))
+    if args.compact:
+        snapshot = compact(args.index_dir, keep=args.keep)
+        print(f"✅ Compacted into {snapshot}" if snapshot else "✅ Nothing to compact")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,265 @@
+"""Compact in-memory lexical index over hotel names, locations and descriptions.
+
+Two inverted indexes stored as CSR-style numpy arrays:
+
+- BM25 over word tokens of name (counted twice), address, city and
+  description.
+- Character trigrams of the hotel name, for typo-tolerant name lookup.
+
+The index is written next to the FAISS index (``faiss_index/lexical.npz``)
+and fused with vector results by ``RetrievalEngine`` using reciprocal-rank
+fusion. Hotels a query clearly names ("Kesar Palace", "montagna pods") are
+ranked first; a query is answered from this index alone, without encoding
+it, only when those hotels fill all ``k`` results.
+"""
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LEXICAL_FILE = "lexical.npz"
+LEXICAL_DELTA_FILE = "lexical_delta.npz"
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct character trigrams of a space-padded, lowercased name."""
+    normalized = " " + _NON_ALNUM_RE.sub(" ", (text or "").lower()).strip() + " "
+    return sorted({normalized[i:i + 3] for i in range(len(normalized) - 2)}) if normalized.strip() else []
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """Merge ranked id lists; each list contributes ``1 / (k + rank)`` per id."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _hotel_fields(hotel: Dict[str, Any]) -> Tuple[str, str]:
+    """(name, full searchable text) of a processed hotel or search result."""
+    contact_info = hotel.get("contact_info") or {}
+    name = hotel.get("name") or ""
+    text = " ".join([name, name, contact_info.get("address") or "", contact_info.get("city") or "",
+                     hotel.get("description") or ""])
+    return name, text
+
+
+def _postings(doc_terms: List[List[str]]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Vocabulary plus CSR postings (offsets, doc ids, term frequencies)."""
+    per_term: Dict[str, List[Tuple[int, int]]] = {}
+    for doc, terms in enumerate(doc_terms):
+        for term, tf in Counter(terms).items():
+            per_term.setdefault(term, []).append((doc, tf))
+    vocab = sorted(per_term)
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    docs, tfs = [], []
+    for i, term in enumerate(vocab):
+        entries = per_term[term]
+        offsets[i + 1] = offsets[i] + len(entries)
+        docs.extend(doc for doc, _ in entries)
+        tfs.extend(tf for _, tf in entries)
+    return vocab, offsets, np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32)
+
+
+class LexicalIndex:
+    """BM25 and name-trigram search over a fixed list of hotels.
+
+    Document ``i`` is the ``i``-th hotel passed to ``build`` (the same row
+    as the FAISS index and ``DocStore`` when built together).
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = [str(i) for i in arrays["ids"]]
+        self.doc_len = arrays["doc_len"]
+        self.avg_len = float(self.doc_len.mean()) if len(self.doc_len) else 0.0
+        self.term_offsets = arrays["term_offsets"]
+        self.term_docs = arrays["term_docs"]
+        self.term_tf = arrays["term_tf"]
+        self.tri_offsets = arrays["tri_offsets"]
+        self.tri_docs = arrays["tri_docs"]
+        self.name_tri_count = arrays["name_tri_count"]
+        self.terms = {term: i for i, term in enumerate(arrays["terms"].tolist())}
+        self.tris = {tri: i for i, tri in enumerate(arrays["tris"].tolist())}
+        n = len(self.ids)
+        df = np.diff(self.term_offsets).astype(np.float32)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        # Trigrams are weighted by rarity too, so "hotel" or "skardu" alone
+        # cannot make a confident name match
+        tri_df = np.diff(self.tri_offsets).astype(np.float32)
+        self.tri_idf = np.log1p(n / np.maximum(tri_df, 1))
+        self.unseen_tri_idf = float(np.log1p(n)) if n else 1.0
+        self.name_weight = np.bincount(
+            self.tri_docs, weights=np.repeat(self.tri_idf, tri_df.astype(np.int64)), minlength=n
+        ).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, hotels: Iterable[Dict[str, Any]]) -> "LexicalIndex":
+        ids, names, texts = [], [], []
+        for hotel in hotels:
+            name, text = _hotel_fields(hotel)
+            ids.append(str(hotel.get("id", hotel.get("hotel_id", ""))))
+            names.append(trigrams(name))
+            texts.append(tokenize(text))
+
+        terms, term_offsets, term_docs, term_tf = _postings(texts)
+        tris, tri_offsets, tri_docs, _ = _postings(names)
+        return cls({
+            "ids": np.array(ids, dtype=str),
+            "doc_len": np.array([len(t) for t in texts], dtype=np.float32),
+            "terms": np.array(terms, dtype=str),
+            "term_offsets": term_offsets,
+            "term_docs": term_docs,
+            "term_tf": term_tf,
+            "tris": np.array(tris, dtype=str),
+            "tri_offsets": tri_offsets,
+            "tri_docs": tri_docs,
+            "name_tri_count": np.array([len(t) for t in names], dtype=np.float32),
+        })
+
+    def save(self, index_dir: str, file_name: str = LEXICAL_FILE) -> None:
+        out = Path(index_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "ids": np.array(self.ids, dtype=str),
+            "doc_len": self.doc_len,
+            "terms": np.array(sorted(self.terms, key=self.terms.get), dtype=str),
+            "term_offsets": self.term_offsets,
+            "term_docs": self.term_docs,
+            "term_tf": self.term_tf,
+            "tris": np.array(sorted(self.tris, key=self.tris.get), dtype=str),
+            "tri_offsets": self.tri_offsets,
+            "tri_docs": self.tri_docs,
+            "name_tri_count": self.name_tri_count,
+        }
+        # Written through a handle so np.savez doesn't append another suffix
+        tmp = out / (file_name + ".tmp")
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        tmp.replace(out / file_name)
+
+    @classmethod
+    def load(cls, index_dir: str, file_name: str = LEXICAL_FILE) -> "LexicalIndex":
+        with np.load(Path(index_dir) / file_name) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def bm25(self, query: str, k: int = 10, exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top ``k`` (doc, score) pairs by BM25, skipping docs set in the boolean ``exclude`` mask."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(self.avg_len, 1e-9))
+        for term in set(tokenize(query)):
+            t = self.terms.get(term)
+            if t is None:
+                continue
+            start, end = self.term_offsets[t], self.term_offsets[t + 1]
+            docs, tf = self.term_docs[start:end], self.term_tf[start:end]
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1) / (tf + norm[docs])
+        return self._top(scores, k, exclude)
+
+    def name_matches(self, query: str, k: int = 10,
+                     exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float, float]]:
+        """Top ``k`` (doc, containment, coverage) by shared name trigrams.
+
+        ``containment`` is the share of the hotel name's trigrams found in
+        the query; ``coverage`` is the share of the query's trigrams that
+        belong to the name. Both are weighted by trigram rarity.
+        """
+        query_tris = trigrams(query)
+        known = [self.tris[tri] for tri in query_tris if tri in self.tris]
+        if not known:
+            return []
+        query_weight = float(self.tri_idf[known].sum()) + self.unseen_tri_idf * (len(query_tris) - len(known))
+        postings = [self.tri_docs[self.tri_offsets[t]:self.tri_offsets[t + 1]] for t in known]
+        shared = np.bincount(
+            np.concatenate(postings),
+            weights=np.repeat(self.tri_idf[known], [len(p) for p in postings]),
+            minlength=len(self.ids)
+        ).astype(np.float32)
+        containment = shared / np.maximum(self.name_weight, 1e-9)
+        coverage = shared / max(query_weight, 1e-9)
+        return [
+            (doc, float(containment[doc]), float(coverage[doc]))
+            for doc, _ in self._top(containment * coverage, k, exclude)
+        ]
+
+    def confident_matches(self, query: str, min_coverage: float = 0.8, min_containment: float = 0.3,
+                          max_matches: int = 3) -> List[int]:
+        """Docs whose name the query spells out, allowing a typo or two.
+
+        Almost all of the query must come from the name (``min_coverage``),
+        the query must cover a fair part of the name (``min_containment``),
+        and a query matching more than ``max_matches`` names (e.g. just
+        "Skardu") is too generic to count.
+        """
+        matches = [
+            doc for doc, containment, coverage in self.name_matches(query, max_matches + 1)
+            if coverage >= min_coverage and containment >= min_containment
+        ]
+        return matches if len(matches) <= max_matches else []
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int, exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        if exclude is not None:
+            scores[exclude] = 0
+        nonzero = np.flatnonzero(scores > 0)
+        if len(nonzero) > k:
+            nonzero = nonzero[np.argpartition(-scores[nonzero], k - 1)[:k]]
+        order = nonzero[np.argsort(-scores[nonzero], kind="stable")]
+        return [(int(doc), float(scores[doc])) for doc in order]
+
+
+class SegmentedLexicalIndex:
+    """Base and delta ``LexicalIndex`` searched together, with replaced or deleted docs masked out.
+
+    Doc numbers continue from segment to segment like ``SegmentedDocStore``
+    rows. BM25 statistics are per segment, which is close enough while the
+    delta stays small relative to the base.
+    """
+
+    def __init__(self, segments: List[LexicalIndex], dead: Optional[np.ndarray] = None):
+        self.segments = segments
+        self.starts = [0]
+        for segment in segments:
+            self.starts.append(self.starts[-1] + len(segment))
+        self.ids = [hotel_id for segment in segments for hotel_id in segment.ids]
+        self.dead = dead
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _exclude(self, s: int) -> Optional[np.ndarray]:
+        if self.dead is None:
+            return None
+        return self.dead[self.starts[s]:self.starts[s + 1]]
+
+    def bm25(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        hits = [
+            (doc + self.starts[s], score)
+            for s, segment in enumerate(self.segments)
+            for doc, score in segment.bm25(query, k, self._exclude(s))
+        ]
+        return sorted(hits, key=lambda hit: -hit[1])[:k]
+
+    def name_matches(self, query: str, k: int = 10) -> List[Tuple[int, float, float]]:
+        hits = [
+            (doc + self.starts[s], containment, coverage)
+            for s, segment in enumerate(self.segments)
+            for doc, containment, coverage in segment.name_matches(query, k, self._exclude(s))
+        ]
+        return sorted(hits, key=lambda hit: -hit[1] * hit[2])[:k]
+
+    confident_matches = LexicalIndex.confident_matches
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+
+# Punctuation that does not sit inside a word or number ("5,000", "wi-fi")
+_LOOSE_PUNCTUATION = re.compile(r'(?<!\w)[^\w\s]+|[^\w\s]+(?!\w)')
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, drop loose punctuation and collapse whitespace so trivially different queries share entries."""
+    return ' '.join(_LOOSE_PUNCTUATION.sub(' ', query.casefold()).split())
+
+
+def file_generation(path: str) -> int:
+    """Index generation derived from a file's mtime (0 if it does not exist yet).
+
+    Rebuilding an index rewrites its file, which changes the generation.
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+class LRUTTLCache:
+    """Thread-safe in-memory LRU map whose entries also expire after ``ttl_seconds``."""
+
+    def __init__(self, capacity: int = 10_000, ttl_seconds: Optional[float] = 600.0):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value for ``key`` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class QueryCache:
+    """Two-level cache for repeated search traffic.
+
+    Level one maps normalized query text to its embedding; level two maps
+    (embedding key, filters, k) to the search results. Results are only
+    valid for the index generation they were computed against: changing the
+    generation drops them, while embeddings stay valid as long as the model
+    does not change.
+    """
+
+    def __init__(self, embedding_capacity: int = 10_000, result_capacity: int = 10_000,
+                 ttl_seconds: Optional[float] = 600.0, generation: int = 0):
+        self.embeddings = LRUTTLCache(embedding_capacity, ttl_seconds)
+        self.results = LRUTTLCache(result_capacity, ttl_seconds)
+        self._generation = generation
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def set_generation(self, generation: int) -> None:
+        """Move to ``generation``, invalidating cached results if it changed."""
+        with self._lock:
+            if generation != self._generation:
+                self._generation = generation
+                self.results.clear()
+
+    def bump_generation(self) -> int:
+        """Invalidate cached results after the index changed in place."""
+        with self._lock:
+            self._generation += 1
+            self.results.clear()
+            return self._generation
+
+    @staticmethod
+    def embedding_key(query: str) -> str:
+        return hashlib.sha1(normalize_query(query).encode('utf-8')).hexdigest()
+
+    def encode(self, queries: Sequence[str], encode_fn: Callable[[List[str]], Any]) -> np.ndarray:
+        """Embeddings for ``queries``; ``encode_fn`` is called once with the normalized misses only."""
+        found: Dict[int, np.ndarray] = {}
+        missing: Dict[str, List[int]] = {}
+        for i, query in enumerate(queries):
+            key = self.embedding_key(query)
+            vector = self.embeddings.get(key)
+            if vector is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                found[i] = vector
+
+        if missing:
+            texts = [normalize_query(queries[positions[0]]) for positions in missing.values()]
+            encoded = np.asarray(encode_fn(texts), dtype=np.float32)
+            for (key, positions), vector in zip(missing.items(), encoded):
+                self.embeddings.put(key, vector)
+                for i in positions:
+                    found[i] = vector
+
+        if not queries:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[i] for i in range(len(queries))])
+
+    def _result_key(self, query: str, filters: Any, k: int) -> tuple:
+        # The same normalized key as the embedding, so queries that share an embedding share results
+        return (self.embedding_key(query), json.dumps(filters, sort_keys=True, default=str), k, self._generation)
+
+    def get_results(self, query: str, filters: Any, k: int) -> Any:
+        """Cached results (treat as read-only) or None."""
+        return self.results.get(self._result_key(query, filters, k))
+
+    def put_results(self, query: str, filters: Any, k: int, results: Any, generation: int = None) -> None:
+        """Cache results computed against ``generation`` (default: the current one).
+
+        Results computed before the generation changed are dropped.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            key = self._result_key(query, filters, k)
+        self.results.put(key, results)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'generation': self._generation,
+            'embeddings': self.embeddings.stats(),
+            'results': self.results.stats(),
+        }
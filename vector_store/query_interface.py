@@ -1,18 +1,7 @@
-import os
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
+from vector_store.retrieval import get_engine
 
-# Load the same embedding model
-embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
-
-# Load the ChromaDB directory
-persist_directory = "vector_store/chroma_db"
-vectordb = Chroma(
-    persist_directory=persist_directory,
-    embedding_function=embedding_model
-)
+# Same engine the agent uses: the "hotels" Chroma collection under data/vector_store
+engine = get_engine("chroma", data_dir="data")
 
 # Simple query loop
 while True:
@@ -20,8 +9,8 @@ while True:
     if query.lower() == "exit":
         break
 
-    results = vectordb.similarity_search(query, k=3)
+    results = engine.search(query, k=3)
 
     print("\nTop 3 matching hotels:\n")
-    for i, doc in enumerate(results, 1):
-        print(f"Result {i}:\n{doc.page_content}\n{'-'*40}")
+    for i, hotel in enumerate(results, 1):
+        print(f"Result {i}:\n{hotel['name']}\n{hotel['description']}\n{'-'*40}")
@@ -0,0 +1,158 @@
+"""Batched second-stage reranking of over-fetched vector candidates.
+
+For every query the backend returns ``RerankConfig.candidates`` candidates
+with their stored vectors and star/price fields, without decoding their
+documents. One NumPy pass then scores all queries at once:
+
+    relevance = similarity_weight * cosine(query, candidate)
+              + fit_weight * constraint_fit(candidate)
+
+and picks the final ``k`` by maximal marginal relevance, so a second
+listing of the same hotel (e.g. from booking and sastaticket) does not take
+a slot from a different hotel. Only the ``k`` MMR steps are sequential;
+each step is vectorized over queries and candidates. ``rerank_positions``
+returns the picks as positions, so only those ``k`` hotels are decoded.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+from agent.query_parser import QueryConstraints
+
+
+class RerankConfig(BaseModel):
+    """Over-fetch size and scoring weights for the rerank stage."""
+    candidates: int = 50
+    similarity_weight: float = 1.0
+    fit_weight: float = 0.2
+    mmr_lambda: float = 0.75
+    # Candidates at least this similar to an already selected one are dropped
+    duplicate_threshold: float = 0.97
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def constraint_fit(stars: np.ndarray, prices: np.ndarray,
+                   constraints: Sequence[Optional[QueryConstraints]]) -> np.ndarray:
+    """Soft 0..1 fit of candidates to each query's star range and budget.
+
+    ``stars`` and ``prices`` are (queries, candidates) arrays with NaN for
+    unknown values, which score a neutral 0.5. Queries without star or
+    price constraints get 0 for every candidate.
+    """
+    q = len(constraints)
+    min_stars = np.array([c.min_stars if c and c.min_stars is not None else np.nan for c in constraints])[:, None]
+    max_stars = np.array([c.max_stars if c and c.max_stars is not None else np.nan for c in constraints])[:, None]
+    budget = np.array([c.max_price if c and c.max_price is not None else np.nan for c in constraints])[:, None]
+
+    has_stars = ~(np.isnan(min_stars) & np.isnan(max_stars))
+    below = np.nan_to_num(min_stars - stars, nan=0.0).clip(min=0)
+    above = np.nan_to_num(stars - max_stars, nan=0.0).clip(min=0)
+    star_fit = np.where(np.isnan(stars), 0.5, 1.0 - np.clip((below + above) / 2, 0, 1))
+
+    has_budget = ~np.isnan(budget)
+    over = np.clip((prices - budget) / np.where(has_budget, budget, 1.0), 0, 1)
+    price_fit = np.where(np.isnan(prices), 0.5, 1.0 - np.nan_to_num(over, nan=0.0))
+
+    parts = has_stars.astype(np.float32) + has_budget.astype(np.float32)
+    total = np.where(has_stars, star_fit, 0.0) + np.where(has_budget, price_fit, 0.0)
+    return np.where(parts > 0, total / np.maximum(parts, 1), 0.0).reshape(q, -1)
+
+
+def candidate_fields(stars: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """(candidates, 2) float32 star rating and minimum price, NaN where unknown (0 or missing)."""
+    fields = np.stack([stars, prices], axis=1).astype(np.float32)
+    fields[~(fields > 0)] = np.nan
+    return fields
+
+
+def hit_fields(hits: List[Dict[str, Any]]) -> np.ndarray:
+    """``candidate_fields`` read from result dicts, for backends without a hotel table."""
+    values = np.array(
+        [(hit.get('star_rating'), (hit.get('price_range') or {}).get('min_price')) for hit in hits],
+        dtype=np.float32,
+    ).reshape(-1, 2)
+    return candidate_fields(values[:, 0], values[:, 1])
+
+
+def rerank_positions(
+    query_embeddings: np.ndarray,
+    candidate_embeddings: List[np.ndarray],
+    k: int,
+    constraints: Sequence[Optional[QueryConstraints]] = None,
+    config: RerankConfig = None,
+    fields: List[np.ndarray] = None
+) -> List[np.ndarray]:
+    """Positions of each query's top ``k`` candidates by MMR, best first.
+
+    Works on the candidates' stored vectors and their ``candidate_fields``
+    only, so backends can keep candidates undecoded until the final ``k``
+    are known.
+    """
+    config = config or RerankConfig()
+    q = len(candidate_embeddings)
+    n = max((len(c) for c in candidate_embeddings), default=0)
+    if q == 0 or n == 0:
+        return [np.zeros(0, dtype=np.int64) for _ in candidate_embeddings]
+    constraints = constraints if constraints is not None else [None] * q
+
+    # Pad to (q, n, d) so every query is scored in the same matrix ops
+    dim = query_embeddings.shape[1]
+    vectors = np.zeros((q, n, dim), dtype=np.float32)
+    valid = np.zeros((q, n), dtype=bool)
+    stars = np.full((q, n), np.nan, dtype=np.float32)
+    prices = np.full((q, n), np.nan, dtype=np.float32)
+    for row, (embeddings, row_fields) in enumerate(zip(candidate_embeddings, fields)):
+        count = len(embeddings)
+        if not count:
+            continue
+        vectors[row, :count] = embeddings
+        valid[row, :count] = True
+        stars[row, :count] = row_fields[:, 0]
+        prices[row, :count] = row_fields[:, 1]
+
+    vectors = _normalize(vectors)
+    queries = _normalize(np.asarray(query_embeddings, dtype=np.float32))
+    similarity = np.einsum('qd,qnd->qn', queries, vectors)
+    relevance = config.similarity_weight * similarity + config.fit_weight * constraint_fit(stars, prices, constraints)
+    pairwise = np.einsum('qnd,qmd->qnm', vectors, vectors)
+
+    rows = np.arange(q)
+    available = valid.copy()
+    redundancy = np.zeros((q, n), dtype=np.float32)
+    picked = np.full((q, min(k, n)), -1, dtype=np.int64)
+    for step in range(picked.shape[1]):
+        score = config.mmr_lambda * relevance - (1 - config.mmr_lambda) * redundancy
+        score = np.where(available, score, -np.inf)
+        choice = score.argmax(axis=1)
+        has_choice = available[rows, choice]
+        picked[:, step] = np.where(has_choice, choice, -1)
+        available[rows, choice] = False
+        chosen_sim = pairwise[rows, choice]
+        redundancy = np.where(has_choice[:, None], np.maximum(redundancy, chosen_sim), redundancy)
+        available &= ~(has_choice[:, None] & (chosen_sim >= config.duplicate_threshold))
+
+    return [row[row >= 0] for row in picked]
+
+
+def rerank(
+    query_embeddings: np.ndarray,
+    candidates: List[List[Dict[str, Any]]],
+    candidate_embeddings: List[np.ndarray],
+    k: int,
+    constraints: Sequence[Optional[QueryConstraints]] = None,
+    config: RerankConfig = None,
+    fields: Optional[List[np.ndarray]] = None
+) -> List[List[Dict[str, Any]]]:
+    """Rerank each query's decoded candidates and return its top ``k`` by MMR.
+
+    ``fields`` holds each query's ``candidate_fields``; without it they are
+    read from the hits.
+    """
+    if fields is None:
+        fields = [hit_fields(hits) for hits in candidates]
+    picks = rerank_positions(query_embeddings, candidate_embeddings, k, constraints, config, fields)
+    return [[hits[i] for i in positions] for hits, positions in zip(candidates, picks)]
@@ -0,0 +1,929 @@
+"""One retrieval engine for every hotel search entry point.
+
+The Streamlit app, the CLI scripts and ``HotelAgent`` all search through a
+``RetrievalEngine``. It encodes queries with a process-wide model, caches
+query embeddings and results, pushes parsed constraints down to a pluggable
+backend and returns the same structured hotel results whichever backend
+answered:
+
+- ``FaissBackend``: ``faiss_index/`` index plus the mmap ``DocStore``.
+- ``ChromaBackend``: the ``hotels`` collection under ``data/vector_store``.
+
+``get_engine`` hands out one engine per backend configuration, so model and
+index load costs are paid once per process. FAISS engines move to a newly
+published index generation (``vector_store.snapshots``) without a restart;
+see ``FaissBackend``::
+
+    python -m vector_store.retrieval "3-star hotels in Skardu with wifi" --backend chroma
+    python -m vector_store.retrieval --compare
+"""
+import argparse
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from agent.hotel_table import TABLE_DELTA_FILE, TABLE_FILE, HotelTable, to_hotels
+from agent.instrumentation import count, span, timed
+from agent.models import Hotel
+from agent.query_parser import QueryConstraints, parse_query
+from vector_store.embedding_cache import DEFAULT_CACHE_DIR, CachedEncoder, EmbeddingCache
+from vector_store.encoders import DEFAULT_MODEL, EncoderConfig, load_model
+from vector_store.lexical_index import LEXICAL_FILE, LexicalIndex, reciprocal_rank_fusion
+from vector_store.query_cache import QueryCache
+from vector_store.rerank import RerankConfig, candidate_fields, hit_fields, rerank_positions
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def load_encoder(model_name: str = DEFAULT_MODEL, cache_dir: str = DEFAULT_CACHE_DIR,
+                 backend: Optional[str] = None) -> CachedEncoder:
+    """Process-wide embedding model wrapped in the on-disk embedding cache.
+
+    ``backend`` defaults to ``HOTEL_ENCODER_BACKEND`` (torch when unset);
+    see ``vector_store.encoders``.
+    """
+    config = EncoderConfig.from_env(model_name=model_name, backend=backend)
+    return CachedEncoder(load_model(config), config.cache_key, EmbeddingCache(cache_dir))
+
+
+def hotel_text(hotel: Dict[str, Any]) -> str:
+    """Text that is embedded for a hotel."""
+    return f"{hotel['name']} {hotel['description']}"
+
+
+def _decode_field(value: Any, default: Any) -> Any:
+    """Decode a nested field that was stored as JSON in Chroma metadata."""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return default
+    return value
+
+
+def hotel_result(hotel: Dict[str, Any], distance: Optional[float] = None) -> Dict[str, Any]:
+    """Structured search result for a processed hotel record or decoded Chroma metadata."""
+    return {
+        'hotel_id': str(hotel.get('id', '')),
+        'name': hotel.get('name', ''),
+        'description': hotel.get('description', ''),
+        'star_rating': hotel.get('star_rating'),
+        'contact_info': _decode_field(hotel.get('contact_info'), {}),
+        'price_range': _decode_field(hotel.get('price_range'), {}),
+        'amenities': _decode_field(hotel.get('amenities'), []),
+        'latitude': hotel.get('latitude'),
+        'longitude': hotel.get('longitude'),
+        'distance': distance,
+    }
+
+
+def _load_table(path: Path, file_name: str, docs) -> HotelTable:
+    if (path / file_name).exists():
+        return HotelTable.load(str(path), file_name)
+    # Generations written before hotel tables existed
+    logger.info(f"No {file_name} in {path}; building the hotel table from {len(docs)} documents")
+    return HotelTable.build(docs.get_many(range(len(docs))))
+
+
+def _file_key(path: Path) -> tuple:
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class _Snapshot:
+    """One loaded index generation, closed once it is retired and no search holds it.
+
+    The base segment (index, documents, lexical index, hotel table) is shared with the
+    previous snapshot when a delta generation hard-linked the same files,
+    so applying a small update does not reload the whole corpus.
+    """
+
+    def __init__(self, path: Path, generation: int, previous: Optional["_Snapshot"] = None):
+        from vector_store.ann_index import INDEX_FILE, enable_reconstruct, load_index
+        from vector_store.doc_store import DocStore, SegmentedDocStore
+        from vector_store.index_updates import load_delta_index, load_tombstones
+        from vector_store.lexical_index import LEXICAL_DELTA_FILE, SegmentedLexicalIndex
+
+        self.path = path
+        self.generation = generation
+        self.base_key = _file_key(path / INDEX_FILE)
+        reuse = previous is not None and previous.owns_base and previous.base_key == self.base_key
+        if reuse:
+            self.base_index, base_lexical = previous.base_index, previous.base_lexical
+            base_docs, self.base_table = previous.docs.segments[0], previous.base_table
+        else:
+            self.base_index = load_index(str(path))
+            enable_reconstruct(self.base_index)
+            base_docs = DocStore(str(path))
+            base_lexical = LexicalIndex.load(str(path)) if (path / LEXICAL_FILE).exists() else None
+            self.base_table = _load_table(path, TABLE_FILE, base_docs)
+        self.base_lexical = base_lexical
+        self.docs = SegmentedDocStore.open(str(path), base_docs)
+        self.base_rows = len(base_docs)
+        self.table = self.base_table
+        if len(self.docs.segments) > 1:
+            delta_table = _load_table(path, TABLE_DELTA_FILE, self.docs.segments[1])
+            self.table = HotelTable.concat([self.base_table, delta_table])
+        self.delta_index = load_delta_index(path)
+
+        self.tombstones = load_tombstones(path)
+        self.dead = np.zeros(len(self.docs), dtype=bool)
+        self.dead[self.tombstones] = True
+        self.lexical = base_lexical
+        if base_lexical is not None and (self.delta_index is not None or len(self.tombstones)):
+            segments = [base_lexical]
+            if (path / LEXICAL_DELTA_FILE).exists():
+                segments.append(LexicalIndex.load(str(path), LEXICAL_DELTA_FILE))
+            self.lexical = SegmentedLexicalIndex(segments, self.dead)
+
+        self.owns_base = True
+        if reuse:
+            previous.owns_base = False
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._retired = False
+
+    @property
+    def index(self):
+        return self.base_index
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        """Stored vectors for document rows from either segment, in order."""
+        vectors = np.zeros((len(rows), self.base_index.d), dtype=np.float32)
+        in_base = rows < self.base_rows
+        if in_base.any():
+            vectors[in_base] = self.base_index.reconstruct_batch(rows[in_base])
+        if not in_base.all():
+            vectors[~in_base] = self.delta_index.reconstruct_batch(rows[~in_base])
+        return vectors
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._readers += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._readers -= 1
+            close = self._retired and not self._readers
+        if close:
+            self._close()
+
+    def retire(self) -> None:
+        with self._lock:
+            self._retired = True
+            close = not self._readers
+        if close:
+            self._close()
+
+    def _close(self) -> None:
+        # A successor that took over the base segment keeps it open
+        self.docs.close(keep_base=not self.owns_base)
+        # Drop the in-memory indexes and postings now rather than whenever the backend is collected
+        self.base_index = self.delta_index = self.base_lexical = self.lexical = None
+        self.base_table = self.table = None
+        logger.info(f"Released index generation {self.generation} ({self.path})")
+
+
+class FaissBackend:
+    """FAISS index with the mmap document store; constraints are checked after the search.
+
+    Constraints become a row mask over the columnar ``HotelTable``, so
+    candidates that fail them are dropped without decoding their documents.
+    Rerank candidates (``search_candidates``) stay document rows with their
+    stored vectors and table fields; only the rows ``materialize`` is given
+    are decoded.
+    Filtered searches fetch ``overfetch * k`` candidates so enough survive
+    the mask; when at most ``exact_below`` hotels match, those rows are
+    searched exhaustively instead. The index, documents and ``lexical.npz`` are
+    served from the live generation of ``vector_store.snapshots`` (or a
+    flat directory), together with the delta segment and tombstones of
+    ``vector_store.index_updates`` when present; tombstoned rows are
+    skipped like hits that fail the constraints. A newly published generation is loaded on the next
+    ``refresh`` or by ``watch``, while searches keep running on the old one,
+    and swapped in atomically; the old one is closed once the searches
+    that pinned it finish.
+    """
+    name = "faiss"
+
+    def __init__(self, index_dir: str = "faiss_index", overfetch: int = 10, exact_below: int = 2048):
+        self.index_dir = index_dir
+        self.overfetch = overfetch
+        self.exact_below = exact_below
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._local = threading.local()
+        self._snapshot: Optional[_Snapshot] = None
+        self._pointer = None
+        self._watcher = None
+        self.refresh()
+
+    @property
+    def generation(self) -> int:
+        return self._snapshot.generation
+
+    def _current(self) -> _Snapshot:
+        return getattr(self._local, 'snapshot', None) or self._snapshot
+
+    @property
+    def index(self):
+        return self._current().index
+
+    @property
+    def docs(self):
+        return self._current().docs
+
+    @property
+    def lexical(self) -> Optional[LexicalIndex]:
+        return self._current().lexical
+
+    @contextlib.contextmanager
+    def pinned(self):
+        """Keep the live generation for the enclosed calls on this thread, even across a swap."""
+        held = getattr(self._local, 'snapshot', None)
+        if held is not None:
+            yield held
+            return
+        with self._lock:
+            held = self._snapshot
+            held.acquire()
+        self._local.snapshot = held
+        try:
+            yield held
+        finally:
+            self._local.snapshot = None
+            held.release()
+
+    def refresh(self) -> Optional[int]:
+        """Swap to the published generation if it changed; return the live generation.
+
+        Only the first load blocks. Later loads happen while other threads
+        keep searching the old generation, and callers that find a load
+        already in progress return at once.
+        """
+        from vector_store.ann_index import INDEX_FILE
+        from vector_store.snapshots import pointer_state, resolve_snapshot
+
+        pointer = pointer_state(self.index_dir, INDEX_FILE)
+        live = self._snapshot
+        if live is None and pointer == (0, 0):
+            raise FileNotFoundError(
+                f"No FAISS index in {self.index_dir}; build one with "
+                f"`python -m vector_store.embed_store data/skardu_hotels.csv`"
+            )
+        if live is not None and pointer == self._pointer:
+            return live.generation
+        if not self._load_lock.acquire(blocking=live is None):
+            return live.generation
+        try:
+            path, generation = resolve_snapshot(self.index_dir, INDEX_FILE)
+            live = self._snapshot
+            if live is None or generation != live.generation:
+                if live is not None:
+                    logger.info(f"Loading index generation {generation} from {path}")
+                loaded = _Snapshot(path, generation, previous=live)
+                with self._lock:
+                    self._snapshot = loaded
+                if live is not None:
+                    live.retire()
+            self._pointer = pointer
+            return self._snapshot.generation
+        finally:
+            self._load_lock.release()
+
+    def watch(self, interval_s: float = 1.0) -> None:
+        """Load new generations in the background as soon as they are published."""
+        from vector_store.ann_index import INDEX_FILE
+        from vector_store.snapshots import SnapshotWatcher
+
+        if self._watcher is None:
+            self._watcher = SnapshotWatcher(self.index_dir, INDEX_FILE, self.refresh, interval_s).start()
+
+    def invalidate(self) -> None:
+        # Rebuilds are detected by refresh()
+        pass
+
+    def lexical_hits(self, docs: List[int]) -> List[Dict[str, Any]]:
+        """Results for lexical-index documents (rows of the document store)."""
+        with self.pinned() as snapshot:
+            return [hotel_result(snapshot.docs.get(doc)) for doc in docs]
+
+    def browse(self, constraints: Optional[QueryConstraints] = None, sort: Optional[str] = None,
+               descending: bool = False, k: int = 10) -> List[Hotel]:
+        """Hotels matching ``constraints`` without a query, optionally sorted by price or stars."""
+        with self.pinned() as snapshot:
+            with span("faiss.browse"):
+                rows = snapshot.table.select(constraints, sort, descending, k, exclude=snapshot.dead)
+                return to_hotels(snapshot.docs.get_many(rows.tolist()))
+
+    def nearby(self, latitude: float, longitude: float, k: int = 10, radius_km: Optional[float] = None,
+               constraints: Optional[QueryConstraints] = None) -> List[Dict[str, Any]]:
+        """Up to ``k`` nearest hotels matching ``constraints``, nearest first, with ``distance_km``."""
+        with self.pinned() as snapshot:
+            with span("faiss.nearby"):
+                allowed = snapshot.table.mask(constraints) & ~snapshot.dead
+                rows, distances = snapshot.table.geo.nearest(latitude, longitude, k, allowed, radius_km)
+                return [
+                    {**hotel_result(doc), 'distance_km': float(distance)}
+                    for doc, distance in zip(snapshot.docs.get_many(rows.tolist()), distances)
+                ]
+
+    def search(self, embeddings: np.ndarray, k: int, constraints: Optional[QueryConstraints] = None):
+        """Top ``k`` hits per query."""
+        with self.pinned() as snapshot:
+            rows, distances = self._search(snapshot, embeddings, k, constraints)
+            return self._materialize(snapshot, rows, distances)
+
+    def search_candidates(self, embeddings: np.ndarray, n: int, constraints: Optional[QueryConstraints] = None):
+        """Up to ``n`` undecoded candidates per query, with their stored vectors and rerank fields.
+
+        Candidates are each query's (document rows, distances); call
+        ``materialize`` with the positions to keep inside the same ``pinned``
+        block so the rows refer to the same generation.
+        """
+        with self.pinned() as snapshot:
+            rows, distances = self._search(snapshot, embeddings, n, constraints)
+            flat = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+            with span("faiss.reconstruct"):
+                stored = snapshot.reconstruct(flat)
+            fields = candidate_fields(snapshot.table.star_rating[flat], snapshot.table.min_price[flat])
+            splits = np.cumsum([len(kept) for kept in rows])[:-1]
+            return list(zip(rows, distances)), np.split(stored, splits), np.split(fields, splits)
+
+    def materialize(self, candidates, picks: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Results for the picked positions of each query's ``search_candidates``."""
+        with self.pinned() as snapshot:
+            return self._materialize(
+                snapshot,
+                [rows[positions] for (rows, _), positions in zip(candidates, picks)],
+                [distances[positions] for (_, distances), positions in zip(candidates, picks)],
+            )
+
+    def _search(self, snapshot: _Snapshot, embeddings: np.ndarray, k: int,
+                constraints: Optional[QueryConstraints]):
+        queries = np.ascontiguousarray(embeddings, dtype=np.float32)
+        skip = snapshot.dead
+        if constraints is not None:
+            with span("faiss.mask"):
+                skip = skip | ~snapshot.table.mask(constraints)
+            allowed = np.flatnonzero(~skip)
+            if len(allowed) <= self.exact_below:
+                with span("faiss.search_exact"):
+                    distances, ids = self._search_rows(snapshot, queries, allowed, k)
+                return self._collect(distances, ids, skip, k)
+        # Constraints and tombstones both drop hits after the search
+        filtered = constraints is not None or len(snapshot.tombstones)
+        fetch = k if not filtered else max(k, min(k * self.overfetch, len(snapshot.docs)))
+        with span("faiss.search"):
+            distances, ids = snapshot.base_index.search(queries, min(fetch, snapshot.base_index.ntotal) or 1)
+            if snapshot.delta_index is not None and snapshot.delta_index.ntotal:
+                # The delta is labelled with document rows already; merge by distance
+                delta_distances, delta_ids = snapshot.delta_index.search(
+                    queries, min(fetch, snapshot.delta_index.ntotal))
+                distances = np.concatenate([distances, delta_distances], axis=1)
+                ids = np.concatenate([ids, delta_ids], axis=1)
+                order = np.argsort(distances, axis=1, kind="stable")
+                distances = np.take_along_axis(distances, order, axis=1)
+                ids = np.take_along_axis(ids, order, axis=1)
+        return self._collect(distances, ids, skip, k)
+
+    @staticmethod
+    def _search_rows(snapshot: _Snapshot, queries: np.ndarray, rows: np.ndarray, k: int):
+        """Exact L2 search over a few document rows, labelled with those rows."""
+        import faiss
+
+        if not len(rows):
+            return (np.zeros((len(queries), 0), dtype=np.float32),
+                    np.zeros((len(queries), 0), dtype=np.int64))
+        distances, positions = faiss.knn(queries, snapshot.reconstruct(rows), min(k, len(rows)))
+        return distances, rows[positions]
+
+    @staticmethod
+    def _collect(distances: np.ndarray, ids: np.ndarray, skip: np.ndarray, k: int):
+        """Each query's first ``k`` live hits as ragged (document rows, distances); nothing is decoded.
+
+        Tombstoned, filtered and padding hits are dropped with array
+        operations over all queries at once.
+        """
+        # FAISS pads short result lists with -1
+        live = (ids >= 0) & ~skip[np.maximum(ids, 0)]
+        live &= np.cumsum(live, axis=1) <= k
+        splits = np.cumsum(live.sum(axis=1))[:-1]
+        return np.split(ids[live].astype(np.int64), splits), np.split(distances[live], splits)
+
+    @staticmethod
+    def _materialize(snapshot: _Snapshot, rows: List[np.ndarray],
+                     distances: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Decode the given rows of each query into results, with one document store read."""
+        with span("faiss.format"):
+            docs = iter(snapshot.docs.get_many(np.concatenate(rows).tolist() if rows else []))
+            return [
+                [hotel_result(next(docs), float(distance)) for distance in row_distances]
+                for row_distances in distances
+            ]
+
+
+class ChromaBackend:
+    """Persistent Chroma collection; constraints become a ``where`` filter.
+
+    Writers share ``self.collection`` and call ``RetrievalEngine.invalidate``
+    after modifying it. The lexical index and a ``GeoIndex`` over hotel
+    coordinates are built from the collection's metadata on first use and
+    again after each invalidation. Queries near a place that at most
+    ``exact_below`` hotels are near are answered from those hotels' stored
+    vectors; larger areas become a bounding box in the ``where`` filter.
+    """
+    name = "chroma"
+
+    def __init__(self, data_dir: str = "data", collection: str = "hotels", exact_below: int = 2048):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=str(Path(data_dir) / "vector_store"))
+        self.collection = self.client.get_or_create_collection(
+            name=collection,
+            metadata={"hnsw:space": "cosine"}
+        )
+        self.exact_below = exact_below
+        self._lexical = None
+        self._geo = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> Optional[int]:
+        # Changes go through invalidate(); there is no file generation to compare
+        return None
+
+    def pinned(self):
+        # The collection is updated in place; there is no snapshot to hold
+        return contextlib.nullcontext(self)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._lexical = None
+            self._geo = None
+
+    @property
+    def geo(self):
+        """(hotel ids, ``GeoIndex`` over their coordinates) from the collection's metadata."""
+        from agent.geo import GeoIndex
+
+        with self._lock:
+            if self._geo is None:
+                stored = self.collection.get(include=['metadatas'])
+                coordinates = [
+                    (metadata.get('latitude', np.nan), metadata.get('longitude', np.nan))
+                    for metadata in (m or {} for m in stored['metadatas'])
+                ]
+                lats, lons = zip(*coordinates) if coordinates else ((), ())
+                self._geo = (stored['ids'], GeoIndex(lats, lons))
+            return self._geo
+
+    def nearby(self, latitude: float, longitude: float, k: int = 10, radius_km: Optional[float] = None,
+               constraints: Optional[QueryConstraints] = None) -> List[Dict[str, Any]]:
+        """Up to ``k`` nearest hotels matching ``constraints``, nearest first, with ``distance_km``."""
+        ids, geo = self.geo
+        with span("chroma.nearby"):
+            if constraints is None or constraints.is_empty():
+                rows, distances = geo.nearest(latitude, longitude, k, max_radius_km=radius_km)
+            else:
+                # Other constraints are checked on metadata, so rank every hotel in the radius
+                rows, distances = geo.within(latitude, longitude, radius_km) if radius_km is not None \
+                    else geo.nearest(latitude, longitude, len(geo))
+            hits = self._get_hits([ids[row] for row in rows])
+            results = []
+            for hit, distance in zip(hits, distances):
+                if hit is not None and (constraints is None or constraints.matches(hit)):
+                    results.append({**hit, 'distance_km': float(distance)})
+                    if len(results) == k:
+                        break
+            return results
+
+    def _get_hits(self, ids: List[str], include_vectors: bool = False):
+        """Results (None where missing) for hotel ids, in order; with ``include_vectors`` also their vectors."""
+        if not ids:
+            return ([], []) if include_vectors else []
+        stored = self.collection.get(ids=ids, include=['metadatas'] + (['embeddings'] if include_vectors else []))
+        position = {hotel_id: i for i, hotel_id in enumerate(stored['ids'])}
+        hits = [
+            hotel_result({**stored['metadatas'][position[hotel_id]], 'id': hotel_id}) if hotel_id in position else None
+            for hotel_id in ids
+        ]
+        if not include_vectors:
+            return hits
+        return hits, [stored['embeddings'][position[hotel_id]] if hotel_id in position else None for hotel_id in ids]
+
+    @property
+    def lexical(self) -> LexicalIndex:
+        with self._lock:
+            if self._lexical is None:
+                stored = self.collection.get(include=['metadatas'])
+                self._lexical = LexicalIndex.build(
+                    hotel_result({**metadata, 'id': hotel_id})
+                    for hotel_id, metadata in zip(stored['ids'], stored['metadatas'])
+                )
+            return self._lexical
+
+    def lexical_hits(self, docs: List[int]) -> List[Dict[str, Any]]:
+        """Results for lexical-index documents, fetched by hotel id in one call."""
+        if not docs:
+            return []
+        ids = [self.lexical.ids[doc] for doc in docs]
+        stored = self.collection.get(ids=ids, include=['metadatas'])
+        by_id = {hotel_id: metadata for hotel_id, metadata in zip(stored['ids'], stored['metadatas'])}
+        return [hotel_result({**by_id[hotel_id], 'id': hotel_id}) for hotel_id in ids if hotel_id in by_id]
+
+    def search(self, embeddings: np.ndarray, k: int, constraints: Optional[QueryConstraints] = None,
+               include_vectors: bool = False):
+        """Top ``k`` hits per query; with ``include_vectors`` also their stored vectors and rerank fields."""
+        if constraints is not None and constraints.has_location():
+            ids, geo = self.geo
+            with span("chroma.geo_filter"):
+                rows, _ = geo.within(constraints.latitude, constraints.longitude, constraints.radius_km)
+            if len(rows) <= self.exact_below:
+                return self._search_ids(embeddings, [ids[row] for row in rows], k, constraints, include_vectors)
+        include = ['metadatas', 'distances'] + (['embeddings'] if include_vectors else [])
+        with span("chroma.query"):
+            results = self.collection.query(
+                query_embeddings=np.asarray(embeddings).tolist(),
+                n_results=k,
+                where=constraints.to_chroma_where() if constraints is not None else None,
+                include=include
+            )
+        answers, vectors = [], []
+        dim = np.asarray(embeddings).shape[1]
+        with span("chroma.format"):
+            for row in range(len(embeddings)):
+                distances = results['distances'][row] if results.get('distances') else None
+                hits = [
+                    hotel_result({**metadata, 'id': hotel_id}, distances[i] if distances else None)
+                    for i, (hotel_id, metadata) in enumerate(zip(results['ids'][row], results['metadatas'][row]))
+                ]
+                row_vectors = np.asarray(results['embeddings'][row], dtype=np.float32).reshape(-1, dim) \
+                    if include_vectors else None
+                if constraints is not None and constraints.has_location():
+                    # The where filter is the circle's bounding box
+                    inside = [i for i, hit in enumerate(hits) if constraints.matches(hit)]
+                    hits = [hits[i] for i in inside]
+                    row_vectors = row_vectors[inside] if include_vectors else None
+                answers.append(hits)
+                vectors.append(row_vectors)
+        if not include_vectors:
+            return answers
+        return answers, vectors, [hit_fields(hits) for hits in answers]
+
+    def search_candidates(self, embeddings: np.ndarray, n: int, constraints: Optional[QueryConstraints] = None):
+        """Up to ``n`` candidates per query with their vectors and rerank fields; see ``FaissBackend``.
+
+        Chroma returns metadata with every query, so its candidates are the hits themselves.
+        """
+        return self.search(embeddings, n, constraints, include_vectors=True)
+
+    def materialize(self, candidates, picks: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        return [[hits[i] for i in positions] for hits, positions in zip(candidates, picks)]
+
+    def _search_ids(self, embeddings: np.ndarray, ids: List[str], k: int, constraints: QueryConstraints,
+                    include_vectors: bool):
+        """Exact cosine search over a few hotels, by id, that also satisfy ``constraints``."""
+        queries = np.asarray(embeddings, dtype=np.float32)
+        with span("chroma.search_exact"):
+            hits, stored = self._get_hits(ids, include_vectors=True)
+            kept = [i for i, hit in enumerate(hits) if hit is not None and constraints.matches(hit)]
+            if not kept:
+                answers = [[] for _ in queries]
+                empty = np.zeros((0, queries.shape[1]), dtype=np.float32)
+                return (answers, [empty for _ in queries], [hit_fields([]) for _ in queries]) \
+                    if include_vectors else answers
+            matrix = np.asarray([stored[i] for i in kept], dtype=np.float32)
+            normalized = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            unit_queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+            # Same scale as the collection's cosine space
+            distances = 1.0 - unit_queries @ normalized.T
+            order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        answers = [
+            [{**hits[kept[j]], 'distance': float(distances[q, j])} for j in row] for q, row in enumerate(order)
+        ]
+        if not include_vectors:
+            return answers
+        return answers, [matrix[row] for row in order], [hit_fields(hits) for hits in answers]
+
+
+BACKENDS = {
+    FaissBackend.name: FaissBackend,
+    ChromaBackend.name: ChromaBackend,
+}
+
+
+class RetrievalEngine:
+    """Encode, cache and search queries against one backend.
+
+    Vector search over-fetches ``rerank_config.candidates`` hits, which are
+    reranked in one batch by exact cosine, constraint fit and MMR diversity
+    (``vector_store.rerank``) before any of them is decoded; pass
+    ``rerank_config=None`` to disable. With
+    ``hybrid`` on, the reranked hits are fused with the backend's BM25 and
+    name-trigram rankings by reciprocal-rank fusion. Hotels a query clearly
+    names come first and the fused search fills the remaining slots; when
+    they fill all ``k`` the query is not encoded at all.
+    """
+
+    def __init__(self, backend, encoder: CachedEncoder = None, query_cache: QueryCache = None,
+                 hybrid: bool = True, rrf_k: int = 60, rerank_config: Optional[RerankConfig] = RerankConfig()):
+        self.backend = backend
+        self.encoder = encoder or load_encoder()
+        self.query_cache = query_cache or QueryCache()
+        self.hybrid = hybrid
+        self.rrf_k = rrf_k
+        self.rerank_config = rerank_config
+        self.lexical_short_circuits = 0
+
+    def _encode_queries(self, texts: List[str]) -> np.ndarray:
+        # Queries skip the on-disk document cache; QueryCache keeps the hot ones
+        count("retrieval.encoded_queries", len(texts))
+        with span("retrieval.encode"):
+            return self.encoder.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+
+    def search(self, query: str, k: int = 5, use_filters: bool = True) -> List[Dict[str, Any]]:
+        return self.search_many([query], k, use_filters)[0]
+
+    @timed("retrieval.search_many")
+    def search_many(self, queries: List[str], k: int = 5, use_filters: bool = True) -> List[List[Dict[str, Any]]]:
+        """Answer several queries with one encoder call and one backend search per filter.
+
+        City, star rating, price ceiling and amenities mentioned in a query
+        are pushed down to the backend. Filtered queries that match nothing
+        fall back to an unfiltered search. See the class docstring for the
+        lexical fusion and short-circuit.
+        """
+        generation = self.backend.refresh()
+        if generation is not None:
+            self.query_cache.set_generation(generation)
+        # Lexical ids, documents and vectors must all come from the same
+        # generation even if a new one is swapped in meanwhile
+        with self.backend.pinned():
+            return self._search_pinned(queries, k, use_filters, self.query_cache.generation)
+
+    def _search_pinned(self, queries: List[str], k: int, use_filters: bool,
+                       generation: int) -> List[List[Dict[str, Any]]]:
+        constraints = [parse_query(query) if use_filters else None for query in queries]
+        constraints = [c if c is not None and not c.is_empty() else None for c in constraints]
+        filters = [c.model_dump() if c is not None else None for c in constraints]
+
+        answers: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        pending = []
+        for i, query in enumerate(queries):
+            cached = self.query_cache.get_results(query, filters[i], k)
+            if cached is None:
+                pending.append(i)
+            else:
+                answers[i] = cached
+        count("retrieval.queries", len(queries), backend=self.backend.name)
+        count("retrieval.result_cache_hits", len(queries) - len(pending), backend=self.backend.name)
+        if not pending:
+            return answers
+
+        lexical = getattr(self.backend, 'lexical', None) if self.hybrid else None
+        rankings: Dict[int, List[List[int]]] = {}
+        named: Dict[int, List[Dict[str, Any]]] = {}
+        to_embed = pending
+        if lexical is not None and len(lexical):
+            to_embed = []
+            with span("retrieval.lexical"):
+                for i in pending:
+                    confident = lexical.confident_matches(queries[i])
+                    if confident:
+                        named[i] = self._lexical_results(confident, k, constraints[i])
+                        if len(named[i]) == k:
+                            answers[i] = named.pop(i)
+                            self.lexical_short_circuits += 1
+                            count("retrieval.lexical_short_circuits", backend=self.backend.name)
+                            continue
+                    bm25 = [doc for doc, _ in lexical.bm25(queries[i], k)]
+                    rankings[i] = [bm25, [doc for doc, _, _ in lexical.name_matches(queries[i], k)]]
+                    to_embed.append(i)
+
+        if to_embed:
+            self._vector_search(queries, to_embed, constraints, filters, answers, k)
+        if rankings:
+            with span("retrieval.fuse"):
+                for i, lexical_rankings in rankings.items():
+                    answers[i] = self._fuse(answers[i], lexical.ids, lexical_rankings, k, constraints[i])
+        for i, hits in named.items():
+            # Named hotels first, then the rest of the fused results
+            seen = {hit['hotel_id'] for hit in hits}
+            answers[i] = (hits + [hit for hit in answers[i] if hit['hotel_id'] not in seen])[:k]
+
+        for i in pending:
+            self.query_cache.put_results(queries[i], filters[i], k, answers[i], generation)
+        return answers
+
+    def _lexical_results(self, docs: List[int], k: int,
+                         constraints: Optional[QueryConstraints]) -> List[Dict[str, Any]]:
+        hits = self.backend.lexical_hits(docs)
+        return [hit for hit in hits if constraints is None or constraints.matches(hit)][:k]
+
+    def _fuse(self, vector_hits: List[Dict[str, Any]], ids: List[str], lexical_rankings: List[List[int]], k: int,
+              constraints: Optional[QueryConstraints]) -> List[Dict[str, Any]]:
+        """Reciprocal-rank fusion of vector hits with lexical document rankings."""
+        by_id = {hit['hotel_id']: hit for hit in vector_hits}
+        missing = list(dict.fromkeys(
+            doc for ranking in lexical_rankings for doc in ranking if ids[doc] not in by_id
+        ))
+        for hit in self._lexical_results(missing, len(missing), constraints):
+            by_id[hit['hotel_id']] = hit
+        fused = reciprocal_rank_fusion(
+            [[hit['hotel_id'] for hit in vector_hits]]
+            + [[ids[doc] for doc in ranking if ids[doc] in by_id] for ranking in lexical_rankings],
+            self.rrf_k
+        )
+        return [by_id[hotel_id] for hotel_id in fused[:k]]
+
+    def _vector_search(self, queries: List[str], positions: List[int], constraints: List[Optional[QueryConstraints]],
+                       filters: List[Any], answers: List[List[Dict[str, Any]]], k: int) -> None:
+        """Fill ``answers`` at ``positions`` from the backend's vector index."""
+        # Generate query embeddings in one batch, reusing cached ones
+        embeddings = dict(zip(positions, self.query_cache.encode([queries[i] for i in positions], self._encode_queries)))
+
+        groups: Dict[str, List[int]] = {}
+        for i in positions:
+            groups.setdefault(json.dumps(filters[i], sort_keys=True), []).append(i)
+
+        unmatched = []
+        for group in groups.values():
+            hits = self._search_backend([embeddings[i] for i in group], k, [constraints[i] for i in group], True)
+            for i, found in zip(group, hits):
+                answers[i] = found
+                if constraints[i] is not None and not found:
+                    unmatched.append(i)
+
+        if unmatched:
+            logger.info(f"No hotels match the filter for {len(unmatched)} queries; falling back to unfiltered search")
+            hits = self._search_backend([embeddings[i] for i in unmatched], k, [constraints[i] for i in unmatched], False)
+            for i, found in zip(unmatched, hits):
+                answers[i] = found
+
+    def _search_backend(self, embeddings: List[np.ndarray], k: int, constraints: List[Optional[QueryConstraints]],
+                        push_down: bool) -> List[List[Dict[str, Any]]]:
+        """One backend search for queries sharing a filter, reranked when enabled.
+
+        With ``push_down`` the (shared) constraints filter the backend search;
+        either way they are used for the rerank's constraint fit.
+        """
+        stacked = np.stack(embeddings)
+        where = constraints[0] if push_down else None
+        with span("retrieval.backend_search", backend=self.backend.name):
+            if self.rerank_config is None:
+                return self.backend.search(stacked, k, where)
+            candidates, vectors, fields = self.backend.search_candidates(
+                stacked, max(k, self.rerank_config.candidates), where
+            )
+        with span("retrieval.rerank"):
+            picks = rerank_positions(stacked, vectors, k, constraints, self.rerank_config, fields)
+        # Only the hotels the rerank kept are decoded
+        return self.backend.materialize(candidates, picks)
+
+    @timed("retrieval.nearby")
+    def nearby(self, place: str, k: int = 5, radius_km: Optional[float] = None,
+               query: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Nearest hotels to a gazetteer place, answered from the spatial index without encoding.
+
+        Constraints parsed from ``query`` (city, stars, price, amenities)
+        narrow the hotels. Raises ``ValueError`` for places the gazetteer
+        does not know.
+        """
+        from agent.geo import load_gazetteer
+
+        found = load_gazetteer().find(place)
+        if found is None:
+            raise ValueError(f"Unknown place {place!r}; add it to the gazetteer")
+        constraints = parse_query(query) if query else None
+        if constraints is not None:
+            # The place given here replaces any "near X" in the query
+            constraints = constraints.model_copy(update={'latitude': None, 'longitude': None, 'radius_km': None})
+        self.backend.refresh()
+        return self.backend.nearby(found.latitude, found.longitude, k, radius_km, constraints)
+
+    def invalidate(self) -> None:
+        """Drop cached results after the backend's index was modified in place."""
+        self.backend.invalidate()
+        self.query_cache.bump_generation()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': self.backend.name,
+            'lexical_short_circuits': self.lexical_short_circuits,
+            'query_cache': self.query_cache.stats(),
+            'embedding_cache': self.encoder.stats(),
+        }
+
+
+_engines: Dict[tuple, RetrievalEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(backend: str = FaissBackend.name, **options) -> RetrievalEngine:
+    """Process-wide engine for ``backend`` (``faiss`` or ``chroma``) built with ``options``."""
+    key = (backend, tuple(sorted(options.items())))
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = RetrievalEngine(BACKENDS[backend](**options))
+        return _engines[key]
+
+
+def refresh_engines() -> Dict[str, Optional[int]]:
+    """Swap every engine of this process to its backend's published generation."""
+    with _engines_lock:
+        engines = list(_engines.items())
+    return {f"{backend}{dict(options)}": engine.backend.refresh() for (backend, options), engine in engines}
+
+
+def install_reload_signal(signum: int = None) -> bool:
+    """Reload published index generations on ``signum`` (default SIGHUP), e.g. ``kill -HUP <pid>``.
+
+    The load runs on a separate thread, not inside the handler. Returns
+    ``False`` where handlers cannot be installed (outside the main thread,
+    or on platforms without the signal).
+    """
+    import signal
+
+    signum = signum if signum is not None else getattr(signal, "SIGHUP", None)
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def handle(*_):
+        threading.Thread(target=refresh_engines, name="index-reload", daemon=True).start()
+
+    signal.signal(signum, handle)
+    return True
+
+
+SAMPLE_QUERIES = [
+    "hotels in Skardu",
+    "cheap hotel in Skardu with wifi",
+    "3-star hotel in Skardu under 10000",
+    "guest house with parking near the lake",
+    "hotel with restaurant and mountain view",
+]
+
+
+def compare_backends(queries: List[str], k: int = 5, repeats: int = 20) -> List[Dict[str, Any]]:
+    """Load time, uncached search latency and top-k overlap with FAISS for each backend."""
+    load_encoder()
+    rows, reference = [], None
+    for name in BACKENDS:
+        start = time.perf_counter()
+        try:
+            engine = RetrievalEngine(BACKENDS[name](), query_cache=QueryCache(result_capacity=0))
+        except Exception as e:
+            logger.warning(f"Skipping {name}: {e}")
+            continue
+        load_s = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(repeats):
+            for query in queries:
+                start = time.perf_counter()
+                engine.search(query, k)
+                latencies.append((time.perf_counter() - start) * 1000)
+        ids = [[hit['hotel_id'] for hit in engine.search(query, k)] for query in queries]
+        reference = reference or ids
+        overlap = [len(set(a) & set(b)) / k for a, b in zip(ids, reference)]
+        rows.append({
+            'backend': name,
+            'load_s': load_s,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            f'overlap@{k}': float(np.mean(overlap)),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search hotels or compare retrieval backends")
+    parser.add_argument("query", nargs="?")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=FaissBackend.name)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--no-filters", action="store_true", help="Ignore city/stars/price/amenities in the query")
+    parser.add_argument("--compare", action="store_true", help="Benchmark all backends on sample queries")
+    args = parser.parse_args()
+
+    if args.compare:
+        for row in compare_backends([args.query] if args.query else SAMPLE_QUERIES, k=args.k):
+            print(json.dumps(row))
+        return
+
+    engine = get_engine(args.backend)
+    for hit in engine.search(args.query or SAMPLE_QUERIES[0], args.k, use_filters=not args.no_filters):
+        print(json.dumps(hit, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,286 @@
+"""Immutable, generation-versioned snapshots of the FAISS search artifacts.
+
+    faiss_index/
+        CURRENT                     # name of the live generation
+        generations/
+            000007/
+                manifest.json       # generation, creation time, build info, file sizes
+                index.bin  index_config.json  docs.bin  docs.idx  lexical.npz  hotel_table.npz
+                (vectors.f32 for compact fp16 / int8 / binary indexes)
+                (delta_index.bin  docs_delta.*  lexical_delta.npz  hotel_table_delta.npz  tombstones.npy)
+
+``publish_snapshot`` has a build function write a complete generation into
+a staging directory, renames it into ``generations/`` and only then
+replaces ``CURRENT`` atomically. Published generations are never modified,
+so a reader sees either the old snapshot or the new one, never a
+half-written mix. Incremental updates (``vector_store.index_updates``)
+hard-link the unchanged base files and add the delta files shown in
+brackets. Old generations are pruned; processes that still have one open
+keep reading their open files until they swap.
+
+An ``index_dir`` without ``CURRENT`` is read as the flat layout older
+builds wrote in place.
+"""
+import contextlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+GENERATIONS_DIR = "generations"
+MANIFEST_FILE = "manifest.json"
+STAGING_PREFIX = ".staging-"
+LOCK_FILE = ".writer.lock"
+
+
+def _generation_name(generation: int) -> str:
+    return f"{generation:06d}"
+
+
+def list_generations(index_dir: str) -> List[int]:
+    """Published generation numbers, oldest first."""
+    root = Path(index_dir) / GENERATIONS_DIR
+    if not root.is_dir():
+        return []
+    return sorted(int(path.name) for path in root.iterdir() if path.is_dir() and path.name.isdigit())
+
+
+def current_generation(index_dir: str) -> Optional[int]:
+    """Generation named by ``CURRENT``, or ``None`` for a flat (unversioned) directory."""
+    try:
+        return int((Path(index_dir) / CURRENT_FILE).read_text(encoding='utf-8').strip())
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_dir(index_dir: str, generation: int) -> Path:
+    return Path(index_dir) / GENERATIONS_DIR / _generation_name(generation)
+
+
+def pointer_state(index_dir: str, legacy_file: str) -> Tuple[int, int]:
+    """Cheap change token: inode and mtime of ``CURRENT`` (or of ``legacy_file`` in a flat directory).
+
+    ``CURRENT`` is replaced rather than rewritten, so every publish changes it.
+    """
+    for path in (Path(index_dir) / CURRENT_FILE, Path(index_dir) / legacy_file):
+        try:
+            stat = os.stat(path)
+            return stat.st_ino, stat.st_mtime_ns
+        except FileNotFoundError:
+            continue
+    return 0, 0
+
+
+def resolve_snapshot(index_dir: str, legacy_file: str) -> Tuple[Path, int]:
+    """Directory and generation of the live snapshot.
+
+    A flat directory's generation is the mtime of ``legacy_file``, so
+    in-place rebuilds are still noticed.
+    """
+    generation = current_generation(index_dir)
+    if generation is None:
+        _, mtime_ns = pointer_state(index_dir, legacy_file)
+        return Path(index_dir), mtime_ns
+    return snapshot_dir(index_dir, generation), generation
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    manifest = Path(path) / MANIFEST_FILE
+    if not manifest.exists():
+        return {}
+    return json.loads(manifest.read_text(encoding='utf-8'))
+
+
+def link_files(source: Path, target: Path, names: Iterable[str]) -> None:
+    """Carry unchanged files into a new generation (hard links, copies across filesystems)."""
+    for name in names:
+        if not (Path(source) / name).exists():
+            continue
+        try:
+            os.link(Path(source) / name, Path(target) / name)
+        except OSError:
+            shutil.copy2(Path(source) / name, Path(target) / name)
+
+
+@contextlib.contextmanager
+def writer_lock(index_dir: str):
+    """Serialize builds that read the live generation and publish the next one.
+
+    Advisory ``flock`` on POSIX; elsewhere builds must not overlap. Not
+    re-entrant: ``publish_snapshot`` does not take it, its callers do.
+    """
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(index_dir) / LOCK_FILE, 'a') as f:
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _write_current(index_dir: str, generation: int) -> None:
+    tmp = Path(index_dir) / f"{CURRENT_FILE}.tmp-{os.getpid()}"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(_generation_name(generation) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, Path(index_dir) / CURRENT_FILE)
+
+
+def publish_snapshot(
+    index_dir: str,
+    build: Callable[[Path], Optional[Dict[str, Any]]],
+    keep: int = 3
+) -> Path:
+    """Build a new generation with ``build(staging_dir)`` and make it current.
+
+    ``build`` writes every artifact into the directory it is given and may
+    return extra manifest fields (counts, index kind, source file). If it
+    raises, nothing is published and the staging directory is removed.
+
+    Args:
+        index_dir: Root holding ``CURRENT`` and ``generations/``
+        build: Writes one complete snapshot
+        keep: Published generations to keep, the new one included
+
+    Returns:
+        Directory of the published generation
+    """
+    root = Path(index_dir) / GENERATIONS_DIR
+    root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=root))
+    try:
+        start = time.perf_counter()
+        info = build(staging) or {}
+        files = {
+            path.name: path.stat().st_size for path in sorted(staging.iterdir()) if path.is_file()
+        }
+        while True:
+            generation = max(list_generations(index_dir), default=0) + 1
+            manifest = {
+                'generation': generation,
+                'created': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                'build_s': time.perf_counter() - start,
+                **info,
+                'files': files,
+            }
+            (staging / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+            try:
+                os.rename(staging, snapshot_dir(index_dir, generation))
+                break
+            except OSError:
+                # Another build claimed this number first
+                if not snapshot_dir(index_dir, generation).exists():
+                    raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _write_current(index_dir, generation)
+    logger.info(f"Published generation {generation} in {index_dir}")
+    prune_snapshots(index_dir, keep)
+    return snapshot_dir(index_dir, generation)
+
+
+def prune_snapshots(index_dir: str, keep: int = 3) -> List[int]:
+    """Delete all but the newest ``keep`` generations (never the current one)."""
+    current = current_generation(index_dir)
+    generations = list_generations(index_dir)
+    stale = [g for g in generations[:max(len(generations) - keep, 0)] if g != current]
+    for generation in stale:
+        # Readers that still have these files open keep them until they close
+        shutil.rmtree(snapshot_dir(index_dir, generation), ignore_errors=True)
+    return stale
+
+
+def rollback(index_dir: str, generation: Optional[int] = None) -> int:
+    """Point ``CURRENT`` back at ``generation`` (default: the one before the current)."""
+    generations = list_generations(index_dir)
+    if generation is None:
+        current = current_generation(index_dir)
+        older = [g for g in generations if current is None or g < current]
+        if not older:
+            raise ValueError(f"No generation older than {current} in {index_dir}")
+        generation = older[-1]
+    if generation not in generations:
+        raise ValueError(f"Generation {generation} does not exist in {index_dir}")
+    _write_current(index_dir, generation)
+    return generation
+
+
+class SnapshotWatcher:
+    """Daemon thread that calls ``on_change`` whenever ``CURRENT`` is replaced.
+
+    Servers use it to load a new generation in the background, so no
+    request pays for the load.
+    """
+
+    def __init__(self, index_dir: str, legacy_file: str, on_change: Callable[[], Any], interval_s: float = 1.0):
+        self.index_dir = index_dir
+        self.legacy_file = legacy_file
+        self.on_change = on_change
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"snapshot-watcher:{index_dir}", daemon=True)
+
+    def start(self) -> "SnapshotWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        seen = pointer_state(self.index_dir, self.legacy_file)
+        while not self._stop.wait(self.interval_s):
+            state = pointer_state(self.index_dir, self.legacy_file)
+            if state == seen:
+                continue
+            try:
+                self.on_change()
+                seen = state
+            except Exception as e:
+                # Retried on the next tick; the old generation keeps serving
+                logger.error(f"Loading the new snapshot in {self.index_dir} failed: {e}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect, roll back or prune index generations")
+    parser.add_argument("--index-dir", default="faiss_index")
+    parser.add_argument("--rollback", nargs="?", type=int, const=-1, metavar="GENERATION",
+                        help="Make GENERATION (default: the previous one) current")
+    parser.add_argument("--prune", type=int, metavar="KEEP", help="Delete all but the newest KEEP generations")
+    args = parser.parse_args()
+
+    if args.rollback is not None:
+        generation = rollback(args.index_dir, None if args.rollback < 0 else args.rollback)
+        print(f"✅ {args.index_dir} now serves generation {generation}")
+    if args.prune is not None:
+        print(f"✅ Pruned generations {prune_snapshots(args.index_dir, args.prune)}")
+
+    current = current_generation(args.index_dir)
+    for generation in list_generations(args.index_dir):
+        manifest = load_manifest(snapshot_dir(args.index_dir, generation))
+        manifest.pop('files', None)
+        print(json.dumps({**manifest, 'current': generation == current}))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()